@@ -0,0 +1,273 @@
+"""Optional compiled forward walk for small universes.
+
+:func:`tinycta._kernel.forward_walk` calls a handful of small NumPy functions per
+date, so for the few dozen assets of a typical futures book the interpreter, not
+the arithmetic, dominates. :func:`forward_walk` here runs the same walk — masking,
+shrinkage, the Cholesky solve and normaliser, and the profit-variance scaling — as
+one loop compiled by ``numba``, which ships only with the optional ``jit`` extra
+(``pip install "tinycta[jit]"``).
+
+``numba`` is imported on first use rather than at module level, so this module is
+importable on a core install; :func:`available` reports whether the compiled walk
+can run. A date whose system the compiled Cholesky declines (not finite, not
+positive definite, or with an estimated condition number over the threshold) is solved by
+:func:`tinycta._kernel._risk_position` in Python, exactly as the reference does,
+and the loop resumes after it.
+"""
+
+from __future__ import annotations
+
+import functools
+import importlib
+import importlib.util
+from collections.abc import Callable
+from typing import Any
+
+import numpy as np
+
+from ._kernel import _COND_THRESHOLD, _PROFIT_VARIANCE_DECAY, _risk_position
+
+
+def available() -> bool:
+    """Return True when ``numba`` is installed and the compiled walk can run.
+
+    Example:
+        >>> from tinycta._jit import available
+        >>> isinstance(available(), bool)
+        True
+    """
+    return importlib.util.find_spec("numba") is not None
+
+
+def _walk(
+    cor: np.ndarray,
+    rows: np.ndarray,
+    prices_num: np.ndarray,
+    returns_num: np.ndarray,
+    mu: np.ndarray,
+    vola_np: np.ndarray,
+    risk_pos_np: np.ndarray,
+    cash_pos_np: np.ndarray,
+    shrink: float,
+    raw: np.ndarray,
+    solved: np.ndarray,
+    start: int,
+    state: np.ndarray,
+) -> int:
+    """Walk ``rows[start:]`` in one loop; written in the subset of Python ``numba`` compiles.
+
+    Each date first solves its risk position into ``raw`` (unless ``solved``
+    already holds it), then updates the profit variance from the previous date's
+    P&L and scales the position, as :func:`tinycta._kernel._scale_risk_positions`
+    does. ``state`` carries the profit variance and the previous walked row
+    between calls.
+
+    Returns:
+        int: ``len(rows)`` once the walk is complete, or the index of the first
+            date whose system the Cholesky factorisation declined; nothing of that
+            date has been applied, so the caller solves it into ``raw``, marks it
+            ``solved`` and resumes there.
+    """
+    n = prices_num.shape[1]
+    index = np.empty(n, dtype=np.int64)
+    lower = np.empty((n, n))
+    rhs = np.empty(n)
+    y = np.empty(n)
+    colsum = np.empty(n)
+    probe = np.empty(n)
+    image = np.empty(n)
+    profit_variance = state[0]
+    prev_row = int(state[1])
+    for i in range(start, rows.shape[0]):
+        row = rows[i]
+        k = 0
+        for j in range(n):
+            if np.isfinite(prices_num[row, j]):
+                index[k] = j
+                k += 1
+
+        if k > 0 and not solved[i]:
+            zero = True
+            for a in range(k):
+                value = mu[row, index[a]]
+                rhs[a] = 0.0 if np.isnan(value) else value
+                if abs(rhs[a]) > 1e-8:
+                    zero = False
+            if zero:
+                for a in range(k):
+                    raw[i, index[a]] = 0.0
+            else:
+                # Shrink and factorise in one pass over the lower triangle, summing
+                # the absolute columns of the shrunk matrix for its 1-norm.
+                declined = False
+                for a in range(k):
+                    colsum[a] = 0.0
+                for a in range(k):
+                    for b in range(a + 1):
+                        value = shrink * cor[i, index[a], index[b]]
+                        if a == b:
+                            value += 1.0 - shrink
+                        colsum[a] += abs(value)
+                        if a != b:
+                            colsum[b] += abs(value)
+                        for c in range(b):
+                            value -= lower[a, c] * lower[b, c]
+                        if a == b:
+                            if not value > 0.0:
+                                declined = True
+                                break
+                            lower[a, a] = np.sqrt(value)
+                        else:
+                            lower[a, b] = value / lower[b, b]
+                            if not np.isfinite(lower[a, b]):
+                                declined = True
+                                break
+                    if declined:
+                        break
+                if not declined:
+                    # Hager's estimate of the 1-norm of the inverse (the estimator
+                    # LAPACK's pocon refines) from a few solves with the factor, for
+                    # the 1-norm condition number.
+                    for a in range(k):
+                        probe[a] = 1.0 / k
+                    estimate = 0.0
+                    last = -1
+                    for step in range(5):
+                        for a in range(k):
+                            value = probe[a]
+                            for c in range(a):
+                                value -= lower[a, c] * image[c]
+                            image[a] = value / lower[a, a]
+                        for a in range(k - 1, -1, -1):
+                            value = image[a]
+                            for c in range(a + 1, k):
+                                value -= lower[c, a] * image[c]
+                            image[a] = value / lower[a, a]
+                        total = 0.0
+                        for a in range(k):
+                            total += abs(image[a])
+                        if step > 0 and total <= estimate:
+                            break
+                        estimate = total
+                        for a in range(k):
+                            probe[a] = 1.0 if image[a] >= 0.0 else -1.0
+                        for a in range(k):
+                            value = probe[a]
+                            for c in range(a):
+                                value -= lower[a, c] * image[c]
+                            image[a] = value / lower[a, a]
+                        for a in range(k - 1, -1, -1):
+                            value = image[a]
+                            for c in range(a + 1, k):
+                                value -= lower[c, a] * image[c]
+                            image[a] = value / lower[a, a]
+                        best = 0
+                        for a in range(1, k):
+                            if abs(image[a]) > abs(image[best]):
+                                best = a
+                        if last >= 0 and abs(image[best]) <= image[last]:
+                            break
+                        for a in range(k):
+                            probe[a] = 0.0
+                        probe[best] = 1.0
+                        last = best
+                    norm = colsum[0]
+                    for a in range(1, k):
+                        norm = max(norm, colsum[a])
+                    declined = not estimate * norm <= _COND_THRESHOLD
+                if declined:
+                    state[0] = profit_variance
+                    state[1] = prev_row
+                    return i
+
+                norm = 0.0
+                for a in range(k):
+                    value = rhs[a]
+                    for c in range(a):
+                        value -= lower[a, c] * y[c]
+                    y[a] = value / lower[a, a]
+                    norm += y[a] * y[a]
+                denom = np.sqrt(norm)
+                if not np.isfinite(denom) or denom <= 1e-12:
+                    for a in range(k):
+                        raw[i, index[a]] = 0.0
+                else:
+                    for a in range(k - 1, -1, -1):
+                        value = y[a]
+                        for c in range(a + 1, k):
+                            value -= lower[c, a] * rhs[c]
+                        rhs[a] = value / lower[a, a]
+                    for a in range(k):
+                        raw[i, index[a]] = rhs[a] / denom
+
+        if prev_row >= 0:
+            live = False
+            profit = 0.0
+            for j in range(n):
+                if np.isfinite(returns_num[row, j]) and np.isfinite(prices_num[row, j]):
+                    live = True
+            if live:
+                for j in range(n):
+                    cash_pos_np[prev_row, j] = risk_pos_np[prev_row, j] / vola_np[prev_row, j]
+                for j in range(n):
+                    if np.isfinite(returns_num[row, j]) and np.isfinite(prices_num[row, j]):
+                        position = cash_pos_np[prev_row, j]
+                        if np.isfinite(position):
+                            profit += position * returns_num[row, j]
+                profit_variance = _PROFIT_VARIANCE_DECAY * profit_variance + (1 - _PROFIT_VARIANCE_DECAY) * profit**2
+
+        for a in range(k):
+            j = index[a]
+            risk_pos_np[row, j] = raw[i, j] / profit_variance
+            cash_pos_np[row, j] = risk_pos_np[row, j] / vola_np[row, j]
+        prev_row = row
+
+    state[0] = profit_variance
+    state[1] = prev_row
+    return int(rows.shape[0])
+
+
+@functools.cache
+def _compiled_walk() -> Callable[..., Any]:
+    """Compile :func:`_walk` on first use; the result is cached on disk by ``numba``."""
+    numba = importlib.import_module("numba")
+    compiled: Callable[..., Any] = numba.njit(cache=True)(_walk)
+    return compiled
+
+
+def forward_walk(
+    cor: np.ndarray,
+    rows: np.ndarray,
+    prices_num: np.ndarray,
+    returns_num: np.ndarray,
+    mu: np.ndarray,
+    vola_np: np.ndarray,
+    risk_pos_np: np.ndarray,
+    cash_pos_np: np.ndarray,
+    shrink: float,
+) -> None:
+    """Compiled drop-in for :func:`tinycta._kernel.forward_walk`.
+
+    Takes the same arguments and fills the same buffers. The Cholesky factor and
+    triangular solves are the textbook loops rather than LAPACK's blocked
+    routines, so positions agree with the reference to rounding, not bit for bit.
+
+    Raises:
+        ModuleNotFoundError: If ``numba`` is not installed.
+    """
+    walk = _compiled_walk()
+    raw = np.full((len(rows), prices_num.shape[1]), np.nan)
+    solved = np.zeros(len(rows), dtype=np.bool_)
+    state = np.array([1.0, -1.0])
+    # np.asarray strips the np.memmap subclass of a stored cube, which numba does not type.
+    cor = np.asarray(cor)
+    workspace = np.empty((2, *cor.shape[1:]))
+    start = 0
+    while (
+        start := walk(
+            cor, rows, prices_num, returns_num, mu, vola_np, risk_pos_np, cash_pos_np, shrink, raw, solved, start, state
+        )
+    ) < len(rows):
+        index = np.flatnonzero(np.isfinite(prices_num[rows[start]]))
+        raw[start, index] = _risk_position(cor[start], mu[rows[start]], index, shrink, workspace)
+        solved[start] = True
@@ -14,13 +14,14 @@ made observable through return values instead — see :func:`_risk_position`.
 
 from __future__ import annotations
 
-from collections.abc import Hashable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
 
 import numpy as np
+from scipy.linalg import get_lapack_funcs
 
 from .linalg import inv_a_norm as _inv_a_norm
 from .linalg import solve as _solve
-from .signal import shrink2id as _shrink2id
 
 
 def _denominator_is_degenerate(denom: float) -> bool:
@@ -33,20 +34,198 @@ def _denominator_is_degenerate(denom: float) -> bool:
     return denom <= 1e-12  # pragma: no mutate
 
 
-def _risk_position(corr: np.ndarray, mu_row: np.ndarray, mask: np.ndarray, shrink: float) -> np.ndarray:
+# EWMA decay of the running profit-variance estimate that scales risk positions.
+_PROFIT_VARIANCE_DECAY = 0.99
+
+# The condition-number threshold above which ``cvx.linalg`` warns. Matrices whose
+# estimated condition number exceeds it take the reference path, so the warning
+# is still raised where it matters.
+_COND_THRESHOLD = 1e12
+
+# A parallel solve splits the walked dates into this many contiguous chunks per
+# worker, so a worker that draws cheap dates (few tradable assets) picks up
+# another chunk instead of idling while the others finish.
+_CHUNKS_PER_WORKER = 4
+
+# Upper bound on the number of cells in one stack of shrunk matrices solved as a
+# batch (32 MB of float64), so a long fully observed run is solved in slices
+# rather than copied whole.
+_BATCH_CELLS = 1 << 22
+
+
+def _cond_threshold(dtype: np.dtype[Any] | type[np.floating[Any]]) -> float:
+    """Condition-number threshold for factors of ``dtype``: ``_COND_THRESHOLD`` at the same relative error.
+
+    A solve loses about ``cond * eps`` of relative accuracy, so the float64
+    threshold is scaled by the ratio of the machine epsilons; for float32 it is
+    about 1.9e3.
+
+    Example:
+        >>> import numpy as np
+        >>> from tinycta._kernel import _cond_threshold
+        >>> _cond_threshold(np.float64)
+        1000000000000.0
+        >>> round(_cond_threshold(np.float32))
+        1863
+    """
+    return _COND_THRESHOLD * float(np.finfo(np.float64).eps / np.finfo(dtype).eps)
+
+
+def _solve_triangular(lower: np.ndarray, rhs: np.ndarray, transpose: bool = False) -> np.ndarray:
+    """Solve ``lower @ x = rhs`` (or ``lower.T @ x = rhs``) for a lower-triangular ``lower``.
+
+    NumPy has no triangular solver, and ``np.linalg.solve`` would refactorise the
+    triangle with a full LU, so this calls LAPACK's ``trtrs`` through SciPy. The
+    routine is handed ``lower.T`` — the same memory read as a Fortran-ordered upper
+    triangle — so the factor is never copied.
+
+    Args:
+        lower: Lower-triangular factor of shape ``(n, n)``.
+        rhs: Right-hand side of length ``n`` or shape ``(n, k)``.
+        transpose: Solve with ``lower.T`` (back substitution) instead of ``lower``.
+
+    Returns:
+        np.ndarray: The solution, shaped like ``rhs``.
+
+    Example:
+        >>> import numpy as np
+        >>> from tinycta._kernel import _solve_triangular
+        >>> lower = np.array([[2.0, 0.0], [1.0, 1.0]])
+        >>> _solve_triangular(lower, np.array([2.0, 3.0]))
+        array([1., 2.])
+        >>> _solve_triangular(lower, np.array([4.0, 2.0]), transpose=True)
+        array([1., 2.])
+    """
+    (trtrs,) = get_lapack_funcs(("trtrs",), (lower, rhs))
+    solution: np.ndarray = trtrs(lower.T, rhs, lower=0, trans=0 if transpose else 1)[0]
+    return solution
+
+
+def _cholesky_solve_and_norm(matrix: np.ndarray, rhs: np.ndarray) -> tuple[np.ndarray, float] | None:
+    """Return ``matrix⁻¹ rhs`` and ``sqrt(rhsᵀ matrix⁻¹ rhs)`` from one Cholesky factorisation.
+
+    With ``matrix = L Lᵀ`` and ``y = L⁻¹ rhs``, the inverse A-norm is ``‖y‖`` and
+    the solution is ``L⁻ᵀ y``, so both quantities :func:`_risk_position` needs come
+    from a single factorisation instead of one inside ``inv_a_norm`` and another
+    inside ``solve``.
+
+    Returns ``None`` — and the caller falls back to the ``cvx.linalg`` path — when
+    the matrix has non-finite cells (assets still in warmup, which ``cvx.linalg``
+    drops via ``valid``), is not positive definite, or is conditioned badly enough
+    that ``cvx.linalg`` would warn about it.
+
+    Args:
+        matrix: Symmetric coefficient matrix of shape ``(n, n)``.
+        rhs: Right-hand side of length ``n``.
+
+    Returns:
+        tuple[np.ndarray, float] | None: The solution and the inverse A-norm, or
+            ``None`` when the factor-once path does not apply.
+
+    Example:
+        >>> import numpy as np
+        >>> from tinycta._kernel import _cholesky_solve_and_norm
+        >>> x, norm = _cholesky_solve_and_norm(np.array([[4.0, 0.0], [0.0, 1.0]]), np.array([4.0, 3.0]))
+        >>> x, norm
+        (array([1., 3.]), 3.605551275463989)
+
+        An indefinite matrix has no Cholesky factor:
+
+        >>> _cholesky_solve_and_norm(np.array([[1.0, 2.0], [2.0, 1.0]]), np.array([1.0, 0.0])) is None
+        True
+    """
+    lower = _cholesky_factor(matrix)
+    if lower is None:
+        return None
+    y = _solve_triangular(lower, rhs)
+    return _solve_triangular(lower, y, transpose=True), float(np.sqrt(y @ y))
+
+
+def _cholesky_factor(matrix: np.ndarray) -> np.ndarray | None:
+    """Lower Cholesky factor of ``matrix``, or ``None`` where :func:`_cholesky_solve_and_norm` declines it."""
+    if not np.isfinite(matrix).all():
+        return None
+    try:
+        lower: np.ndarray = np.linalg.cholesky(matrix)
+    except np.linalg.LinAlgError:
+        return None
+    return lower if _well_conditioned(matrix, lower) else None
+
+
+def _well_conditioned(matrix: np.ndarray, lower: np.ndarray) -> bool:
+    """Whether ``matrix``, with Cholesky factor ``lower``, is under the condition threshold of its dtype."""
+    # LAPACK's estimate of the 1-norm condition number, in O(n²) from the factor.
+    # For a symmetric float64 matrix cond₁ bounds the 2-norm condition number
+    # ``cvx.linalg`` tests from above; the estimate itself is a lower bound on
+    # cond₁, almost always exact, so only a matrix within a whisker of the
+    # threshold could be accepted here and still warn there.
+    (pocon,) = get_lapack_funcs(("pocon",), (lower,))
+    rcond = pocon(lower.T, np.abs(matrix).sum(axis=0).max(), uplo="U")[0]
+    return bool(rcond * _cond_threshold(lower.dtype) >= 1)
+
+
+def _shrink_masked(corr: np.ndarray, index: np.ndarray, shrink: float, workspace: np.ndarray) -> np.ndarray:
+    """Write ``shrink2id(corr, shrink)[np.ix_(index, index)]`` into ``workspace`` and return it.
+
+    The masked rows are gathered into the first plane of ``workspace`` and their
+    masked columns into the second, then the block is scaled in place and
+    ``1 - shrink`` added to its diagonal. That is the same arithmetic as
+    :func:`~tinycta.signal.shrink2id`, so the result is bit-identical, but no
+    ``N x N`` identity, scaled copy or fancy-indexed copy is allocated per date.
+
+    Args:
+        corr: Full correlation matrix of shape ``(n, n)``.
+        index: Ascending integer positions of the rows and columns to keep.
+        shrink: Identity-shrinkage weight in ``[0, 1]``.
+        workspace: Scratch array of shape ``(2, n, n)``, reused across calls.
+
+    Returns:
+        np.ndarray: A ``(k, k)`` view into ``workspace``, valid until its next use.
+
+    Example:
+        >>> import numpy as np
+        >>> from tinycta._kernel import _shrink_masked
+        >>> corr = np.array([[1.0, 0.8, 0.2], [0.8, 1.0, 0.4], [0.2, 0.4, 1.0]])
+        >>> _shrink_masked(corr, np.array([0, 2]), 0.5, np.empty((2, 3, 3)))
+        array([[1. , 0.1],
+               [0.1, 1. ]])
+    """
+    k = len(index)
+    rows = workspace[0, :k]
+    block: np.ndarray = workspace[1].reshape(-1)[: k * k].reshape(k, k)
+    np.take(corr, index, axis=0, out=rows)
+    np.take(rows, index, axis=1, out=block)
+    block *= shrink
+    block.flat[:: k + 1] += 1 - shrink
+    return block
+
+
+def _risk_position(
+    corr: np.ndarray, mu_row: np.ndarray, mask: np.ndarray, shrink: float, workspace: np.ndarray | None = None
+) -> np.ndarray:
     """Solve the shrunk correlation system for one timestamp's tradable assets.
 
-    Shrinks ``corr`` towards the identity by ``shrink`` (via
-    :func:`~tinycta.signal.shrink2id`), restricts it to the masked assets, solves
-    for the expected returns ``mu_row`` and normalises by ``inv_a_norm`` so the raw
-    risk position has unit norm under the correlation metric. Returns zeros when the
-    normaliser is non-finite/degenerate or ``mu_row`` is all-zero.
+    Shrinks ``corr`` towards the identity by ``shrink`` (the arithmetic of
+    :func:`~tinycta.signal.shrink2id`, done in place by :func:`_shrink_masked`),
+    restricts it to the masked assets, solves for the expected returns ``mu_row``
+    and normalises by ``inv_a_norm`` so the raw risk position has unit norm under
+    the correlation metric. Returns zeros when the normaliser is
+    non-finite/degenerate or ``mu_row`` is all-zero.
+
+    A positive-definite system is factorised once (see
+    :func:`_cholesky_solve_and_norm`) for both the solve and the normaliser; any
+    other system takes the ``cvx.linalg`` ``inv_a_norm``/``solve`` path, in
+    float64 even when ``corr`` is single precision.
 
     Args:
         corr: Full EWMA correlation matrix for the timestamp.
         mu_row: Expected returns for every asset at the timestamp (NaNs tolerated).
-        mask: Boolean mask of currently-tradable assets.
+        mask: Boolean mask of currently-tradable assets, or their ascending integer
+            positions (a batch precomputes these once per run of equal masks).
         shrink: Identity-shrinkage weight in ``[0, 1]``.
+        workspace: Optional ``(2, n, n)`` scratch array for the shrunk, masked
+            matrix (see :func:`_shrink_masked`); a batch passes one in so it is
+            allocated once rather than per timestamp.
 
     Returns:
         np.ndarray: The normalised risk position over the masked assets.
@@ -86,12 +265,21 @@ def _risk_position(corr: np.ndarray, mu_row: np.ndarray, mask: np.ndarray, shrin
         >>> _risk_position(corr, np.array([1.0, 2.0]), np.array([True, False]), shrink=1.0)
         array([1.])
     """
-    matrix = _shrink2id(corr, lamb=shrink)[np.ix_(mask, mask)]
-    expected_mu = np.nan_to_num(mu_row[mask])
-    denom = _inv_a_norm(expected_mu, matrix)
+    if workspace is None:
+        workspace = np.empty((2, *corr.shape), dtype=corr.dtype)
+    index = np.flatnonzero(mask) if mask.dtype == bool else mask
+    matrix = _shrink_masked(corr, index, shrink, workspace)
+    expected_mu = np.nan_to_num(mu_row[index])
+    factored = _cholesky_solve_and_norm(matrix, expected_mu)
+    if factored is None:
+        # The reference path solves in float64 whatever the workspace's precision.
+        matrix, expected_mu = matrix.astype(np.float64, copy=False), expected_mu.astype(np.float64, copy=False)
+    solution, denom = factored if factored is not None else (None, _inv_a_norm(expected_mu, matrix))
     if denom is None or not np.isfinite(denom) or _denominator_is_degenerate(denom) or np.allclose(expected_mu, 0.0):
         return np.zeros_like(expected_mu)
-    return _solve(matrix, expected_mu) / denom
+    if solution is None:
+        solution = _solve(matrix, expected_mu)
+    return solution / denom
 
 
 def _update_profit_variance(
@@ -139,22 +327,846 @@ def _update_profit_variance(
         >>> _update_profit_variance(1.0, np.array([2.0, np.nan]), np.array([0.1, 0.5]), both, lamb=0.99)
         0.9904
     """
-    lhs = np.nan_to_num(cash_pos_prev[ret_mask], nan=0.0)
-    rhs = np.nan_to_num(returns_row[ret_mask], nan=0.0)
+    # The P&L and the estimate are accumulated in float64 whatever the positions' precision.
+    lhs = np.nan_to_num(cash_pos_prev[ret_mask], nan=0.0).astype(np.float64, copy=False)
+    rhs = np.nan_to_num(returns_row[ret_mask], nan=0.0).astype(np.float64, copy=False)
     profit = lhs @ rhs
     return float(lamb * profit_variance + (1 - lamb) * profit**2)
 
 
+def _mask_runs(valid: np.ndarray) -> list[tuple[int, int, np.ndarray]]:
+    """Split the rows of a boolean ``(T, N)`` mask into runs of identical rows.
+
+    The set of tradable assets changes only when a contract lists or delists, so
+    a long walk has few runs. Each run carries the integer positions of its
+    assets, computed once and reused by every timestamp in it.
+
+    Args:
+        valid: Boolean array whose row ``t`` marks the tradable assets at ``t``.
+
+    Returns:
+        list[tuple[int, int, np.ndarray]]: ``(start, stop, index)`` per run, where
+            rows ``start:stop`` all equal the mask with positions ``index``.
+
+    Example:
+        >>> import numpy as np
+        >>> from tinycta._kernel import _mask_runs
+        >>> valid = np.array([[True, False], [True, False], [True, True]])
+        >>> [(start, stop, index.tolist()) for start, stop, index in _mask_runs(valid)]
+        [(0, 2, [0]), (2, 3, [0, 1])]
+    """
+    if len(valid) == 0:
+        return []
+    starts = np.flatnonzero(np.r_[True, np.any(valid[1:] != valid[:-1], axis=1)])
+    stops = np.r_[starts[1:], len(valid)]
+    return [(int(start), int(stop), np.flatnonzero(valid[start])) for start, stop in zip(starts, stops, strict=True)]
+
+
+def _solve_risk_positions(
+    cor: np.ndarray,
+    rows: np.ndarray,
+    prices_num: np.ndarray,
+    mu: np.ndarray,
+    shrink: float,
+    workers: int = 1,
+    dates: np.ndarray | None = None,
+) -> np.ndarray:
+    """Solve every walked timestamp's unscaled risk position (phase one of the walk).
+
+    :func:`_risk_position` does not depend on the running profit variance, so every
+    timestamp's solve is independent of every other one. They are gathered here as
+    one batch, leaving only the cheap scalar recursion in :func:`_scale_risk_positions`
+    sequential. Timestamps are visited in runs of equal tradable sets (see
+    :func:`_mask_runs`), which share their index arrays and one workspace.
+
+    With ``workers > 1`` the timestamps are split into contiguous chunks that a
+    pool of that many threads solves concurrently, each chunk with its own
+    workspace. NumPy's LAPACK calls release the GIL, so the solves overlap; every
+    timestamp still takes exactly the serial path, and the result is identical.
+
+    Given ``dates``, only those matrices of ``cor`` are solved, read one at a
+    time, so a memory-mapped cube is never copied whole to select them.
+
+    Args:
+        cor: Correlation cube of shape ``(len(rows), assets, assets)``, or any
+            number of matrices when ``dates`` is given.
+        rows: Row index into ``prices_num``/``mu`` of each timestamp to solve.
+        prices_num: Asset prices as a ``(rows, assets)`` array (NaNs tolerated).
+        mu: Expected returns aligned to ``prices_num``.
+        shrink: Identity-shrinkage weight in ``[0, 1]`` passed to :func:`_risk_position`.
+        workers: Number of threads solving chunks of timestamps concurrently.
+        dates: Position in ``cor`` of each timestamp's matrix, aligned to ``rows``;
+            defaults to ``cor``'s matrices in order.
+
+    Returns:
+        np.ndarray: A ``(len(rows), assets)`` array whose ``i``-th row holds the solve
+            for ``cor[dates[i]]``; untradable assets are ``NaN``. It and the workspace
+            take ``cor``'s dtype, so a float32 cube is solved in single precision.
+
+    Example:
+        >>> import numpy as np
+        >>> from tinycta._kernel import _solve_risk_positions
+        >>> prices = np.array([[100.0, 50.0], [101.0, np.nan]])
+        >>> mu = np.array([[1.0, 0.0], [1.0, 0.0]])
+
+        The second row has no price for the second asset, so it is left ``NaN``:
+
+        >>> _solve_risk_positions(np.stack([np.eye(2), np.eye(2)]), np.array([0, 1]), prices, mu, shrink=1.0)
+        array([[ 1.,  0.],
+               [ 1., nan]])
+    """
+    if dates is None:
+        dates = np.arange(len(rows))
+    if workers > 1 and len(rows) > 1:
+        bounds = np.linspace(0, len(rows), min(workers * _CHUNKS_PER_WORKER, len(rows)) + 1).astype(int)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            chunks = pool.map(
+                lambda start, stop: _solve_risk_positions(
+                    cor, rows[start:stop], prices_num, mu, shrink, dates=dates[start:stop]
+                ),
+                bounds[:-1],
+                bounds[1:],
+            )
+            return np.concatenate(list(chunks))
+    n = prices_num.shape[1]
+    raw = np.full((len(rows), n), np.nan, dtype=cor.dtype)
+    workspace = np.empty((2, n, n), dtype=cor.dtype)
+    for start, stop, index in _mask_runs(np.isfinite(prices_num[rows])):
+        if len(index) == 0:
+            continue
+        for i in range(start, stop):
+            raw[i, index] = _risk_position(cor[dates[i]], mu[rows[i]], index, shrink, workspace)
+    return raw
+
+
+def _factorise_risk_systems(
+    cor: np.ndarray, rows: np.ndarray, prices_num: np.ndarray, shrink: float, out: np.ndarray
+) -> None:
+    """Store every walked timestamp's Cholesky factor for :func:`_solve_factorised_risk_positions`.
+
+    ``out[i, :k, :k]`` receives the lower factor of timestamp ``i``'s shrunk
+    correlation over its ``k`` tradable assets (see :func:`_cholesky_factor`);
+    ``out[i, 0, 0]`` is ``NaN`` where there is no factor, so the solve takes
+    :func:`_risk_position`'s path for that timestamp. ``out`` may be a memory map.
+
+    Args:
+        cor: Correlation cube of shape ``(len(rows), assets, assets)``.
+        rows: Row index into ``prices_num`` of each matrix in ``cor``.
+        prices_num: Asset prices as a ``(rows, assets)`` array (NaNs tolerated).
+        shrink: Identity-shrinkage weight in ``[0, 1]``.
+        out: Output array of shape ``(len(rows), assets, assets)``, filled in place.
+
+    Example:
+        >>> import numpy as np
+        >>> from tinycta._kernel import _factorise_risk_systems
+        >>> out = np.zeros((2, 2, 2))
+        >>> prices = np.array([[1.0, 1.0], [1.0, np.nan]])
+        >>> _factorise_risk_systems(np.stack([np.eye(2), np.eye(2)]), np.array([0, 1]), prices, 0.5, out)
+        >>> out[0], out[1, :1, :1]
+        (array([[1., 0.],
+               [0., 1.]]), array([[1.]]))
+    """
+    n = prices_num.shape[1]
+    workspace = np.empty((2, n, n))
+    for start, stop, index in _mask_runs(np.isfinite(prices_num[rows])):
+        k = len(index)
+        for i in range(start, stop):
+            lower = _cholesky_factor(_shrink_masked(cor[i], index, shrink, workspace)) if k else None
+            if lower is None:
+                out[i, 0, 0] = np.nan
+            else:
+                out[i, :k, :k] = lower
+
+
+def _solve_factorised_risk_positions(
+    factors: np.ndarray,
+    cor: np.ndarray,
+    rows: np.ndarray,
+    prices_num: np.ndarray,
+    mu: np.ndarray,
+    shrink: float,
+) -> np.ndarray:
+    """Phase one of the walk from stored Cholesky factors: triangular solves only.
+
+    Takes the factors :func:`_factorise_risk_systems` wrote for the same ``cor``,
+    ``rows``, ``prices_num`` and ``shrink``. Each timestamp costs two triangular
+    solves instead of a factorisation, and since those are the very solves
+    :func:`_cholesky_solve_and_norm` performs on the same factor, the result is
+    bit-identical to :func:`_solve_risk_positions`.
+
+    Args:
+        factors: Stored factors of shape ``(len(rows), assets, assets)``.
+        cor: Correlation cube the factors were computed from.
+        rows: Row index into ``prices_num``/``mu`` of each matrix in ``cor``.
+        prices_num: Asset prices as a ``(rows, assets)`` array (NaNs tolerated).
+        mu: Expected returns aligned to ``prices_num``.
+        shrink: Identity-shrinkage weight the factors were computed with.
+
+    Returns:
+        np.ndarray: A ``(len(rows), assets)`` array of unscaled risk positions,
+            laid out as :func:`_solve_risk_positions` returns them.
+
+    Example:
+        >>> import numpy as np
+        >>> from tinycta._kernel import (
+        ...     _factorise_risk_systems, _solve_factorised_risk_positions, _solve_risk_positions
+        ... )
+        >>> cor = np.array([[[1.0, 0.8], [0.8, 1.0]]])
+        >>> prices, rows = np.ones((1, 2)), np.array([0])
+        >>> factors = np.empty((1, 2, 2))
+        >>> _factorise_risk_systems(cor, rows, prices, 0.5, factors)
+        >>> mu = np.array([[1.0, 0.0]])
+        >>> _solve_factorised_risk_positions(factors, cor, rows, prices, mu, 0.5).round(4)
+        array([[ 1.0911, -0.4364]])
+        >>> bool((_solve_factorised_risk_positions(factors, cor, rows, prices, mu, 0.5)
+        ...       == _solve_risk_positions(cor, rows, prices, mu, 0.5)).all())
+        True
+    """
+    n = prices_num.shape[1]
+    raw = np.full((len(rows), n), np.nan)
+    workspace = np.empty((2, n, n))
+    for start, stop, index in _mask_runs(np.isfinite(prices_num[rows])):
+        k = len(index)
+        if k == 0:
+            continue
+        for i in range(start, stop):
+            row = rows[i]
+            lower = factors[i, :k, :k]
+            if np.isnan(lower[0, 0]):
+                raw[i, index] = _risk_position(cor[i], mu[row], index, shrink, workspace)
+                continue
+            expected_mu = np.nan_to_num(mu[row][index])
+            y = _solve_triangular(lower, expected_mu)
+            denom = float(np.sqrt(y @ y))
+            if not np.isfinite(denom) or _denominator_is_degenerate(denom) or np.allclose(expected_mu, 0.0):
+                raw[i, index] = 0.0
+            else:
+                raw[i, index] = _solve_triangular(lower, y, transpose=True) / denom
+    return raw
+
+
+def _solve_triangular_stack(triangle: np.ndarray, rhs: np.ndarray, lower: bool = True) -> np.ndarray:
+    """Solve ``triangle[i] @ x[i] = rhs[i]`` for every ``i`` of a stack of triangular matrices.
+
+    Forward (or, for an upper ``triangle``, back) substitution runs once over
+    the ``n`` rows, each step vectorised across the whole stack, so the number of
+    Python-level steps is ``n`` however many systems the stack holds. Each step
+    reads one row of every matrix, so a transposed factor is best passed as a
+    C-contiguous copy rather than as a strided view.
+
+    Args:
+        triangle: Triangular matrices of shape ``(b, n, n)``.
+        rhs: Right-hand sides of shape ``(b, n)``.
+        lower: Whether ``triangle`` is lower (forward substitution) or upper triangular.
+
+    Returns:
+        np.ndarray: The ``(b, n)`` solutions.
+
+    Example:
+        >>> import numpy as np
+        >>> from tinycta._kernel import _solve_triangular_stack
+        >>> lower = np.array([[[2.0, 0.0], [1.0, 1.0]], [[1.0, 0.0], [0.0, 4.0]]])
+        >>> _solve_triangular_stack(lower, np.array([[2.0, 3.0], [1.0, 8.0]]))
+        array([[1., 2.],
+               [1., 2.]])
+        >>> _solve_triangular_stack(lower.transpose(0, 2, 1).copy(), np.array([[4.0, 2.0], [1.0, 8.0]]), lower=False)
+        array([[1., 2.],
+               [1., 2.]])
+    """
+    n = rhs.shape[1]
+    x = np.empty_like(rhs)
+    for j in range(n) if lower else reversed(range(n)):
+        done = slice(0, j) if lower else slice(j + 1, n)
+        x[:, j] = (rhs[:, j] - np.einsum("bk,bk->b", triangle[:, j, done], x[:, done])) / triangle[:, j, j]
+    return x
+
+
+def _cholesky_solve_stack(lower: np.ndarray, upper: np.ndarray, rhs: np.ndarray) -> np.ndarray:
+    """Solve ``lower[i] @ upper[i] @ x[i] = rhs[i]`` across a stack, ``upper`` holding the transposed factors."""
+    return _solve_triangular_stack(upper, _solve_triangular_stack(lower, rhs), lower=False)
+
+
+def _inverse_norm_estimate(lower: np.ndarray, upper: np.ndarray) -> np.ndarray:
+    """Hager's estimate of ``‖A⁻¹‖₁`` for each ``A = L Lᵀ`` of a stack of Cholesky factors.
+
+    This is the estimator LAPACK's ``pocon`` refines, stepped as
+    :mod:`tinycta._jit` steps it, with every solve vectorised across the stack by
+    :func:`_cholesky_solve_stack`. The stack stops as soon as no estimate is still
+    improving, usually after two steps. Like ``pocon``'s, each estimate is a
+    lower bound on the true norm and almost always equal to it.
+
+    Args:
+        lower: Lower Cholesky factors of shape ``(b, n, n)``.
+        upper: Their transposes, C-contiguous.
+
+    Returns:
+        np.ndarray: The ``(b,)`` estimates.
+
+    Example:
+        >>> import numpy as np
+        >>> from tinycta._kernel import _inverse_norm_estimate
+        >>> matrix = np.array([[1.0, 0.9], [0.9, 1.0]])
+        >>> lower = np.linalg.cholesky(matrix)[None]
+        >>> _inverse_norm_estimate(lower, lower.transpose(0, 2, 1).copy()).round(6)
+        array([10.])
+        >>> float(np.abs(np.linalg.inv(matrix)).sum(axis=0).max().round(6))
+        10.0
+    """
+    b, n = lower.shape[:2]
+    stack = np.arange(b)
+    probe = np.full((b, n), 1.0 / max(n, 1), dtype=lower.dtype)
+    estimate = np.zeros(b, dtype=lower.dtype)
+    last = np.full(b, -1)
+    active = np.full(b, n > 0)
+    for step in range(5):
+        image = _cholesky_solve_stack(lower, upper, probe)
+        total = np.abs(image).sum(axis=1)
+        if step > 0:
+            active &= total > estimate
+        estimate = np.where(active, total, estimate)
+        if not active.any():
+            break
+        image = _cholesky_solve_stack(lower, upper, np.where(image >= 0.0, 1.0, -1.0).astype(lower.dtype))
+        best = np.abs(image).argmax(axis=1)
+        active &= (last < 0) | (np.abs(image[stack, best]) > image[stack, last])
+        if not active.any():
+            break
+        probe = np.zeros_like(probe)
+        probe[stack, best] = 1.0
+        last = best
+    return estimate
+
+
+def _risk_position_stack(corr: np.ndarray, mu_rows: np.ndarray, shrink: float) -> tuple[np.ndarray, np.ndarray]:
+    """:func:`_risk_position` for a stack of fully observed dates, as stacked array operations.
+
+    The shrunk matrices are built with :func:`_shrink_masked`'s arithmetic and
+    factorised by one batched Cholesky call. The condition check and both
+    triangular solves then run across the whole stack at once (see
+    :func:`_inverse_norm_estimate` and :func:`_solve_triangular_stack`), so the
+    Python-level work grows with ``n``, not with the number of dates. The
+    positions agree with :func:`_risk_position`'s to rounding. A date with
+    non-finite cells, no Cholesky factor or too large a condition estimate is
+    declined and left to the caller; only when the batched factorisation fails
+    is the stack factorised matrix by matrix to find the dates that fail.
+
+    Args:
+        corr: Stack of correlation matrices of shape ``(b, n, n)``.
+        mu_rows: Expected returns of shape ``(b, n)`` (NaNs tolerated).
+        shrink: Identity-shrinkage weight in ``[0, 1]``.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: The ``(b, n)`` normalised risk positions
+            and a boolean mask of the declined dates, whose rows are undefined.
+
+    Example:
+        >>> import numpy as np
+        >>> from tinycta._kernel import _risk_position_stack
+        >>> corr = np.stack([np.eye(2), np.array([[1.0, 0.8], [0.8, 1.0]]), np.array([[1.0, 2.0], [2.0, 1.0]])])
+        >>> positions, declined = _risk_position_stack(corr, np.array([[1.0, 0.0]] * 3), 1.0)
+        >>> positions[:2].round(4), declined
+        (array([[ 1.    ,  0.    ],
+               [ 1.6667, -1.3333]]), array([False, False,  True]))
+    """
+    b, n = mu_rows.shape
+    matrices = np.asarray(corr) * shrink
+    matrices.reshape(b, n * n)[:, :: n + 1] += 1 - shrink
+    expected_mu = np.nan_to_num(mu_rows)
+    positions = np.zeros_like(expected_mu)
+    declined = ~np.isfinite(matrices).all(axis=(1, 2))
+    try:
+        lower = np.linalg.cholesky(matrices[~declined] if declined.any() else matrices)
+    except np.linalg.LinAlgError:
+        declined |= np.array([_cholesky_factor(matrix) is None for matrix in matrices])
+        lower = np.linalg.cholesky(matrices[~declined])
+    upper = np.ascontiguousarray(lower.transpose(0, 2, 1))
+    dates = np.flatnonzero(~declined)
+    norm = np.abs(matrices).sum(axis=1).max(axis=1, initial=0.0)[dates]
+    accepted = _inverse_norm_estimate(lower, upper) * norm <= _cond_threshold(lower.dtype)
+    if not accepted.all():
+        declined[dates[~accepted]] = True
+        lower, upper, dates = lower[accepted], upper[accepted], dates[accepted]
+    y = _solve_triangular_stack(lower, expected_mu[dates])
+    denom = np.sqrt(np.einsum("bk,bk->b", y, y))
+    # _risk_position's zero cases, vectorised: a degenerate normaliser or an all-zero mu.
+    solved = np.isfinite(denom) & (denom > 1e-12) & ~np.all(np.abs(expected_mu[dates]) <= 1e-8, axis=1)
+    positions[dates[solved]] = _solve_triangular_stack(upper[solved], y[solved], lower=False) / denom[solved, None]
+    return positions, declined
+
+
+def _solve_risk_positions_batched(
+    cor: np.ndarray,
+    rows: np.ndarray,
+    prices_num: np.ndarray,
+    mu: np.ndarray,
+    shrink: float,
+) -> np.ndarray:
+    """Phase one of the walk with every fully observed run solved as a batch.
+
+    Through long stretches every asset has a price, so consecutive dates share
+    the full tradable set and need no masking. Each such run of
+    :func:`_mask_runs` hands stacks of its matrices to
+    :func:`_risk_position_stack` (at most ``_BATCH_CELLS`` cells at a time),
+    trading Python-level work per date for Python-level work per asset. Runs
+    with a partial mask, single-date runs and the dates the stack declines are
+    solved one by one by :func:`_risk_position`, which also keeps its
+    ``cvx.linalg`` fallback.
+
+    The stacked substitutions round differently from LAPACK's, so the positions
+    agree with :func:`_solve_risk_positions`' to rounding. The trade pays off
+    for small universes, where one date's solve is dominated by call overhead;
+    with around a hundred assets the per-date walk is as fast or faster.
+
+    Args:
+        cor: Correlation cube of shape ``(len(rows), assets, assets)``.
+        rows: Row index into ``prices_num``/``mu`` of each matrix in ``cor``.
+        prices_num: Asset prices as a ``(rows, assets)`` array (NaNs tolerated).
+        mu: Expected returns aligned to ``prices_num``.
+        shrink: Identity-shrinkage weight in ``[0, 1]``.
+
+    Returns:
+        np.ndarray: A ``(len(rows), assets)`` array of unscaled risk positions,
+            laid out as :func:`_solve_risk_positions` returns them.
+
+    Example:
+        >>> import numpy as np
+        >>> from tinycta._kernel import _solve_risk_positions, _solve_risk_positions_batched
+        >>> cor = np.stack([np.array([[1.0, rho], [rho, 1.0]]) for rho in (0.50, 0.52, 0.55)])
+        >>> prices, mu, rows = np.ones((3, 2)), np.array([[1.0, 0.2]] * 3), np.arange(3)
+        >>> batched = _solve_risk_positions_batched(cor, rows, prices, mu, 0.5)
+        >>> bool(np.allclose(batched, _solve_risk_positions(cor, rows, prices, mu, 0.5)))
+        True
+    """
+    n = prices_num.shape[1]
+    raw = np.full((len(rows), n), np.nan, dtype=cor.dtype)
+    workspace = np.empty((2, n, n), dtype=cor.dtype)
+    step = max(1, _BATCH_CELLS // (n * n)) if n else 1
+    for start, stop, index in _mask_runs(np.isfinite(prices_num[rows])):
+        k = len(index)
+        if k == 0:
+            continue
+        declined = np.arange(start, stop)
+        if k == n and stop - start > 1:
+            pending = []
+            for first in range(start, stop, step):
+                last = min(first + step, stop)
+                raw[first:last], refused = _risk_position_stack(cor[first:last], mu[rows[first:last]], shrink)
+                pending.append(np.flatnonzero(refused) + first)
+            declined = np.concatenate(pending)
+        for i in declined:
+            raw[i, index] = _risk_position(cor[i], mu[rows[i]], index, shrink, workspace)
+    return raw
+
+
+def _solve_block_risk_positions(
+    cor: np.ndarray,
+    rows: np.ndarray,
+    prices_num: np.ndarray,
+    mu: np.ndarray,
+    shrink: float,
+    labels: np.ndarray,
+) -> np.ndarray:
+    """Phase one of the walk with the correlation treated as block-diagonal.
+
+    Cross-block correlations are taken as zero, so each date's system splits into
+    one small system per block of ``labels``. Each block is solved on its own
+    (factor-once where possible, as in :func:`_risk_position`), and the blocks
+    share one normaliser, the square root of the sum of the blocks' quadratic
+    forms ``muᵀ A⁻¹ mu``, which is the inverse A-norm of the block-diagonal matrix.
+    When that normaliser is not finite (an indefinite block can turn the sum
+    negative) or is degenerate, the whole date is zeroed, as :func:`_risk_position`
+    zeroes it, rather than normalising the other blocks' partial solutions. The
+    result is therefore what :func:`_solve_risk_positions` gives for the
+    correlation with its cross-block cells zeroed, at the cost of a handful of
+    small solves instead of one of size ``N``.
+
+    Args:
+        cor: Correlation cube of shape ``(len(rows), assets, assets)``.
+        rows: Row index into ``prices_num``/``mu`` of each matrix in ``cor``.
+        prices_num: Asset prices as a ``(rows, assets)`` array (NaNs tolerated).
+        mu: Expected returns aligned to ``prices_num``.
+        shrink: Identity-shrinkage weight in ``[0, 1]``.
+        labels: Integer block label of each asset.
+
+    Returns:
+        np.ndarray: A ``(len(rows), assets)`` array of unscaled risk positions,
+            laid out as :func:`_solve_risk_positions` returns them.
+
+    Example:
+        >>> import numpy as np
+        >>> from tinycta._kernel import _solve_block_risk_positions, _solve_risk_positions
+        >>> corr = np.array([[1.0, 0.5, 0.0], [0.5, 1.0, 0.0], [0.0, 0.0, 1.0]])
+        >>> prices, mu, rows = np.ones((1, 3)), np.array([[1.0, 0.0, 2.0]]), np.array([0])
+        >>> blocked = _solve_block_risk_positions(corr[None], rows, prices, mu, 0.5, np.array([0, 0, 1]))
+        >>> bool(np.allclose(blocked, _solve_risk_positions(corr[None], rows, prices, mu, 0.5)))
+        True
+    """
+    n = prices_num.shape[1]
+    raw = np.full((len(rows), n), np.nan)
+    workspace = np.empty((2, n, n))
+    for start, stop, index in _mask_runs(np.isfinite(prices_num[rows])):
+        if len(index) == 0:
+            continue
+        blocks = [index[labels[index] == label] for label in np.unique(labels[index])]
+        for i in range(start, stop):
+            row = rows[i]
+            expected_mu = np.nan_to_num(mu[row])
+            if np.allclose(expected_mu[index], 0.0):
+                raw[i, index] = 0.0
+                continue
+            squared_norm = 0.0
+            for block in blocks:
+                matrix = _shrink_masked(cor[i], block, shrink, workspace)
+                factored = _cholesky_solve_and_norm(matrix, expected_mu[block])
+                if factored is not None:
+                    solution, norm = factored
+                    squared_norm += norm * norm
+                else:
+                    # The reference path: an indefinite block keeps the sign of its quadratic form,
+                    # which the dense form sums before its square root, and a block still in warmup
+                    # (no valid rows, all-NaN solution) adds nothing, as the dense path drops its rows.
+                    solution = _solve(matrix, expected_mu[block])
+                    valid = np.isfinite(solution)
+                    squared_norm += float(expected_mu[block][valid] @ solution[valid])
+                raw[i, block] = solution
+            denom = float(np.sqrt(squared_norm)) if squared_norm >= 0.0 else np.nan
+            if not np.isfinite(denom) or _denominator_is_degenerate(denom):
+                raw[i, index] = 0.0
+            else:
+                raw[i, index] /= denom
+    return raw
+
+
+def _solve_risk_positions_for_shrinks(
+    cor: np.ndarray,
+    rows: np.ndarray,
+    prices_num: np.ndarray,
+    mu: np.ndarray,
+    shrinks: np.ndarray,
+) -> np.ndarray:
+    """Solve every walked timestamp's unscaled risk position for several shrinks at once.
+
+    With ``C = V diag(w) V^T`` the shrunk matrix is ``V diag(s w + 1 - s) V^T``, so
+    one eigendecomposition of each timestamp's masked correlation serves every
+    shrink ``s``: the solve is ``V (V^T mu / d)`` and the squared normaliser is
+    ``sum((V^T mu)^2 / d)`` with ``d = s w + 1 - s``. A system that is not finite,
+    not positive definite or too badly conditioned under a given shrink is handed
+    to :func:`_risk_position` instead, as the single-shrink walk would. Results
+    agree with :func:`_solve_risk_positions` to rounding, not bit for bit.
+
+    Args:
+        cor: Correlation cube of shape ``(len(rows), assets, assets)``.
+        rows: Row index into ``prices_num``/``mu`` of each matrix in ``cor``.
+        prices_num: Asset prices as a ``(rows, assets)`` array (NaNs tolerated).
+        mu: Expected returns aligned to ``prices_num``.
+        shrinks: Identity-shrinkage weights in ``[0, 1]``.
+
+    Returns:
+        np.ndarray: A ``(len(shrinks), len(rows), assets)`` array; slice ``k`` is
+            :func:`_solve_risk_positions` for ``shrinks[k]``.
+
+    Example:
+        >>> import numpy as np
+        >>> from tinycta._kernel import _solve_risk_positions, _solve_risk_positions_for_shrinks
+        >>> cor = np.array([[[1.0, 0.8], [0.8, 1.0]]])
+        >>> prices, mu = np.array([[100.0, 50.0]]), np.array([[1.0, 0.0]])
+        >>> raw = _solve_risk_positions_for_shrinks(cor, np.array([0]), prices, mu, np.array([0.0, 0.5]))
+        >>> raw.round(4)
+        array([[[ 1.    ,  0.    ]],
+        <BLANKLINE>
+               [[ 1.0911, -0.4364]]])
+        >>> bool(np.allclose(raw[1], _solve_risk_positions(cor, np.array([0]), prices, mu, shrink=0.5)))
+        True
+    """
+    shrinks = np.asarray(shrinks, dtype=float)
+    n = prices_num.shape[1]
+    raw = np.full((len(shrinks), len(rows), n), np.nan)
+    workspace = np.empty((2, n, n))
+    for start, stop, index in _mask_runs(np.isfinite(prices_num[rows])):
+        if len(index) == 0:
+            continue
+        for i in range(start, stop):
+            _solve_for_shrinks(raw[:, i], cor[i], mu[rows[i]], index, shrinks, workspace)
+    return raw
+
+
+def _solve_for_shrinks(
+    out: np.ndarray, corr: np.ndarray, mu_row: np.ndarray, index: np.ndarray, shrinks: np.ndarray, workspace: np.ndarray
+) -> None:
+    """Fill ``out[k, index]`` with one timestamp's risk position for each ``shrinks[k]``."""
+    matrix = _shrink_masked(corr, index, 1.0, workspace)
+    expected_mu = np.nan_to_num(mu_row[index])
+    if np.allclose(expected_mu, 0.0):
+        out[:, index] = 0.0
+        return
+
+    solved = np.zeros(len(shrinks), dtype=bool)
+    if np.isfinite(matrix).all():
+        eigenvalues, vectors = np.linalg.eigh(matrix)
+        projected = vectors.T @ expected_mu
+        scale = shrinks[:, None] * eigenvalues[None, :] + (1.0 - shrinks)[:, None]
+        smallest, largest = scale.min(axis=1), scale.max(axis=1)
+        solved = (smallest > 0) & (largest < smallest * _COND_THRESHOLD)
+        coeff = projected[None, :] / np.where(solved[:, None], scale, 1.0)
+        denom = np.sqrt(np.maximum(coeff @ projected, 0.0))
+        degenerate = np.array([_denominator_is_degenerate(d) for d in denom])
+        positions = (coeff @ vectors.T) / np.where(degenerate, 1.0, denom)[:, None]
+        out[:, index] = np.where(degenerate[:, None], 0.0, positions)
+
+    for k in np.flatnonzero(~solved):
+        out[k, index] = _risk_position(corr, mu_row, index, float(shrinks[k]), workspace)
+
+
+def _solve_risk_positions_for_signals(
+    cor: np.ndarray,
+    rows: np.ndarray,
+    prices_num: np.ndarray,
+    mus: np.ndarray,
+    shrink: float,
+) -> np.ndarray:
+    """Solve every walked timestamp's unscaled risk position for several signals at once.
+
+    Every signal shares the timestamp's shrunk correlation, so its Cholesky factor
+    is computed once and the signals are its right-hand sides: two triangular
+    solves of an ``(n, len(mus))`` block give every solution and normaliser. A
+    system without a Cholesky factor (see :func:`_cholesky_factor`) is handed to
+    :func:`_risk_position` signal by signal, as the single-signal walk would.
+    Results agree with :func:`_solve_risk_positions` to rounding, not bit for bit.
+
+    Args:
+        cor: Correlation cube of shape ``(len(rows), assets, assets)``.
+        rows: Row index into ``prices_num``/``mus`` of each matrix in ``cor``.
+        prices_num: Asset prices as a ``(rows, assets)`` array (NaNs tolerated).
+        mus: Expected returns of each signal, shape ``(signals, rows, assets)``.
+        shrink: Identity-shrinkage weight in ``[0, 1]``.
+
+    Returns:
+        np.ndarray: A ``(len(mus), len(rows), assets)`` array; slice ``k`` is
+            :func:`_solve_risk_positions` for ``mus[k]``.
+
+    Example:
+        >>> import numpy as np
+        >>> from tinycta._kernel import _solve_risk_positions, _solve_risk_positions_for_signals
+        >>> cor = np.array([[[1.0, 0.8], [0.8, 1.0]]])
+        >>> prices = np.array([[100.0, 50.0]])
+        >>> mus = np.array([[[1.0, 0.0]], [[0.0, 1.0]], [[0.0, 0.0]]])
+        >>> raw = _solve_risk_positions_for_signals(cor, np.array([0]), prices, mus, shrink=0.5)
+        >>> raw[:, 0].round(4)
+        array([[ 1.0911, -0.4364],
+               [-0.4364,  1.0911],
+               [ 0.    ,  0.    ]])
+        >>> bool(np.allclose(raw[0], _solve_risk_positions(cor, np.array([0]), prices, mus[0], shrink=0.5)))
+        True
+    """
+    n = prices_num.shape[1]
+    raw = np.full((len(mus), len(rows), n), np.nan)
+    workspace = np.empty((2, n, n))
+    for start, stop, index in _mask_runs(np.isfinite(prices_num[rows])):
+        if len(index) == 0:
+            continue
+        for i in range(start, stop):
+            _solve_for_signals(raw[:, i], cor[i], mus[:, rows[i]], index, shrink, workspace)
+    return raw
+
+
+def _solve_for_signals(
+    out: np.ndarray, corr: np.ndarray, mu_rows: np.ndarray, index: np.ndarray, shrink: float, workspace: np.ndarray
+) -> None:
+    """Fill ``out[k, index]`` with one timestamp's risk position for each signal ``mu_rows[k]``."""
+    matrix = _shrink_masked(corr, index, shrink, workspace)
+    lower = _cholesky_factor(matrix)
+    if lower is None:
+        for k, mu_row in enumerate(mu_rows):
+            out[k, index] = _risk_position(corr, mu_row, index, shrink, workspace)
+        return
+
+    expected_mu = np.nan_to_num(mu_rows[:, index]).T
+    y = _solve_triangular(lower, expected_mu)
+    solution = _solve_triangular(lower, y, transpose=True)
+    denom = np.sqrt(np.einsum("ij,ij->j", y, y))
+    degenerate = np.array([not np.isfinite(d) or _denominator_is_degenerate(d) for d in denom])
+    zero = degenerate | np.all(np.abs(expected_mu) <= 1e-8, axis=0)  # np.allclose(mu, 0.0) per signal
+    out[:, index] = np.where(zero[:, None], 0.0, solution.T / np.where(zero, 1.0, denom)[:, None])
+
+
+def _factor_risk_position(
+    loadings: np.ndarray, idiosyncratic: np.ndarray, mu_row: np.ndarray, index: np.ndarray, shrink: float
+) -> np.ndarray:
+    """Risk position for one timestamp under a factor-plus-diagonal correlation.
+
+    With ``C = B Bᵀ + D`` and a unit diagonal, the shrunk matrix is
+    ``s B Bᵀ + E`` with diagonal ``E = s D + 1 - s``. By the Woodbury identity its
+    inverse applied to ``mu`` is ``E⁻¹ mu - E⁻¹ B' (I + B'ᵀ E⁻¹ B')⁻¹ B'ᵀ E⁻¹ mu`` with
+    ``B' = sqrt(s) B``, so only a ``k x k`` system is solved and the cost is
+    ``O(N k²)``. The result is normalised by ``sqrt(muᵀ x)`` as in
+    :func:`_risk_position`, with the same zero fallbacks.
+
+    Args:
+        loadings: Factor loadings of shape ``(n, k)`` (``NaN`` rows for assets
+            without a correlation).
+        idiosyncratic: Diagonal term of length ``n``.
+        mu_row: Expected returns for every asset at the timestamp (NaNs tolerated).
+        index: Ascending integer positions of the tradable assets.
+        shrink: Identity-shrinkage weight in ``[0, 1]``.
+
+    Returns:
+        np.ndarray: The normalised risk position over ``index``; ``NaN`` for assets
+            without a correlation, as the dense path leaves them.
+
+    Example:
+        >>> import numpy as np
+        >>> from tinycta._kernel import _factor_risk_position, _risk_position
+        >>> loadings = np.array([[0.8], [0.6], [np.nan]])
+        >>> idiosyncratic = np.array([0.36, 0.64, np.nan])
+        >>> _factor_risk_position(loadings, idiosyncratic, np.array([1.0, 0.0, 1.0]), np.arange(3), 0.5).round(4)
+        array([ 1.0301, -0.2472,     nan])
+        >>> corr = loadings[:2] @ loadings[:2].T + np.diag(idiosyncratic[:2])
+        >>> _risk_position(corr, np.array([1.0, 0.0]), np.ones(2, dtype=bool), 0.5).round(4)
+        array([ 1.0301, -0.2472])
+    """
+    out = np.full(len(index), np.nan)
+    live = np.isfinite(idiosyncratic[index])
+    index = index[live]
+    factor = loadings[index] * np.sqrt(shrink)
+    diagonal = shrink * idiosyncratic[index] + (1.0 - shrink)
+    expected_mu = np.nan_to_num(mu_row[index])
+    if np.allclose(expected_mu, 0.0):
+        out[live] = 0.0
+        return out
+
+    scaled = factor / diagonal[:, None]
+    capacitance = np.eye(factor.shape[1]) + factor.T @ scaled
+    y = expected_mu / diagonal
+    solution = y - scaled @ np.linalg.solve(capacitance, factor.T @ y)
+    denom = float(np.sqrt(expected_mu @ solution))
+    out[live] = 0.0 if not np.isfinite(denom) or _denominator_is_degenerate(denom) else solution / denom
+    return out
+
+
+def _solve_factor_risk_positions(
+    loadings: np.ndarray,
+    idiosyncratic: np.ndarray,
+    rows: np.ndarray,
+    prices_num: np.ndarray,
+    mu: np.ndarray,
+    shrink: float,
+) -> np.ndarray:
+    """Phase one of the walk for a factor-model correlation (see :func:`_factor_risk_position`).
+
+    Args:
+        loadings: Factor loadings of shape ``(len(rows), assets, k)``.
+        idiosyncratic: Diagonal terms of shape ``(len(rows), assets)``.
+        rows: Row index into ``prices_num``/``mu`` of each date in ``loadings``.
+        prices_num: Asset prices as a ``(rows, assets)`` array (NaNs tolerated).
+        mu: Expected returns aligned to ``prices_num``.
+        shrink: Identity-shrinkage weight in ``[0, 1]``.
+
+    Returns:
+        np.ndarray: A ``(len(rows), assets)`` array of unscaled risk positions,
+            laid out as :func:`_solve_risk_positions` returns them.
+    """
+    raw = np.full((len(rows), prices_num.shape[1]), np.nan)
+    for start, stop, index in _mask_runs(np.isfinite(prices_num[rows])):
+        if len(index) == 0:
+            continue
+        for i in range(start, stop):
+            raw[i, index] = _factor_risk_position(loadings[i], idiosyncratic[i], mu[rows[i]], index, shrink)
+    return raw
+
+
+def _scale_risk_positions(
+    raw: np.ndarray,
+    rows: np.ndarray,
+    prices_num: np.ndarray,
+    returns_num: np.ndarray,
+    vola_np: np.ndarray,
+    risk_pos_np: np.ndarray,
+    cash_pos_np: np.ndarray,
+    solved: np.ndarray | None = None,
+) -> None:
+    """Scale pre-solved risk positions by the running profit variance (phase two of the walk).
+
+    A single sequential pass: the previous period's realised P&L EWMA-updates the
+    profit-variance estimate (decay ``lamb=0.99``), which divides the unscaled risk
+    position before per-asset volatility converts it into a cash position.
+
+    With ``solved`` given, only the dates it marks are rebalanced. Every other
+    date carries the cash position of the last rebalance forward (``NaN`` before
+    the first one, and for an asset that had no position then), while its P&L
+    still updates the profit variance.
+
+    Args:
+        raw: Unscaled risk positions from :func:`_solve_risk_positions`; rows not
+            marked in ``solved`` are not read.
+        rows: Row index of each row of ``raw``, in walk order.
+        prices_num: Asset prices as a ``(rows, assets)`` array (NaNs tolerated).
+        returns_num: Simple returns aligned to ``prices_num``.
+        vola_np: Per-asset EWMA volatility aligned to ``prices_num``.
+        risk_pos_np: Output risk-position buffer, mutated in place.
+        cash_pos_np: Output cash-position buffer, mutated in place.
+        solved: Optional boolean mask over ``rows`` of the rebalance dates.
+
+    Example:
+        >>> import numpy as np
+        >>> from tinycta._kernel import _scale_risk_positions
+        >>> prices = np.array([[100.0], [101.0], [102.0]])
+        >>> returns = np.array([[0.0], [0.01], [0.0099]])
+        >>> risk, cash = np.full((3, 1), np.nan), np.full((3, 1), np.nan)
+        >>> raw = np.array([[1.0], [np.nan], [1.0]])
+        >>> solved = np.array([True, False, True])
+        >>> _scale_risk_positions(raw, np.arange(3), prices, returns, np.full((3, 1), 0.5), risk, cash, solved)
+
+        The middle date holds the first date's cash position; the last one
+        rebalances under the profit variance the carried position earned:
+
+        >>> cash.ravel().round(4)
+        array([2.    , 2.    , 2.0406])
+    """
+    profit_variance = 1.0
+    lamb = _PROFIT_VARIANCE_DECAY
+
+    valid = np.isfinite(prices_num[rows])
+    held = np.full(prices_num.shape[1], np.nan, dtype=cash_pos_np.dtype)
+    prev_row: int | None = None
+    prev_carried = False
+    for i, row in enumerate(rows):
+        mask = valid[i]
+        rebalance = solved is None or bool(solved[i])
+
+        if prev_row is not None:
+            ret_mask = np.isfinite(returns_num[row]) & mask
+            if ret_mask.any():
+                if not prev_carried:
+                    cash_pos_np[prev_row] = risk_pos_np[prev_row] / vola_np[prev_row]
+                profit_variance = _update_profit_variance(
+                    profit_variance, cash_pos_np[prev_row], returns_num[row], ret_mask, lamb
+                )
+
+        if mask.any():
+            if rebalance:
+                risk_pos_np[row, mask] = raw[i, mask] / profit_variance
+                cash_pos_np[row, mask] = risk_pos_np[row, mask] / vola_np[row, mask]
+                if solved is not None:
+                    held = cash_pos_np[row].copy()
+            else:
+                cash_pos_np[row, mask] = held[mask]
+                risk_pos_np[row, mask] = held[mask] * vola_np[row, mask]
+
+        prev_row = row
+        prev_carried = not rebalance
+
+
 def forward_walk(
-    cor: dict[Hashable, np.ndarray],
+    cor: np.ndarray,
+    rows: np.ndarray,
     prices_num: np.ndarray,
     returns_num: np.ndarray,
     mu: np.ndarray,
     vola_np: np.ndarray,
     risk_pos_np: np.ndarray,
     cash_pos_np: np.ndarray,
-    row_of: dict[Hashable, int],
     shrink: float,
+    workers: int = 1,
 ) -> None:
     """Walk forward through the post-warmup timestamps, filling positions in place.
 
@@ -163,16 +1175,27 @@ def forward_walk(
     (decay ``lamb=0.99``), which scales the freshly-solved risk position before it is
     divided by per-asset volatility to yield the cash position.
 
+    The walk runs in two phases. The solves do not depend on the profit variance, so
+    :func:`_solve_risk_positions` first computes every timestamp's unscaled risk
+    position as one batch; :func:`_scale_risk_positions` then applies the scalar
+    profit-variance recursion in a single sequential pass. Only the first phase
+    is spread over ``workers`` threads.
+
     Args:
-        cor: Per-timestamp correlation matrices, keyed by ``date`` value.
+        cor: Correlation cube of shape ``(len(rows), assets, assets)`` (see
+            :class:`~tinycta.ewm_cov.CorrelationCube`).
+        rows: Ascending row index into the other arrays of each matrix in ``cor``.
         prices_num: Asset prices as a ``(rows, assets)`` array (NaNs tolerated).
         returns_num: Simple returns aligned to ``prices_num``.
         mu: Expected returns aligned to ``prices_num``.
         vola_np: Per-asset EWMA volatility aligned to ``prices_num``.
+
+            These four may be any array-like, such as a :class:`~tinycta.panel.Panel`,
+            whose buffer is then read without a copy.
         risk_pos_np: Output risk-position buffer, mutated in place.
         cash_pos_np: Output cash-position buffer, mutated in place.
-        row_of: Map from a ``cor`` key back to its row index.
         shrink: Identity-shrinkage weight in ``[0, 1]`` passed to :func:`_risk_position`.
+        workers: Number of threads for the solves (see :func:`_solve_risk_positions`).
 
     Example:
         >>> import numpy as np
@@ -185,13 +1208,12 @@ def forward_walk(
         >>> risk_pos = np.full((3, 2), np.nan)
         >>> cash_pos = np.full((3, 2), np.nan)
 
-        Only rows named by ``cor`` are walked; here the first row is warmup and is
+        Only rows named by ``rows`` are walked; here the first row is warmup and is
         left untouched. The function returns nothing and writes into the buffers:
 
         >>> forward_walk(
-        ...     {1: np.eye(2), 2: np.eye(2)},
+        ...     np.stack([np.eye(2), np.eye(2)]), np.array([1, 2]),
         ...     prices, returns, mu, vola, risk_pos, cash_pos,
-        ...     row_of={1: 1, 2: 2},
         ...     shrink=1.0,
         ... ) is None
         True
@@ -212,25 +1234,6 @@ def forward_walk(
         >>> risk_pos[2].round(4)
         array([1.01, 0.  ])
     """
-    profit_variance = 1.0
-    lamb = 0.99
-
-    prev_row: int | None = None
-    for t in cor:
-        row = row_of[t]
-        mask = np.isfinite(prices_num[row])
-
-        if prev_row is not None:
-            ret_mask = np.isfinite(returns_num[row]) & mask
-            if ret_mask.any():
-                cash_pos_np[prev_row] = risk_pos_np[prev_row] / vola_np[prev_row]
-                profit_variance = _update_profit_variance(
-                    profit_variance, cash_pos_np[prev_row], returns_num[row], ret_mask, lamb
-                )
-
-        if mask.any():
-            pos = _risk_position(cor[t], mu[row], mask, shrink)
-            risk_pos_np[row, mask] = pos / profit_variance
-            cash_pos_np[row, mask] = risk_pos_np[row, mask] / vola_np[row, mask]
-
-        prev_row = row
+    prices_num, returns_num, mu, vola_np = (np.asarray(a) for a in (prices_num, returns_num, mu, vola_np))
+    raw = _solve_risk_positions(cor, rows, prices_num, mu, shrink, workers)
+    _scale_risk_positions(raw, rows, prices_num, returns_num, vola_np, risk_pos_np, cash_pos_np)
@@ -42,12 +42,22 @@ class Config(BaseModel):
         rejected ['vola']
         rejected ['shrink']
         rejected ['typo']
+
+        ``factors`` is optional. When set, the engine models each date's correlation
+        as that many factors plus a diagonal instead of a dense matrix (see
+        :func:`~tinycta.ewm_cov.ewm_factor_correlation`):
+
+        >>> Config(vola=32, corr=64, clip=4.2, shrink=0.5).factors is None
+        True
+        >>> Config(vola=32, corr=64, clip=4.2, shrink=0.5, factors=10).factors
+        10
     """
 
     vola: int = Field(..., gt=0)
     corr: int = Field(..., gt=0)
     clip: float = Field(..., gt=0.0)
     shrink: float = Field(..., ge=0.0, le=1.0)
+    factors: int | None = Field(None, gt=0)
 
     model_config = {"frozen": True, "extra": "forbid"}
 
@@ -9,24 +9,263 @@ EWMA correlation matrices, and hands the resulting NumPy arrays to the pure-nume
 from __future__ import annotations
 
 import dataclasses
-from collections.abc import Hashable
+import functools
+import hashlib
+import math
+import os
+from collections.abc import Callable, Collection, Hashable, Iterable, Mapping
+from pathlib import Path
+from typing import Any
 
 import numpy as np
 import polars as pl
 
+from . import _jit
+from ._kernel import (
+    _PROFIT_VARIANCE_DECAY,
+    _factorise_risk_systems,
+    _scale_risk_positions,
+    _solve_block_risk_positions,
+    _solve_factor_risk_positions,
+    _solve_factorised_risk_positions,
+    _solve_risk_positions,
+    _solve_risk_positions_batched,
+    _solve_risk_positions_for_shrinks,
+    _solve_risk_positions_for_signals,
+)
 from ._kernel import forward_walk as _forward_walk
 from .config import Config
-from .ewm_cov import ewm_covariance as _ewm_covariance
+from .ewm_cov import CorrelationCube, FactorCube
+from .ewm_cov import ewm_correlation as _ewm_correlation
+from .ewm_cov import ewm_factor_correlation as _ewm_factor_correlation
+from .panel import Panel
+from .solver import Batched, Blocks, Direct, Jit, Solver
 from .util import vol_adj as _vol_adj
 
 
+def _price(asset: str) -> pl.Expr:
+    """The asset's price column with ``NaN`` gaps read as nulls, which the EWMs skip rather than propagate."""
+    return pl.col(asset).fill_nan(None)
+
+
+def _ret_adj(prices: pl.DataFrame, assets: list[str], vola: int, clip: float) -> pl.LazyFrame:
+    """Plan for the per-asset EWMA-volatility-adjusted log returns clipped by ``clip``."""
+    return prices.lazy().with_columns([_vol_adj(_price(asset), vola=vola, clip=clip) for asset in assets])
+
+
+def _vola(prices: pl.DataFrame, assets: list[str], vola: int) -> pl.LazyFrame:
+    """Plan for the per-asset EWMA volatility of percentage returns."""
+    return prices.lazy().with_columns(
+        _price(asset).pct_change().ewm_std(com=vola - 1, adjust=True, min_samples=vola).alias(asset) for asset in assets
+    )
+
+
+def _market_arrays(prices: Panel, mu: Panel, dtype: type[np.floating[Any]] = np.float64) -> tuple[np.ndarray, ...]:
+    """Prices, simple returns and expected returns as ``(T, N)`` arrays of ``dtype``, read from the panels' buffers.
+
+    Panels already of ``dtype`` — the engine builds them that way — are used as
+    they are, so only the returns are a new buffer.
+    """
+    prices_num = prices.values.astype(dtype, copy=False)
+    returns_num = np.zeros_like(prices_num)
+    np.divide(prices_num[1:], prices_num[:-1], out=returns_num[1:])
+    returns_num[1:] -= 1.0
+    return prices_num, returns_num, mu.values.astype(dtype, copy=False)
+
+
+def _cash_positions(
+    cube: CorrelationCube,
+    market: tuple[np.ndarray, ...],
+    vola_np: np.ndarray,
+    shrink: float,
+    walk: Callable[..., None] = _forward_walk,
+) -> np.ndarray:
+    """Run the forward walk and return the ``(T, N)`` cash positions (``NaN`` in warmup)."""
+    prices_num, returns_num, mu = market
+    risk_pos_np = np.full_like(mu, fill_value=np.nan)
+    cash_pos_np = np.full_like(mu, fill_value=np.nan)
+    # ``cube.rows`` holds the post-warmup row of each matrix, so the correlation
+    # matrix for date ``t`` is paired with (and stored at) that same row rather
+    # than at a positional offset of ``corr`` rows — otherwise the most recent
+    # dates never receive a position.
+    walk(cube.matrices, cube.rows, prices_num, returns_num, mu, vola_np, risk_pos_np, cash_pos_np, shrink)
+    return cash_pos_np
+
+
+def _scaled_cash_positions(
+    raw: np.ndarray, cube: CorrelationCube | FactorCube, market: tuple[np.ndarray, ...], vola_np: np.ndarray
+) -> np.ndarray:
+    """Apply the profit-variance scan to already-solved risk positions ``raw``."""
+    prices_num, returns_num, mu = market
+    risk_pos_np = np.full_like(mu, fill_value=np.nan)
+    cash_pos_np = np.full_like(mu, fill_value=np.nan)
+    _scale_risk_positions(raw, cube.rows, prices_num, returns_num, vola_np, risk_pos_np, cash_pos_np)
+    return cash_pos_np
+
+
+def _block_cash_positions(
+    cube: CorrelationCube, market: tuple[np.ndarray, ...], vola_np: np.ndarray, shrink: float, labels: np.ndarray
+) -> np.ndarray:
+    """Cash positions from per-block solves against a block-diagonal correlation."""
+    prices_num, _, mu = market
+    raw = _solve_block_risk_positions(cube.matrices, cube.rows, prices_num, mu, shrink, labels)
+    return _scaled_cash_positions(raw, cube, market, vola_np)
+
+
+def _every_kth(rows: np.ndarray, walked: np.ndarray, k: int) -> np.ndarray:
+    """Mask over ``rows`` of every ``k``-th bar, counted from the first of the ``walked`` rows."""
+    first = walked[0] if len(walked) else 0
+    every: np.ndarray = (rows >= first) & ((rows - first) % k == 0)
+    return every
+
+
+def _rebalanced_cash_positions(
+    cube: CorrelationCube,
+    market: tuple[np.ndarray, ...],
+    vola_np: np.ndarray,
+    shrink: float,
+    solve: np.ndarray,
+    workers: int = 1,
+) -> np.ndarray:
+    """Cash positions solved only on the walked dates ``solve`` marks and carried forward in between.
+
+    The selected matrices are read from the cube one at a time, so a memory-mapped
+    cube is never gathered into a copy.
+    """
+    prices_num, returns_num, mu = market
+    dates = np.flatnonzero(solve)
+    raw = np.full((len(cube.rows), mu.shape[1]), np.nan, dtype=mu.dtype)
+    raw[dates] = _solve_risk_positions(cube.matrices, cube.rows[dates], prices_num, mu, shrink, workers, dates)
+    risk_pos_np = np.full_like(mu, fill_value=np.nan)
+    cash_pos_np = np.full_like(mu, fill_value=np.nan)
+    _scale_risk_positions(raw, cube.rows, prices_num, returns_num, vola_np, risk_pos_np, cash_pos_np, solve)
+    return cash_pos_np
+
+
+def _batched_cash_positions(
+    cube: CorrelationCube, market: tuple[np.ndarray, ...], vola_np: np.ndarray, shrink: float
+) -> np.ndarray:
+    """Cash positions from batched solves over runs of fully observed dates."""
+    prices_num, _, mu = market
+    raw = _solve_risk_positions_batched(cube.matrices, cube.rows, prices_num, mu, shrink)
+    return _scaled_cash_positions(raw, cube, market, vola_np)
+
+
+def _factor_cash_positions(
+    cube: FactorCube, market: tuple[np.ndarray, ...], vola_np: np.ndarray, shrink: float
+) -> np.ndarray:
+    """Cash positions from Woodbury solves against a factor-model correlation."""
+    prices_num, _, mu = market
+    raw = _solve_factor_risk_positions(cube.loadings, cube.idiosyncratic, cube.rows, prices_num, mu, shrink)
+    return _scaled_cash_positions(raw, cube, market, vola_np)
+
+
+def _with_positions(prices: pl.DataFrame, assets: list[str], cash_pos_np: np.ndarray) -> pl.DataFrame:
+    """Replace each asset column of ``prices`` with its column of ``cash_pos_np``.
+
+    The positions are laid out column-major once, so each asset's column is a
+    contiguous slice that polars adopts without copying; the frame replaces the
+    asset columns in place and keeps ``date`` and any other column of ``prices``.
+    """
+    columns = np.asfortranarray(cash_pos_np, dtype=np.float64)
+    return prices.with_columns(pl.Series(asset, columns[:, j]) for j, asset in enumerate(assets))
+
+
+def _ewm_memory(decay: float, tolerance: float) -> int:
+    """Bars after which an EWM of the given decay puts at most ``tolerance`` of its weight on older data."""
+    return math.ceil(math.log(tolerance) / math.log(decay))
+
+
+def warmup_bars(cfg: Config, tolerance: float = 1e-6) -> int:
+    """History to prepend to an output window so it matches a full-history run.
+
+    Each stage of the engine is an exponentially weighted average whose weight on
+    data older than ``L`` bars is at most ``decay**L``: the volatility estimates
+    (decay ``1 - 1/cfg.vola``), the correlations (decay ``1 - 1/(cfg.corr + 1)``)
+    and the profit variance (decay ``0.99``). The stages feed one another, so the
+    warm-up is the sum of the bars each needs to push that weight below
+    ``tolerance``, and at least the engine's own ``cfg.vola`` and ``cfg.corr``
+    samples.
+
+    The difference between the trimmed and the full run is driven by the
+    discarded weight rather than bounded by it exactly. On the engine's tests the
+    largest difference in a window's positions stays below ``tolerance`` times
+    the window's largest position.
+
+    Args:
+        cfg: Engine configuration.
+        tolerance: Largest EWM weight any stage may put on discarded history, in ``(0, 1)``.
+
+    Returns:
+        int: Number of bars of history to keep before the first output date.
+
+    Raises:
+        ValueError: If ``tolerance`` is not in ``(0, 1)``.
+
+    Example:
+        >>> from tinycta.config import Config
+        >>> from tinycta.engine import warmup_bars
+        >>> cfg = Config(vola=16, corr=32, clip=4.2, shrink=0.5)
+        >>> warmup_bars(cfg, tolerance=1e-2), warmup_bars(cfg, tolerance=1e-4)
+        (682, 1361)
+    """
+    if not 0.0 < tolerance < 1.0:
+        msg = f"tolerance must lie in (0, 1), got {tolerance}"
+        raise ValueError(msg)
+    vola = max(_ewm_memory(1.0 - 1.0 / cfg.vola, tolerance), cfg.vola)
+    corr = max(_ewm_memory(1.0 - 1.0 / (cfg.corr + 1), tolerance), cfg.corr)
+    return 1 + vola + corr + _ewm_memory(_PROFIT_VARIANCE_DECAY, tolerance)
+
+
 @dataclasses.dataclass(frozen=True)
 class Engine:
-    """Correlation-aware risk position optimizer (Basanos engine)."""
+    """Correlation-aware risk position optimizer (Basanos engine).
+
+    The derived values :attr:`ret_adj`, :attr:`vola`, :attr:`cor_cube`, :attr:`cor`
+    and :attr:`cash_position` are computed on first access and memoised on the
+    instance, so later accesses (and :attr:`cash_position`'s own use of
+    :attr:`cor_cube` and :attr:`vola`) reuse them. :meth:`clear_cache` drops them to
+    free memory. :attr:`ret_adj` and :attr:`vola` are collected together from one
+    lazy plan over :attr:`prices`.
+
+    Setting ``cor_store`` to a directory keeps :attr:`cor_cube` in a memory-mapped
+    file there instead of in memory (see :func:`~tinycta.ewm_cov.ewm_correlation`);
+    the forward walk then pages in one matrix at a time, and a later engine over
+    the same prices and config maps the existing file instead of recomputing it.
+
+    With ``cfg.factors`` set, :attr:`cash_position` is solved against
+    :attr:`factor_cube` — each date's correlation modelled as that many factors
+    plus a diagonal — in ``O(N k²)`` per date, and the dense :attr:`cor_cube` is
+    never built unless accessed.
+
+    ``solver`` picks how the dense walk runs (see :mod:`tinycta.solver`):
+    :class:`~tinycta.solver.Direct`, the default, factorises each date on its own
+    and takes a rebalance schedule, single precision and threads as options;
+    :class:`~tinycta.solver.Blocks` solves a block-diagonal correlation block by
+    block; :class:`~tinycta.solver.Jit` and :class:`~tinycta.solver.Batched` cut
+    interpreter overhead with a compiled loop and batched factorisations. With
+    ``cfg.factors`` set the walk is the factor model's and ``solver`` must be the
+    default ``Direct()``.
+
+    Example:
+        >>> import polars as pl
+        >>> from tinycta.config import Config
+        >>> from tinycta.engine import Engine
+        >>> prices = pl.DataFrame({"date": [1, 2, 3, 4], "A": [100.0, 101.0, 100.5, 102.0]})
+        >>> engine = Engine(prices=prices, mu=prices, cfg=Config(vola=2, corr=2, clip=4.2, shrink=0.5))
+        >>> engine.cor is engine.cor
+        True
+        >>> cor = engine.cor
+        >>> engine.clear_cache()
+        >>> engine.cor is cor
+        False
+    """
 
     prices: pl.DataFrame
     mu: pl.DataFrame
     cfg: Config
+    cor_store: str | os.PathLike[str] | None = None
+    solver: Solver = dataclasses.field(default_factory=Direct)
 
     def __post_init__(self) -> None:
         """Validate that prices and mu are aligned and both contain a date column."""
@@ -42,38 +281,244 @@ class Engine:
         if set(self.prices.columns) != set(self.mu.columns):
             msg = "prices and mu must share identical columns"
             raise ValueError(msg)
+        if not isinstance(self.solver, Direct | Blocks | Jit | Batched):
+            msg = f"solver must be Direct, Blocks, Jit or Batched, got {self.solver!r}"
+            raise TypeError(msg)
+        if self.cfg.factors is not None and not (isinstance(self.solver, Direct) and self.solver.is_default):
+            msg = f"cfg.factors walks the factor model, which takes the default Direct() solver, got {self.solver!r}"
+            raise ValueError(msg)
+        if isinstance(self.solver, Blocks):
+            missing = [asset for asset in self.assets if asset not in self.solver.labels]
+            if missing:
+                msg = f"blocks must assign every asset, missing {missing}"
+                raise ValueError(msg)
+        if isinstance(self.solver, Direct) and not isinstance(self.solver.rebalance, int | None):
+            # A bar count was checked by Direct; its mask needs the walked rows, so it is built lazily.
+            _ = self.rebalance_dates
+
+    @functools.cached_property
+    def rebalance_dates(self) -> np.ndarray:
+        """Boolean mask over the rows of :attr:`prices` of the dates ``solver.rebalance`` selects.
+
+        The :class:`~tinycta.solver.Direct` solver's ``rebalance`` may be an
+        integer ``k`` (every ``k``-th bar, counted from the first bar the walk
+        reaches), a boolean polars expression over :attr:`prices` such as
+        ``pl.col("date").dt.weekday() == 5``, or a collection of values of the
+        ``date`` column. Without a schedule, and for the other solvers, every row
+        is selected.
+
+        Raises:
+            ValueError: If the expression is not boolean or a listed date is not
+                in :attr:`prices`.
+
+        Example:
+            >>> import polars as pl
+            >>> from tinycta.config import Config
+            >>> from tinycta.engine import Engine
+            >>> from tinycta.solver import Direct
+            >>> prices = pl.DataFrame({"date": [1, 2, 3, 4, 5], "A": [100.0, 101.0, 100.5, 102.0, 101.0]})
+            >>> cfg = Config(vola=2, corr=2, clip=4.2, shrink=0.5)
+            >>> Engine(prices=prices, mu=prices, cfg=cfg, solver=Direct(rebalance=[2, 5])).rebalance_dates
+            array([False,  True, False, False,  True])
+            >>> weekly = Direct(rebalance=pl.col("date") % 2 == 1)
+            >>> Engine(prices=prices, mu=prices, cfg=cfg, solver=weekly).rebalance_dates
+            array([ True, False,  True, False,  True])
+        """
+        rebalance = self.solver.rebalance if isinstance(self.solver, Direct) else None
+        if rebalance is None:
+            return np.ones(self.prices.height, dtype=bool)
+        if isinstance(rebalance, pl.Expr):
+            selected = self.prices.select(rebalance).to_series()
+            if selected.dtype != pl.Boolean:
+                msg = f"a rebalance expression must be boolean, got {selected.dtype}"
+                raise ValueError(msg)
+            mask: np.ndarray = selected.fill_null(False).to_numpy()
+            return mask
+        if isinstance(rebalance, int):
+            return _every_kth(np.arange(self.prices.height), self.cor_cube.rows, rebalance)
+        dates = list(rebalance)
+        mask = self.prices["date"].is_in(dates).to_numpy()
+        missing = set(dates) - set(self.prices["date"].filter(mask).to_list())
+        if missing:
+            msg = f"rebalance dates not in prices: {sorted(missing)}"
+            raise ValueError(msg)
+        return mask
+
+    def clear_cache(self) -> None:
+        """Drop every memoised intermediate so the next access recomputes it."""
+        for name, attr in vars(type(self)).items():
+            if isinstance(attr, functools.cached_property):
+                self.__dict__.pop(name, None)
+
+    @classmethod
+    def from_panels(cls, prices: Panel, mu: Panel, cfg: Config, **kwargs: Any) -> Engine:
+        """Build an engine from panels, reusing their buffers rather than converting frames.
+
+        The frames :attr:`prices` and :attr:`mu` are built from the panels without
+        copying, and the panels themselves become :attr:`price_panel` and
+        :attr:`mu_panel`.
+
+        Args:
+            prices: Prices as a :class:`~tinycta.panel.Panel`.
+            mu: Expected returns over the same dates and assets.
+            cfg: Engine configuration.
+            **kwargs: Any other :class:`Engine` field, such as ``cor_store`` or ``solver``.
+
+        Returns:
+            Engine: An engine over the panels' data.
+
+        Raises:
+            ValueError: If the panels do not share their assets, or fail the
+                validation of :class:`Engine`.
+
+        Example:
+            >>> import polars as pl
+            >>> from tinycta.config import Config
+            >>> from tinycta.engine import Engine
+            >>> from tinycta.panel import Panel
+            >>> frame = pl.DataFrame({"date": [1, 2, 3, 4], "A": [100.0, 101.0, 100.5, 102.0]})
+            >>> panel = Panel.from_frame(frame)
+            >>> engine = Engine.from_panels(panel, panel, Config(vola=2, corr=2, clip=4.2, shrink=0.5))
+            >>> engine.price_panel is panel
+            True
+        """
+        if prices.assets != mu.assets:
+            msg = f"prices and mu panels must share their assets, got {prices.assets} and {mu.assets}"
+            raise ValueError(msg)
+        engine = cls(prices=prices.to_frame(), mu=mu.to_frame(), cfg=cfg, **kwargs)
+        if prices.values.dtype == mu.values.dtype == engine._dtype:
+            engine.__dict__.update(price_panel=prices, mu_panel=mu)
+        return engine
+
+    @functools.cached_property
+    def price_panel(self) -> Panel:
+        """:attr:`prices`' numeric columns as a :class:`~tinycta.panel.Panel`, in the walk's precision."""
+        return Panel.from_frame(self.prices, dtype=self._dtype)
+
+    @functools.cached_property
+    def mu_panel(self) -> Panel:
+        """:attr:`mu` as a :class:`~tinycta.panel.Panel` with the assets of :attr:`price_panel`."""
+        return Panel.from_frame(self.mu, self.price_panel.assets, dtype=self._dtype)
 
     @property
     def assets(self) -> list[str]:
         """List numeric asset column names, excluding the date column."""
-        return [c for c in self.prices.columns if c != "date" and self.prices[c].dtype.is_numeric()]
+        return list(self.price_panel.assets)
 
     @property
+    def _dtype(self) -> type[np.floating[Any]]:
+        """NumPy type of the correlation cube and the walk's arrays under the solver's precision."""
+        return self.solver.dtype if isinstance(self.solver, Direct) else np.float64
+
+    @functools.cached_property
+    def _adjusted(self) -> tuple[pl.DataFrame, pl.DataFrame]:
+        """:attr:`ret_adj` and :attr:`vola`, collected together in one pass over :attr:`prices`.
+
+        Both plans start from the same frame, so ``pl.collect_all`` shares the read
+        of each column and evaluates the two sets of expressions in parallel.
+        """
+        plans = [
+            _ret_adj(self.prices, self.assets, self.cfg.vola, self.cfg.clip),
+            _vola(self.prices, self.assets, self.cfg.vola),
+        ]
+        ret_adj, vola = pl.collect_all(plans)
+        return ret_adj, vola
+
+    @functools.cached_property
     def ret_adj(self) -> pl.DataFrame:
         """Per-asset EWMA-volatility-adjusted log returns clipped by cfg.clip."""
-        return self.prices.with_columns(
-            [_vol_adj(pl.col(asset), vola=self.cfg.vola, clip=self.cfg.clip) for asset in self.assets]
-        )
+        return self._adjusted[0]
 
-    @property
+    @functools.cached_property
     def vola(self) -> pl.DataFrame:
         """Per-asset EWMA volatility of percentage returns."""
-        return self.prices.with_columns(
-            pl.col(asset)
-            .pct_change()
-            .ewm_std(com=self.cfg.vola - 1, adjust=True, min_samples=self.cfg.vola)
-            .alias(asset)
-            for asset in self.assets
+        return self._adjusted[1]
+
+    @functools.cached_property
+    def cor_cube(self) -> CorrelationCube:
+        """Per-timestamp EWMA correlation matrices as one contiguous ``(T, N, N)`` array.
+
+        ``matrices[i]`` is the correlation matrix at row ``rows[i]`` of
+        :attr:`prices`, so the forward walk indexes it by integer row with no
+        per-date allocation or hash lookup. :attr:`cor` is a date-keyed view of
+        the same buffer, and the warmup and ``NaN`` contract documented there
+        applies here too.
+
+        Example:
+            >>> import polars as pl
+            >>> from tinycta.config import Config
+            >>> from tinycta.engine import Engine
+            >>> prices = pl.DataFrame(
+            ...     {
+            ...         "date": list(range(1, 11)),
+            ...         "A": [100.0, 101.5, 100.8, 102.3, 103.1, 102.0, 104.5, 105.2, 104.1, 106.0],
+            ...         "B": [50.0, 49.2, 50.4, 49.8, 51.1, 50.3, 49.5, 50.8, 51.6, 50.9],
+            ...     }
+            ... )
+            >>> cube = Engine(prices=prices, mu=prices, cfg=Config(vola=3, corr=3, clip=4.2, shrink=0.5)).cor_cube
+            >>> cube.rows
+            array([4, 5, 6, 7, 8, 9])
+            >>> cube.matrices.shape
+            (6, 2, 2)
+        """
+        return _ewm_correlation(
+            self.ret_adj,
+            assets=self.assets,
+            window=2 * self.cfg.corr + 1,
+            warmup=self.cfg.corr,
+            store=self.cor_store,
+            dtype=self._dtype,
         )
 
-    @property
+    @functools.cached_property
+    def factor_cube(self) -> FactorCube:
+        """Per-timestamp EWMA correlations as ``cfg.factors`` factors plus a diagonal.
+
+        The low-rank counterpart of :attr:`cor_cube` over the same :attr:`ret_adj`,
+        window and warmup (see :func:`~tinycta.ewm_cov.ewm_factor_correlation`);
+        it needs ``O(N k)`` memory per date rather than ``O(N²)``.
+
+        Raises:
+            ValueError: If ``cfg.factors`` is not set.
+
+        Example:
+            >>> import polars as pl
+            >>> from tinycta.config import Config
+            >>> from tinycta.engine import Engine
+            >>> prices = pl.DataFrame(
+            ...     {
+            ...         "date": list(range(1, 11)),
+            ...         "A": [100.0, 101.5, 100.8, 102.3, 103.1, 102.0, 104.5, 105.2, 104.1, 106.0],
+            ...         "B": [50.0, 49.2, 50.4, 49.8, 51.1, 50.3, 49.5, 50.8, 51.6, 50.9],
+            ...     }
+            ... )
+            >>> cfg = Config(vola=3, corr=3, clip=4.2, shrink=0.5, factors=1)
+            >>> cube = Engine(prices=prices, mu=prices, cfg=cfg).factor_cube
+            >>> cube.rows
+            array([4, 5, 6, 7, 8, 9])
+            >>> cube.loadings.shape
+            (6, 2, 1)
+        """
+        if self.cfg.factors is None:
+            msg = "factor_cube requires cfg.factors to be set"
+            raise ValueError(msg)
+        return _ewm_factor_correlation(
+            self.ret_adj,
+            assets=self.assets,
+            window=2 * self.cfg.corr + 1,
+            factors=self.cfg.factors,
+            warmup=self.cfg.corr,
+        )
+
+    @functools.cached_property
     def cor(self) -> dict[Hashable, np.ndarray]:
         """Per-timestamp EWMA correlation matrices, keyed by index value.
 
         Each key is a value of the ``date`` column (a ``datetime.date`` in normal
         use, but any hashable index value such as an integer is supported, hence
         the ``Hashable`` key type). Each value is the EWMA covariance matrix at
-        that timestamp normalised to a correlation matrix (unit diagonal).
+        that timestamp normalised to a correlation matrix (unit diagonal). The
+        values are views into :attr:`cor_cube`, not separate allocations.
 
         Contract:
             - **Warmup:** the first ``cfg.corr + 1`` timestamps are omitted — a
@@ -129,24 +574,11 @@ class Engine:
             >>> round(float(flat_cor[0, 0]), 6)
             1.0
         """
-        cov = _ewm_covariance(
-            self.ret_adj,
-            assets=self.assets,
-            index_col="date",
-            window=2 * self.cfg.corr + 1,
-            warmup=self.cfg.corr,
-        )
-        result: dict[Hashable, np.ndarray] = {}
-        for k, mat in cov.items():
-            std = np.sqrt(np.abs(np.diag(mat)))
-            outer = np.outer(std, std)
-            # Divide only where the variance product is positive; zero-variance
-            # cells stay NaN. Computing ``mat / outer`` eagerly (before masking)
-            # would divide by zero on those cells and emit a spurious RuntimeWarning.
-            result[k] = np.divide(mat, outer, out=np.full(mat.shape, np.nan), where=outer > 0)
-        return result
+        cube = self.cor_cube
+        dates = self.prices["date"].to_list()
+        return {dates[row]: mat for row, mat in zip(cube.rows, cube.matrices, strict=True)}
 
-    @property
+    @functools.cached_property
     def cash_position(self) -> pl.DataFrame:
         """Correlation-shrinkage-optimized cash positions for each timestamp.
 
@@ -213,24 +645,388 @@ class Engine:
             >>> [v < 0 for v in positions["B"][4:]]
             [True, True, True, True, True, True]
         """
-        cor = self.cor
         assets = self.assets
+        market = _market_arrays(self.price_panel, self.mu_panel, self._dtype)
+        vola_np = Panel.from_frame(self.vola, assets, dtype=self._dtype).values
+        if self.cfg.factors is not None:
+            cash_pos_np = _factor_cash_positions(self.factor_cube, market, vola_np, self.cfg.shrink)
+        elif isinstance(self.solver, Blocks):
+            ids: dict[Hashable, int] = {}
+            labels = np.array([ids.setdefault(self.solver.labels[asset], len(ids)) for asset in assets])
+            cash_pos_np = _block_cash_positions(self.cor_cube, market, vola_np, self.cfg.shrink, labels)
+        elif isinstance(self.solver, Batched):
+            cash_pos_np = _batched_cash_positions(self.cor_cube, market, vola_np, self.cfg.shrink)
+        elif isinstance(self.solver, Jit):
+            cash_pos_np = _cash_positions(self.cor_cube, market, vola_np, self.cfg.shrink, walk=_jit.forward_walk)
+        elif self.solver.rebalance is not None:
+            walked = self.cor_cube.rows
+            if isinstance(self.solver.rebalance, int):
+                solve = _every_kth(walked, walked, self.solver.rebalance)
+            else:
+                solve = self.rebalance_dates[walked]
+            cash_pos_np = _rebalanced_cash_positions(
+                self.cor_cube, market, vola_np, self.cfg.shrink, solve, self.solver.workers
+            )
+        else:
+            walk = functools.partial(_forward_walk, workers=self.solver.workers)
+            cash_pos_np = _cash_positions(self.cor_cube, market, vola_np, self.cfg.shrink, walk=walk)
+        return _with_positions(self.prices, assets, cash_pos_np)
+
+    def cash_position_window(self, start: Any, end: Any = None, tolerance: float = 1e-6) -> pl.DataFrame:
+        """Cash positions for the dates from ``start`` to ``end``, from a trimmed history.
+
+        Only :func:`warmup_bars` rows before ``start`` are kept, so the cost scales
+        with the window rather than with the full history; the positions match
+        :attr:`cash_position` over the same dates to within ``tolerance`` relative to
+        the window's largest position (see :func:`warmup_bars`). Nothing of this
+        engine's cache is used or filled. A rebalance date list is restricted to
+        the trimmed history, and an expression is evaluated on it.
+
+        Args:
+            start: First output date (inclusive), comparable with the ``date`` column.
+            end: Last output date (inclusive); ``None`` runs to the end of the data.
+            tolerance: Warm-up tolerance passed to :func:`warmup_bars`.
+
+        Returns:
+            pl.DataFrame: The rows of :attr:`cash_position` dated within the window.
+
+        Raises:
+            ValueError: If the solver's ``rebalance`` counts bars, whose phase depends on where
+                the history starts.
+
+        Example:
+            >>> import numpy as np
+            >>> import polars as pl
+            >>> from tinycta.config import Config
+            >>> from tinycta.engine import Engine
+            >>> rng = np.random.default_rng(0)
+            >>> prices = pl.DataFrame(
+            ...     {"date": list(range(3000)), "A": 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 3000)))}
+            ... )
+            >>> engine = Engine(prices=prices, mu=prices, cfg=Config(vola=5, corr=10, clip=4.2, shrink=0.5))
+            >>> window = engine.cash_position_window(2900, tolerance=1e-4)
+            >>> window.height
+            100
+            >>> full = engine.cash_position.filter(pl.col("date") >= 2900)
+            >>> bool(np.allclose(window["A"], full["A"], rtol=1e-4))
+            True
+        """
+        dates = self.prices["date"]
+        inside = dates >= start if end is None else dates.is_between(start, end)
+        rows = np.flatnonzero(inside.to_numpy())
+        first = max(int(rows[0]) - warmup_bars(self.cfg, tolerance), 0) if len(rows) else 0
+        last = int(rows[-1]) + 1 if len(rows) else 0
+        solver = self.solver
+        if isinstance(solver, Direct) and isinstance(solver.rebalance, Collection):
+            kept = set(dates[first:last].to_list())
+            solver = dataclasses.replace(solver, rebalance=[date for date in solver.rebalance if date in kept])
+        elif isinstance(solver, Direct) and solver.rebalance is not None and not isinstance(solver.rebalance, pl.Expr):
+            msg = "cash_position_window cannot trim a rebalance schedule that counts bars"
+            raise ValueError(msg)
+        if len(rows) == 0:
+            return self.prices.clear()
+        trimmed = dataclasses.replace(self, prices=self.prices[first:last], mu=self.mu[first:last], solver=solver)
+        return trimmed.cash_position.slice(int(rows[0]) - first)
+
+
+def _factor_store_path(store: str | os.PathLike[str], prices: Panel, cfg: Config) -> Path:
+    """File in ``store`` for the Cholesky factors of ``prices`` under ``cfg``, named by a digest of both."""
+    digest = hashlib.sha256(f"{list(prices.assets)!r}|{cfg.vola}|{cfg.clip!r}|{cfg.corr}|{cfg.shrink!r}".encode())
+    digest.update(np.ascontiguousarray(prices.values).tobytes())
+    return Path(store) / f"{digest.hexdigest()[:32]}.factors.npy"
+
+
+@dataclasses.dataclass(frozen=True)
+class FactorisedEngine:
+    """Engine over fixed prices that keeps every date's factorisation for re-solves.
+
+    Everything :attr:`Engine.cash_position` computes before it reads ``mu`` — the
+    correlation cube and, for each date, the Cholesky factor of the shrunk
+    correlation over the tradable assets — is computed once, on first use, and
+    kept (see :attr:`factors`). :meth:`positions_for` then only performs two
+    triangular solves per date and the profit-variance scan, so iterating on a
+    signal no longer repeats the ``O(N³)`` factorisations. The positions are
+    bit-identical to ``Engine(prices, mu, cfg).cash_position``.
+
+    With ``cor_store`` set, both the correlation cube and the factors are kept as
+    memory-mapped files in that directory, named by a fingerprint of the inputs,
+    so a later session over the same prices and config maps them instead of
+    recomputing them.
+
+    Example:
+        >>> import polars as pl
+        >>> from tinycta.config import Config
+        >>> from tinycta.engine import Engine, FactorisedEngine
+        >>> dates = list(range(1, 11))
+        >>> prices = pl.DataFrame(
+        ...     {
+        ...         "date": dates,
+        ...         "A": [100.0, 101.5, 100.8, 102.3, 103.1, 102.0, 104.5, 105.2, 104.1, 106.0],
+        ...         "B": [50.0, 49.2, 50.4, 49.8, 51.1, 50.3, 49.5, 50.8, 51.6, 50.9],
+        ...     }
+        ... )
+        >>> cfg = Config(vola=3, corr=3, clip=4.2, shrink=0.5)
+        >>> engine = FactorisedEngine(prices=prices, cfg=cfg)
+        >>> mu = pl.DataFrame({"date": dates, "A": [0.1] * 10, "B": [-0.05] * 10})
+        >>> engine.positions_for(mu).equals(Engine(prices=prices, mu=mu, cfg=cfg).cash_position)
+        True
+    """
+
+    prices: pl.DataFrame
+    cfg: Config
+    cor_store: str | os.PathLike[str] | None = None
+
+    def __post_init__(self) -> None:
+        """Validate the prices as :class:`Engine` does; factor-model configs have no dense factors."""
+        if self.cfg.factors is not None:
+            msg = "FactorisedEngine factorises the dense correlation; cfg.factors must be None"
+            raise ValueError(msg)
+        _ = self._engine
+
+    @functools.cached_property
+    def _engine(self) -> Engine:
+        """The :class:`Engine` whose ``mu``-independent intermediates this one shares."""
+        return Engine(prices=self.prices, mu=self.prices, cfg=self.cfg, cor_store=self.cor_store)
+
+    @property
+    def assets(self) -> list[str]:
+        """List numeric asset column names, excluding the date column."""
+        return self._engine.assets
+
+    @functools.cached_property
+    def factors(self) -> np.ndarray:
+        """Per-date Cholesky factors of the shrunk, masked correlation matrices.
+
+        An array shaped like :attr:`Engine.cor_cube`'s matrices whose ``i``-th
+        slice holds, in its leading ``k x k`` block, the lower factor over that
+        date's ``k`` tradable assets (``NaN`` in the corner where a date has none;
+        see :func:`~tinycta._kernel._factorise_risk_systems`). A read-only
+        ``np.memmap`` when ``cor_store`` is given.
+        """
+        cube = self._engine.cor_cube
+        prices_num = self._engine.price_panel.values
+        if self.cor_store is None:
+            factors = np.empty(cube.matrices.shape)
+            _factorise_risk_systems(cube.matrices, cube.rows, prices_num, self.cfg.shrink, factors)
+            return factors
+
+        path = _factor_store_path(self.cor_store, self._engine.price_panel, self.cfg)
+        if not path.exists():
+            partial = path.with_suffix(f".{os.getpid()}.partial.npy")
+            mapped = np.lib.format.open_memmap(partial, mode="w+", dtype=np.float64, shape=cube.matrices.shape)
+            _factorise_risk_systems(cube.matrices, cube.rows, prices_num, self.cfg.shrink, mapped)
+            mapped.flush()
+            del mapped
+            os.replace(partial, path)
+        stored: np.ndarray = np.load(path, mmap_mode="r")
+        return stored
+
+    def positions_for(self, mu: pl.DataFrame) -> pl.DataFrame:
+        """Cash positions for ``mu`` from the stored factors.
+
+        Args:
+            mu: Expected returns aligned with :attr:`prices`, as for :class:`Engine`.
+
+        Returns:
+            pl.DataFrame: ``Engine(prices, mu, cfg).cash_position``, bit for bit.
+
+        Raises:
+            ValueError: If ``mu`` fails :class:`Engine`'s validation against :attr:`prices`.
+        """
+        engine = Engine(prices=self.prices, mu=mu, cfg=self.cfg)
+        assets = self.assets
+        cube = self._engine.cor_cube
+        market = _market_arrays(self._engine.price_panel, engine.mu_panel)
+        prices_num, _, mu_num = market
+        raw = _solve_factorised_risk_positions(
+            self.factors, cube.matrices, cube.rows, prices_num, mu_num, self.cfg.shrink
+        )
+        vola_np = Panel.from_frame(self._engine.vola, assets).values
+        return _with_positions(self.prices, assets, _scaled_cash_positions(raw, cube, market, vola_np))
+
+
+def sweep(
+    prices: pl.DataFrame,
+    mu: pl.DataFrame,
+    configs: Iterable[Config],
+    cor_store: str | os.PathLike[str] | None = None,
+    eigh: bool = False,
+) -> dict[Config, pl.DataFrame]:
+    """Compute :attr:`Engine.cash_position` for many configs, sharing intermediates.
+
+    Each stage of the engine depends on only part of the config: :attr:`Engine.ret_adj`
+    on ``(vola, clip)``, :attr:`Engine.vola` on ``vola``, the correlation cube on
+    ``(vola, clip, corr)`` (plus ``factors`` for a factor-model config) and the
+    solves on ``shrink``. The configs are grouped accordingly, so every distinct
+    intermediate is computed exactly once, and only one correlation cube is held
+    at a time.
+
+    With ``eigh=True`` the configs sharing a correlation cube but differing in
+    ``shrink`` are solved together: each date's correlation matrix is
+    eigendecomposed once and every shrink becomes a diagonal rescale (see
+    :func:`~tinycta._kernel._solve_risk_positions_for_shrinks`). The positions
+    then agree with :class:`Engine`'s to rounding rather than bit for bit.
+
+    Args:
+        prices: Price frame with a ``date`` column, as for :class:`Engine`.
+        mu: Expected returns aligned with ``prices``.
+        configs: Configurations to evaluate; duplicates are evaluated once.
+        cor_store: Optional directory of memory-mapped correlation cubes, as for
+            :class:`Engine`.
+        eigh: Solve all shrinks of a cube from one eigendecomposition per date.
+
+    Returns:
+        dict[Config, pl.DataFrame]: The cash positions of each distinct config, in
+            first-seen order, identical to ``Engine(prices, mu, cfg).cash_position``
+            (to rounding with ``eigh=True``).
+
+    Raises:
+        ValueError: If ``prices`` and ``mu`` fail :class:`Engine`'s validation.
+
+    Example:
+        >>> import numpy as np
+        >>> import polars as pl
+        >>> from tinycta.config import Config
+        >>> from tinycta.engine import Engine, sweep
+        >>> prices = pl.DataFrame(
+        ...     {
+        ...         "date": list(range(1, 11)),
+        ...         "A": [100.0, 101.5, 100.8, 102.3, 103.1, 102.0, 104.5, 105.2, 104.1, 106.0],
+        ...         "B": [50.0, 49.2, 50.4, 49.8, 51.1, 50.3, 49.5, 50.8, 51.6, 50.9],
+        ...     }
+        ... )
+        >>> mu = pl.DataFrame({"date": list(range(1, 11)), "A": [0.1] * 10, "B": [-0.05] * 10})
+        >>> configs = [Config(vola=3, corr=3, clip=4.2, shrink=s) for s in (0.0, 0.5, 1.0)]
+        >>> positions = sweep(prices, mu, configs)
+        >>> list(positions) == configs
+        True
+        >>> positions[configs[1]].equals(Engine(prices=prices, mu=mu, cfg=configs[1]).cash_position)
+        True
+        >>> fast = sweep(prices, mu, configs, eigh=True)
+        >>> bool(np.allclose(fast[configs[1]]["A"], positions[configs[1]]["A"], equal_nan=True))
+        True
+    """
+    unique = list(dict.fromkeys(configs))
+    if not unique:
+        return {}
+    engine = Engine(prices=prices, mu=mu, cfg=unique[0], cor_store=cor_store)
+    assets = engine.assets
+
+    # (vola, clip) -> (corr, factors) -> configs, preserving first-seen order at every level.
+    groups: dict[tuple[int, float], dict[tuple[int, int | None], list[Config]]] = {}
+    for cfg in unique:
+        groups.setdefault((cfg.vola, cfg.clip), {}).setdefault((cfg.corr, cfg.factors), []).append(cfg)
+
+    market = _market_arrays(engine.price_panel, engine.mu_panel)
+    volas: dict[int, np.ndarray] = {}
+    positions: dict[Config, pl.DataFrame] = {}
+    for (vola, clip), by_corr in groups.items():
+        # The first group of each vola collects its volatility in the same pass.
+        plans = [_ret_adj(prices, assets, vola, clip)]
+        if vola not in volas:
+            plans.append(_vola(prices, assets, vola))
+        ret_adj, *rest = pl.collect_all(plans)
+        if rest:
+            volas[vola] = Panel.from_frame(rest[0], assets).values
+        for (corr, factors), group in by_corr.items():
+            if factors is not None:
+                factor_cube = _ewm_factor_correlation(
+                    ret_adj, assets=assets, window=2 * corr + 1, factors=factors, warmup=corr
+                )
+                for cfg in group:
+                    cash = _factor_cash_positions(factor_cube, market, volas[vola], cfg.shrink)
+                    positions[cfg] = _with_positions(prices, assets, cash)
+                continue
+            cube = _ewm_correlation(ret_adj, assets=assets, window=2 * corr + 1, warmup=corr, store=cor_store)
+            if eigh and len(group) > 1:
+                prices_num, _, mu_num = market
+                shrinks = np.array([cfg.shrink for cfg in group])
+                raws = _solve_risk_positions_for_shrinks(cube.matrices, cube.rows, prices_num, mu_num, shrinks)
+                for cfg, raw in zip(group, raws, strict=True):
+                    cash = _scaled_cash_positions(raw, cube, market, volas[vola])
+                    positions[cfg] = _with_positions(prices, assets, cash)
+                continue
+            for cfg in group:
+                positions[cfg] = _with_positions(prices, assets, _cash_positions(cube, market, volas[vola], cfg.shrink))
+    return {cfg: positions[cfg] for cfg in unique}
+
+
+def sweep_signals(
+    prices: pl.DataFrame,
+    mus: Mapping[Hashable, pl.DataFrame],
+    cfg: Config,
+    cor_store: str | os.PathLike[str] | None = None,
+) -> dict[Hashable, pl.DataFrame]:
+    """Compute :attr:`Engine.cash_position` for many signals against one set of prices.
+
+    :attr:`Engine.ret_adj`, :attr:`Engine.vola` and the correlation cube depend on
+    ``prices`` and ``cfg`` only, so they are computed once for all signals. Each
+    date's shrunk correlation is then factorised once and every signal is a
+    right-hand side of that factor (see
+    :func:`~tinycta._kernel._solve_risk_positions_for_signals`); each signal keeps
+    its own profit-variance scaling. With ``cfg.factors`` set the factor cube is
+    shared the same way and each signal takes its own Woodbury solves.
+
+    Args:
+        prices: Price frame with a ``date`` column, as for :class:`Engine`.
+        mus: Expected-return frames keyed by signal name, each aligned with ``prices``.
+        cfg: Configuration shared by every signal.
+        cor_store: Optional directory of memory-mapped correlation cubes, as for
+            :class:`Engine`.
 
-        prices_num = self.prices.select(assets).to_numpy()
-        returns_num = np.zeros_like(prices_num, dtype=float)
-        returns_num[1:] = prices_num[1:] / prices_num[:-1] - 1.0
+    Returns:
+        dict[Hashable, pl.DataFrame]: The cash positions of each signal, keyed and
+            ordered as ``mus``, equal to ``Engine(prices, mu, cfg).cash_position``
+            to rounding.
 
-        mu = self.mu.select(assets).to_numpy()
-        risk_pos_np = np.full_like(mu, fill_value=np.nan, dtype=float)
-        cash_pos_np = np.full_like(mu, fill_value=np.nan, dtype=float)
-        vola_np = self.vola.select(assets).to_numpy()
+    Raises:
+        ValueError: If ``prices`` and any frame of ``mus`` fail :class:`Engine`'s validation.
 
-        # ``cor`` is keyed by the post-warmup dates. Map each key back to its row
-        # in prices/mu/vola so the correlation matrix for date ``t`` is paired with
-        # (and stored at) that same date, rather than at a positional offset of
-        # ``corr`` rows — otherwise the most recent dates never receive a position.
-        row_of = {date: idx for idx, date in enumerate(self.prices["date"].to_list())}
+    Example:
+        >>> import numpy as np
+        >>> import polars as pl
+        >>> from tinycta.config import Config
+        >>> from tinycta.engine import Engine, sweep_signals
+        >>> prices = pl.DataFrame(
+        ...     {
+        ...         "date": list(range(1, 11)),
+        ...         "A": [100.0, 101.5, 100.8, 102.3, 103.1, 102.0, 104.5, 105.2, 104.1, 106.0],
+        ...         "B": [50.0, 49.2, 50.4, 49.8, 51.1, 50.3, 49.5, 50.8, 51.6, 50.9],
+        ...     }
+        ... )
+        >>> mus = {
+        ...     "fast": pl.DataFrame({"date": list(range(1, 11)), "A": [0.1] * 10, "B": [-0.05] * 10}),
+        ...     "slow": pl.DataFrame({"date": list(range(1, 11)), "A": [0.02] * 10, "B": [0.03] * 10}),
+        ... }
+        >>> cfg = Config(vola=3, corr=3, clip=4.2, shrink=0.5)
+        >>> positions = sweep_signals(prices, mus, cfg)
+        >>> list(positions)
+        ['fast', 'slow']
+        >>> expected = Engine(prices=prices, mu=mus["slow"], cfg=cfg).cash_position
+        >>> bool(np.allclose(positions["slow"]["B"], expected["B"], equal_nan=True))
+        True
+    """
+    engines = {name: Engine(prices=prices, mu=mu, cfg=cfg, cor_store=cor_store) for name, mu in mus.items()}
+    if not engines:
+        return {}
+    first = next(iter(engines.values()))
+    assets = first.assets
+    prices_num, returns_num, _ = _market_arrays(first.price_panel, first.mu_panel)
+    stacked = np.stack([engine.mu_panel.values for engine in engines.values()])
+    vola_np = Panel.from_frame(first.vola, assets).values
 
-        _forward_walk(cor, prices_num, returns_num, mu, vola_np, risk_pos_np, cash_pos_np, row_of, self.cfg.shrink)
+    cube: CorrelationCube | FactorCube
+    if cfg.factors is not None:
+        cube = first.factor_cube
+        raws = [
+            _solve_factor_risk_positions(cube.loadings, cube.idiosyncratic, cube.rows, prices_num, mu, cfg.shrink)
+            for mu in stacked
+        ]
+    else:
+        cube = first.cor_cube
+        raws = list(_solve_risk_positions_for_signals(cube.matrices, cube.rows, prices_num, stacked, cfg.shrink))
 
-        return self.prices.with_columns([(pl.lit(cash_pos_np[:, i]).alias(asset)) for i, asset in enumerate(assets)])
+    return {
+        name: _with_positions(prices, assets, _scaled_cash_positions(raw, cube, (prices_num, returns_num, mu), vola_np))
+        for name, raw, mu in zip(engines, raws, stacked, strict=True)
+    }
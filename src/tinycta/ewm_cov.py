@@ -1,4 +1,466 @@
-"""Exponentially weighted covariance matrix computation."""
+"""Exponentially weighted covariance matrix computation.
 
+:func:`ewm_covariance` is re-exported from ``cvx.linalg`` and returns one matrix per
+date. :func:`ewm_correlation` evaluates the same EWM moments but normalises them
+into a single contiguous :class:`CorrelationCube`, in memory or memory-mapped on
+disk, which is what the engine's forward walk consumes; it advances the moments
+date by date with :class:`EwmMoments`, the recursion the streaming engine shares.
+:func:`ewm_factor_correlation` approximates the same correlations by a few factors
+plus a diagonal, for universes too wide for a dense ``(T, N, N)`` cube.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+from pathlib import Path
+from typing import Any, NamedTuple
+
+import numpy as np
+import polars as pl
 from cvx.linalg.covariance.ewm_cov import NegativeWarmupError as NegativeWarmupError
 from cvx.linalg.covariance.ewm_cov import ewm_covariance as ewm_covariance
+
+# Upper bound on the number of correlation cells buffered before a chunk of dates
+# is written to the cube (32 MB of float64), so the working set while filling the
+# cube is a fixed budget rather than the full ``(T, N, N)`` history.
+_BLOCK_CELLS = 1 << 22
+
+# Floor on an asset's idiosyncratic share of variance, so an asset the factors
+# explain completely still leaves the unshrunk factor model invertible.
+_IDIOSYNCRATIC_FLOOR = 1e-8
+
+
+class CorrelationCube(NamedTuple):
+    """Per-date correlation matrices stored as one contiguous ``(T, N, N)`` array.
+
+    Attributes:
+        rows: Integer row (in the source frame) of each matrix, ascending.
+        matrices: Array of shape ``(len(rows), N, N)``; ``matrices[i]`` is the
+            correlation matrix at source row ``rows[i]``.
+    """
+
+    rows: np.ndarray
+    matrices: np.ndarray
+
+
+class FactorCube(NamedTuple):
+    """Per-date correlations as ``loadings @ loadings.T + diag(idiosyncratic)``.
+
+    Attributes:
+        rows: Integer row (in the source frame) of each date, ascending.
+        loadings: Array of shape ``(len(rows), N, k)`` of factor loadings on the
+            correlation scale; ``NaN`` for an asset without a correlation that date.
+        idiosyncratic: Array of shape ``(len(rows), N)`` holding ``1`` minus each
+            asset's explained share, so the modelled matrix has a unit diagonal.
+    """
+
+    rows: np.ndarray
+    loadings: np.ndarray
+    idiosyncratic: np.ndarray
+
+
+class EwmMoments:
+    """Running exponentially weighted mean (and variance) of a block of series.
+
+    Each element of the block is an independent series. :meth:`update` advances all
+    of them by one step; elements that are not observed at that step decay their
+    weights as polars does with ``adjust=True, ignore_nulls=False``.
+
+    Example:
+        >>> import numpy as np
+        >>> import polars as pl
+        >>> from tinycta.ewm_cov import EwmMoments
+        >>> xs = [1.0, None, 3.0, 2.0]
+        >>> moments = EwmMoments(alpha=0.5, shape=(1,), variance=True)
+        >>> means = []
+        >>> for x in xs:
+        ...     moments.update(np.array([np.nan if x is None else x]), np.array([x is not None]))
+        ...     means.append(float(moments.mean_value()[0]))
+        >>> expected = pl.Series(xs).ewm_mean(alpha=0.5).fill_null(float("nan")).to_numpy()
+        >>> bool(np.array_equal(means, expected, equal_nan=True))
+        True
+        >>> bool(moments.std_value()[0] == pl.Series(xs).ewm_std(alpha=0.5)[-1])
+        True
+    """
+
+    def __init__(self, alpha: float, shape: tuple[int, ...], min_samples: int = 1, variance: bool = False) -> None:
+        """Start every series in the block with no observations.
+
+        Args:
+            alpha: Smoothing factor, ``1 / (1 + com)`` or ``2 / (span + 1)``.
+            shape: Shape of the block of series.
+            min_samples: Observations required before a value is emitted.
+            variance: Also track the weighted variance needed by :meth:`std_value`.
+        """
+        self.alpha = alpha
+        self.min_samples = min_samples
+        self.variance = variance
+        self.mean = np.full(shape, np.nan)
+        self.old_wt = np.ones(shape)
+        self.count = np.zeros(shape, dtype=np.int64)
+        self.observed = np.zeros(shape, dtype=bool)
+        if variance:
+            self.cov = np.zeros(shape)
+            self.sum_wt = np.ones(shape)
+            self.sum_wt2 = np.ones(shape)
+
+    def update(self, x: np.ndarray, observed: np.ndarray) -> None:
+        """Advance every series by one step.
+
+        Args:
+            x: New values, broadcastable to the block shape (ignored where unobserved).
+            observed: Boolean mask of the series observed at this step.
+        """
+        factor = 1.0 - self.alpha
+        started = self.count > 0
+        step = started & observed
+        first = ~started & observed
+
+        old_wt = np.where(started, self.old_wt * factor, self.old_wt)
+        old_mean = self.mean
+        mean = np.where(step & (old_mean != x), old_mean + (x - old_mean) * (1.0 / (old_wt + 1.0)), old_mean)
+        self.mean = np.where(first, x, mean)
+        if self.variance:
+            cov = (old_wt * (self.cov + (old_mean - mean) * (old_mean - mean)) + (x - mean) * (x - mean)) / (
+                old_wt + 1.0
+            )
+            self.cov = np.where(step, cov, self.cov)
+            self.sum_wt = np.where(started, self.sum_wt * factor, self.sum_wt) + step
+            self.sum_wt2 = np.where(started, self.sum_wt2 * (factor * factor), self.sum_wt2) + step
+        self.old_wt = old_wt + step
+        self.count = self.count + observed
+        self.observed = np.broadcast_to(observed, self.mean.shape)
+
+    def state(self) -> dict[str, np.ndarray]:
+        """Arrays that, with the constructor arguments, fully determine the moments."""
+        names = ["mean", "old_wt", "count", "observed"]
+        if self.variance:
+            names += ["cov", "sum_wt", "sum_wt2"]
+        return {name: np.array(getattr(self, name)) for name in names}
+
+    def restore(self, state: dict[str, np.ndarray]) -> None:
+        """Overwrite the running state with arrays produced by :meth:`state`.
+
+        Args:
+            state: Mapping as returned by :meth:`state` on a block of the same shape.
+
+        Raises:
+            ValueError: If an array is missing or has the wrong shape.
+        """
+        for name, current in self.state().items():
+            if name not in state or np.shape(state[name]) != current.shape:
+                msg = f"moment state {name!r} is missing or does not have shape {current.shape}"
+                raise ValueError(msg)
+            setattr(self, name, np.array(state[name], dtype=current.dtype))
+
+    def _emitting(self) -> np.ndarray:
+        """Series that emit a value at the current step."""
+        return self.observed & (self.count >= self.min_samples)
+
+    def mean_value(self) -> np.ndarray:
+        """EWM mean at the current step, ``NaN`` where polars would emit null."""
+        return np.where(self._emitting(), self.mean, np.nan)
+
+    def std_value(self) -> np.ndarray:
+        """Bias-corrected EWM standard deviation at the current step, ``NaN`` where polars would emit null."""
+        numerator = self.sum_wt * self.sum_wt
+        denominator = numerator - self.sum_wt2
+        ok = self._emitting() & (denominator > 0)
+        ratio = np.divide(numerator, denominator, out=np.zeros_like(numerator), where=ok)
+        return np.where(ok, np.sqrt(ratio * self.cov), np.nan)
+
+
+def _pair_covariance(a: str, b: str, window: int, min_samples: int) -> pl.Expr:
+    """EWM covariance of columns ``a`` and ``b`` over their common non-null observations."""
+
+    def _ewm(expr: pl.Expr) -> pl.Expr:
+        return expr.ewm_mean(span=window, min_samples=min_samples)
+
+    return (
+        _ewm(pl.col(a) * pl.col(b))
+        - _ewm(pl.when(pl.col(b).is_null()).then(None).otherwise(pl.col(a)))
+        * _ewm(pl.when(pl.col(a).is_null()).then(None).otherwise(pl.col(b)))
+    ).alias(f"{a}_{b}")
+
+
+def _fingerprint(data: pl.DataFrame, assets: list[str], window: int, warmup: int, dtype: np.dtype[Any]) -> str:
+    """Digest of everything the cube depends on, used to name a reusable store file."""
+    # float64 cubes keep the digest they had before the dtype became a parameter.
+    suffix = "" if dtype == np.float64 else f"|{dtype.name}"
+    digest = hashlib.sha256(f"{assets!r}|{window}|{warmup}|{data.height}{suffix}".encode())
+    digest.update(np.ascontiguousarray(data.select(assets).to_numpy(), dtype=np.float64).tobytes())
+    return digest.hexdigest()[:32]
+
+
+def ewm_correlation(
+    data: pl.DataFrame,
+    assets: list[str],
+    window: int,
+    warmup: int = 0,
+    store: str | os.PathLike[str] | None = None,
+    dtype: type[np.floating[Any]] = np.float64,
+) -> CorrelationCube:
+    """Compute EWM correlation matrices for every date as one dense cube.
+
+    The covariance of each pair is ``EWM(X*Y) - EWM(X)*EWM(Y)`` over the pair's
+    common non-null observations — the same moments as :func:`ewm_covariance` —
+    and is normalised to a correlation as it is written into the cube. As there,
+    dates where every cell is ``NaN`` are omitted, and a zero-variance asset
+    yields ``NaN`` correlations rather than a division by zero.
+
+    The pair moments are advanced date by date and the matrices written a chunk
+    of dates at a time, so besides the cube itself only a fixed budget of cells is
+    resident, and a stored cube is written front to back. With ``store`` set,
+    the cube is written to a memory-mapped ``.npy`` file in that directory instead
+    of to memory; the file name is a fingerprint of ``data``, ``assets``,
+    ``window`` and ``warmup``, so a later call with the same inputs maps the
+    existing file rather than recomputing it.
+
+    The moments are evaluated in float64 and rounded once as they are written,
+    so ``dtype=np.float32`` halves the cube's footprint at single-precision
+    accuracy; the store keeps cubes of each dtype apart.
+
+    Args:
+        data: Polars DataFrame holding the asset columns.
+        assets: Ordered list of asset column names.
+        window: EWMA span.
+        warmup: Minimum number of common observations before a cell is non-NaN.
+        store: Optional directory of memory-mapped correlation cubes.
+        dtype: Floating-point type of the cube, ``np.float64`` or ``np.float32``.
+
+    Returns:
+        CorrelationCube: The surviving rows and their correlation matrices (a
+            read-only ``np.memmap`` when ``store`` is given).
+
+    Raises:
+        TypeError: If ``warmup`` is not an integer (booleans included).
+        NegativeWarmupError: If ``warmup`` is negative.
+
+    Example:
+        >>> import polars as pl
+        >>> from tinycta.ewm_cov import ewm_correlation
+        >>> data = pl.DataFrame({"A": [None, 0.5, -1.0, 0.3, 0.8], "B": [None, 0.4, -0.7, 0.1, 0.9]})
+        >>> cube = ewm_correlation(data, ["A", "B"], window=5, warmup=2)
+
+        Rows are positions in ``data``; the first row has no observation and the
+        second has only one, so the cube starts at the third:
+
+        >>> cube.rows
+        array([2, 3, 4])
+        >>> cube.matrices.shape
+        (3, 2, 2)
+        >>> cube.matrices[0].round(4)
+        array([[1., 1.],
+               [1., 1.]])
+
+        A store directory holds the same numbers on disk:
+
+        >>> import tempfile
+        >>> with tempfile.TemporaryDirectory() as tmp:
+        ...     stored = ewm_correlation(data, ["A", "B"], window=5, warmup=2, store=tmp)
+        ...     bool((stored.matrices == cube.matrices).all())
+        True
+    """
+    if isinstance(warmup, bool) or not isinstance(warmup, int):
+        msg = f"warmup must be an integer, got {warmup!r}"
+        raise TypeError(msg)
+    if warmup < 0:
+        raise NegativeWarmupError(warmup)
+
+    if store is not None:
+        key = Path(store) / _fingerprint(data, assets, window, warmup, np.dtype(dtype))
+        rows_path, matrices_path = key.with_suffix(".rows.npy"), key.with_suffix(".npy")
+        if rows_path.exists() and matrices_path.exists():
+            return CorrelationCube(rows=np.load(rows_path), matrices=np.load(matrices_path, mmap_mode="r"))
+
+    n = len(assets)
+    min_samples = 1 if warmup == 0 else warmup
+
+    # A cell is finite only once both assets' variances are, so a date has data
+    # exactly when some variance does: the diagonal alone decides which rows survive.
+    variance = data.select(_pair_covariance(a, a, window, min_samples) for a in assets).to_numpy()
+    rows = np.flatnonzero(~np.all(np.isnan(variance), axis=1))
+    std = np.sqrt(np.abs(variance[rows]))
+
+    shape = (len(rows), n, n)
+    mapped: np.memmap | None = None
+    if store is None:
+        cube = np.empty(shape, dtype=dtype)
+    else:
+        Path(store).mkdir(parents=True, exist_ok=True)
+        partial = key.with_suffix(f".{os.getpid()}.partial.npy")
+        cube = mapped = np.lib.format.open_memmap(partial, mode="w+", dtype=dtype, shape=shape)
+
+    # The pair moments advance date by date, with the recursion of polars'
+    # ewm_mean (see EwmMoments), and the surviving dates are written a chunk at
+    # a time as one contiguous slice, so a stored cube is filled front to back.
+    values = data.select(assets).to_numpy().astype(np.float64)
+    present = ~data.select(pl.col(a).is_null() for a in assets).to_numpy()
+    pairs = EwmMoments(2.0 / (window + 1.0), (3, n, n), min_samples=min_samples)
+    chunk = np.empty((max(1, min(len(rows), _BLOCK_CELLS // max(n * n, 1))), n, n))
+    pos = 0
+    for t in range(len(values)):
+        if pos == len(rows):
+            break
+        x, seen = values[t], present[t]
+        pairs.update(
+            np.stack(np.broadcast_arrays(x[:, None] * x[None, :], x[:, None], x[None, :])), np.outer(seen, seen)
+        )
+        if rows[pos] != t:
+            continue
+        m_xy, m_x, m_y = pairs.mean_value()
+        outer = np.outer(std[pos], std[pos])
+        positive = outer > 0
+        slot = chunk[pos % len(chunk)]
+        np.divide(m_xy - m_x * m_y, outer, out=slot, where=positive)
+        slot[~positive] = np.nan
+        pos += 1
+        if pos % len(chunk) == 0 or pos == len(rows):
+            first = (pos - 1) // len(chunk) * len(chunk)
+            cube[first:pos] = chunk[: pos - first]
+
+    if mapped is None:
+        return CorrelationCube(rows=rows, matrices=cube)
+
+    mapped.flush()
+    del cube, mapped
+    # Publish the matrices before the rows: a store entry counts as complete only
+    # once both files exist, so an interrupted run is never mistaken for a hit.
+    os.replace(partial, matrices_path)
+    partial_rows = key.with_suffix(f".{os.getpid()}.partial.rows.npy")
+    np.save(partial_rows, rows)
+    os.replace(partial_rows, rows_path)
+    return CorrelationCube(rows=rows, matrices=np.load(matrices_path, mmap_mode="r"))
+
+
+def _truncate(factor: np.ndarray, k: int) -> np.ndarray:
+    """Best rank-``k`` factor ``L`` with ``L @ L.T`` approximating ``factor @ factor.T``.
+
+    A thin QR of the ``(N, m)`` factor followed by an SVD of its ``(m, m)``
+    triangle costs ``O(N m²)``; nothing ``N x N`` is formed.
+    """
+    q, r = np.linalg.qr(factor)
+    u, s, _ = np.linalg.svd(r)
+    truncated: np.ndarray = q @ (u[:, :k] * s[:k])
+    return truncated
+
+
+def ewm_factor_correlation(
+    data: pl.DataFrame,
+    assets: list[str],
+    window: int,
+    factors: int,
+    warmup: int = 0,
+) -> FactorCube:
+    """Approximate the EWM correlation of every date by ``factors`` factors plus a diagonal.
+
+    The EWM covariance obeys ``S_t = (1 - b)(S_{t-1} + b d dᵀ)``, where ``d`` is the
+    deviation of the date's observation from the running EWM mean and ``b`` the
+    new observation's weight under ``adjust=True`` weighting. The recursion is
+    carried on a rank-``factors`` factor ``L`` with ``S ≈ L Lᵀ``: each date appends
+    ``d`` as a column and truncates back (see :func:`_truncate`), which costs
+    ``O(N k²)`` and keeps ``O(N k)`` state. The diagonal of ``S`` is carried exactly.
+    Each date's matrix is normalised to a correlation: the loadings are the rows
+    of ``L`` divided by the asset's volatility, and the idiosyncratic term makes
+    up the unit diagonal. The truncation drops a positive semi-definite remainder,
+    so that term is non-negative; it is floored at a small positive value.
+
+    Unlike :func:`ewm_correlation`, every asset shares one set of weights. A
+    missing observation enters as a zero deviation rather than being skipped
+    pairwise, so with gaps the model only approximates the dense estimator. On
+    gap-free data with ``factors >= N`` it matches the dense estimator to rounding.
+    As there, an asset has no correlation (``NaN`` loadings) on a date where its
+    value is missing, before ``warmup`` observations, or at zero variance, and
+    dates where no asset has one are omitted.
+
+    Args:
+        data: Polars DataFrame holding the asset columns.
+        assets: Ordered list of asset column names.
+        window: EWMA span.
+        factors: Number of factors ``k`` (capped at the number of assets).
+        warmup: Minimum number of observations before an asset has a correlation.
+
+    Returns:
+        FactorCube: The surviving rows with their loadings and idiosyncratic terms.
+
+    Raises:
+        TypeError: If ``warmup`` is not an integer (booleans included).
+        NegativeWarmupError: If ``warmup`` is negative.
+
+    Example:
+        >>> import numpy as np
+        >>> import polars as pl
+        >>> from tinycta.ewm_cov import ewm_correlation, ewm_factor_correlation
+        >>> rng = np.random.default_rng(0)
+        >>> data = pl.DataFrame(rng.standard_normal((30, 4)), schema=["A", "B", "C", "D"])
+        >>> cube = ewm_factor_correlation(data, ["A", "B", "C", "D"], window=11, factors=2, warmup=5)
+        >>> cube.rows[:3], cube.loadings.shape, cube.idiosyncratic.shape
+        (array([4, 5, 6]), (26, 4, 2), (26, 4))
+
+        The modelled matrices have a unit diagonal:
+
+        >>> last = cube.loadings[-1] @ cube.loadings[-1].T + np.diag(cube.idiosyncratic[-1])
+        >>> bool(np.allclose(np.diag(last), 1.0))
+        True
+
+        With as many factors as assets the dense correlation is recovered:
+
+        >>> full = ewm_factor_correlation(data, ["A", "B", "C", "D"], window=11, factors=4, warmup=5)
+        >>> dense = ewm_correlation(data, ["A", "B", "C", "D"], window=11, warmup=5).matrices[-1]
+        >>> bool(np.allclose(full.loadings[-1] @ full.loadings[-1].T, dense, atol=1e-6))
+        True
+    """
+    if isinstance(warmup, bool) or not isinstance(warmup, int):
+        msg = f"warmup must be an integer, got {warmup!r}"
+        raise TypeError(msg)
+    if warmup < 0:
+        raise NegativeWarmupError(warmup)
+
+    values = data.select(assets).to_numpy().astype(float)
+    n = len(assets)
+    k = min(factors, n)
+    decay = 1.0 - 2.0 / (window + 1.0)
+    min_samples = max(warmup, 1)
+
+    mean = np.zeros(n)
+    variance = np.zeros(n)
+    count = np.zeros(n, dtype=np.int64)
+    factor = np.zeros((n, k))
+    weight = 0.0
+
+    rows: list[int] = []
+    loadings: list[np.ndarray] = []
+    idiosyncratic: list[np.ndarray] = []
+    for t, z in enumerate(values):
+        observed = np.isfinite(z)
+        weight *= decay
+        if not observed.any():
+            continue
+        weight += 1.0
+        b = 1.0 / weight
+
+        first = observed & (count == 0)
+        mean[first] = z[first]
+        deviation = np.where(observed, z - mean, 0.0)
+        mean += b * deviation
+        variance = (1.0 - b) * (variance + b * deviation * deviation)
+        factor = _truncate(np.column_stack([np.sqrt(1.0 - b) * factor, np.sqrt((1.0 - b) * b) * deviation]), k)
+        count += observed
+
+        live = observed & (count >= min_samples) & (variance > 0)
+        if not live.any():
+            continue
+        std = np.sqrt(np.where(live, variance, np.nan))
+        scaled = factor / std[:, None]
+        rows.append(t)
+        loadings.append(scaled)
+        idiosyncratic.append(
+            np.maximum(1.0 - np.sum(scaled * scaled, axis=1), _IDIOSYNCRATIC_FLOOR, where=live, out=np.full(n, np.nan))
+        )
+
+    if not rows:
+        return FactorCube(
+            rows=np.array([], dtype=np.int64), loadings=np.empty((0, n, k)), idiosyncratic=np.empty((0, n))
+        )
+    return FactorCube(rows=np.array(rows), loadings=np.stack(loadings), idiosyncratic=np.stack(idiosyncratic))
@@ -0,0 +1,264 @@
+"""Streaming position engine that advances one bar at a time.
+
+:class:`OnlineEngine` holds the running state behind :class:`~tinycta.engine.Engine`
+— the EWM volatilities, the EWM pair moments behind the correlation matrix, the
+last risk position and the profit variance — and updates it with each new row of
+prices and expected returns. A bar costs one ``O(N²)`` moment update plus one solve,
+instead of the batch engine's pass over the whole history.
+
+The moments are updated with the same recursion, in the same operation order, as
+polars' ``ewm_mean``/``ewm_std``, so the positions match the batch engine's to the
+last bit. Missing prices are ``NaN`` (or ``None``) and are treated like polars nulls;
+the batch engine reads ``NaN`` price gaps as nulls too, so either spelling of a gap
+gives the same positions on both paths.
+
+The whole state can be written to a checkpoint with :meth:`OnlineEngine.save` and
+restored with :meth:`OnlineEngine.load`, so a long history is walked once and each
+new bar afterwards costs only the load, one update and the save.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+from collections.abc import Sequence
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+
+from ._kernel import _PROFIT_VARIANCE_DECAY, _risk_position, _update_profit_variance
+from .config import Config
+from .ewm_cov import EwmMoments as EwmMoments
+
+# Bumped whenever the set or meaning of the arrays in a checkpoint changes.
+_CHECKPOINT_VERSION = 1
+
+
+class OnlineEngine:
+    """Stateful engine that emits the next cash-position row for each new bar.
+
+    Feeding the rows of ``prices`` and ``mu`` one by one through :meth:`update`
+    yields the rows of ``Engine(prices, mu, cfg).cash_position``.
+
+    Example:
+        >>> import numpy as np
+        >>> import polars as pl
+        >>> from tinycta.config import Config
+        >>> from tinycta.engine import Engine
+        >>> from tinycta.online import OnlineEngine
+        >>> prices = pl.DataFrame(
+        ...     {
+        ...         "date": list(range(1, 11)),
+        ...         "A": [100.0, 101.5, 100.8, 102.3, 103.1, 102.0, 104.5, 105.2, 104.1, 106.0],
+        ...         "B": [50.0, 49.2, 50.4, 49.8, 51.1, 50.3, 49.5, 50.8, 51.6, 50.9],
+        ...     }
+        ... )
+        >>> mu = pl.DataFrame({"date": list(range(1, 11)), "A": [0.1] * 10, "B": [-0.05] * 10})
+        >>> cfg = Config(vola=3, corr=3, clip=4.2, shrink=0.5)
+        >>> online = OnlineEngine(cfg, assets=["A", "B"])
+        >>> rows = [online.update(p, m) for p, m in zip(prices.select("A", "B").rows(), mu.select("A", "B").rows())]
+        >>> batch = Engine(prices=prices, mu=mu, cfg=cfg).cash_position.select("A", "B").to_numpy()
+        >>> bool(np.array_equal(np.array(rows), batch, equal_nan=True))
+        True
+
+        A checkpoint taken mid-history resumes the walk without replaying it:
+
+        >>> import tempfile
+        >>> from pathlib import Path
+        >>> first = OnlineEngine(cfg, assets=["A", "B"])
+        >>> _ = first.extend(prices.head(6), mu.head(6))
+        >>> with tempfile.TemporaryDirectory() as tmp:
+        ...     first.save(Path(tmp) / "state.npz")
+        ...     resumed = OnlineEngine.load(Path(tmp) / "state.npz")
+        >>> tail = resumed.extend(prices.tail(4), mu.tail(4)).select("A", "B").to_numpy()
+        >>> bool(np.array_equal(tail, batch[6:], equal_nan=True))
+        True
+    """
+
+    def __init__(self, cfg: Config, assets: Sequence[str]) -> None:
+        """Create an engine that has not yet seen any bar.
+
+        Args:
+            cfg: Engine configuration, as for :class:`~tinycta.engine.Engine`.
+            assets: Asset names; every row passed to :meth:`update` follows this order.
+
+        Raises:
+            ValueError: If ``cfg.factors`` is set; the streaming engine keeps the
+                dense correlation state only.
+        """
+        if cfg.factors is not None:
+            msg = "OnlineEngine does not support the factor-model mode (cfg.factors)"
+            raise ValueError(msg)
+        n = len(assets)
+        self.cfg = cfg
+        self.assets = tuple(assets)
+        # com = vola - 1 gives alpha = 1 / vola; span = 2 * corr + 1 gives alpha = 1 / (corr + 1).
+        self._log_returns = EwmMoments(1.0 / cfg.vola, (n,), variance=True)
+        self._pct_returns = EwmMoments(1.0 / cfg.vola, (n,), min_samples=cfg.vola, variance=True)
+        self._pairs = EwmMoments(2.0 / (2 * cfg.corr + 2), (3, n, n), min_samples=cfg.corr)
+        self._prev_price = np.full(n, np.nan)
+        self._prev_log = np.full(n, np.nan)
+        self._started = False
+        self.profit_variance = 1.0
+        self._prev_risk: np.ndarray | None = None
+        self._prev_vola = np.full(n, np.nan)
+        # Scratch for the shrunk, masked matrix of each bar's solve; not part of the state.
+        self._workspace = np.empty((2, n, n))
+
+    def update(
+        self, prices: Sequence[float | None] | np.ndarray, mu: Sequence[float | None] | np.ndarray
+    ) -> np.ndarray:
+        """Advance by one bar and return its cash position.
+
+        Args:
+            prices: The bar's prices in :attr:`assets` order (``NaN``/``None`` = missing).
+            mu: The bar's expected returns in the same order.
+
+        Returns:
+            np.ndarray: The cash position for the bar; ``NaN`` during warmup and for
+                assets without a price.
+        """
+        price = np.asarray(prices, dtype=float)
+        mu_row = np.asarray(mu, dtype=float)
+        observed = np.isfinite(price)
+        both = observed & np.isfinite(self._prev_price)
+
+        # Volatility-adjusted log returns (tinycta.util.vol_adj). ``math.log`` rather
+        # than ``np.log`` because it rounds exactly like polars' ``log``.
+        log_price = np.array([math.log(p) if ok else np.nan for p, ok in zip(price, observed, strict=True)])
+        log_return = log_price - self._prev_log
+        self._log_returns.update(log_return, both)
+        vol = self._log_returns.std_value()
+        adj_observed = both & ~np.isnan(vol)
+        ret_adj = np.clip(log_return / vol, -self.cfg.clip, self.cfg.clip)
+
+        # Per-asset EWM volatility of percentage returns (Engine.vola).
+        self._pct_returns.update((price - self._prev_price) / self._prev_price, both)
+        vola = self._pct_returns.std_value()
+
+        # EWM pair moments and the correlation matrix (tinycta.ewm_cov.ewm_correlation).
+        pair_observed = adj_observed[:, None] & adj_observed[None, :]
+        self._pairs.update(
+            np.stack(np.broadcast_arrays(ret_adj[:, None] * ret_adj[None, :], ret_adj[:, None], ret_adj[None, :])),
+            pair_observed,
+        )
+        m_xy, m_x, m_y = self._pairs.mean_value()
+        cov = m_xy - m_x * m_y
+
+        returns = (
+            price / self._prev_price - 1.0 if self._started else np.zeros_like(price)
+        )  # Engine.cash_position's returns_num
+        self._prev_price, self._prev_log, self._started = price, log_price, True
+
+        cash = np.full(len(self.assets), np.nan)
+        variance = np.diagonal(cov)
+        if np.all(np.isnan(variance)):
+            return cash
+
+        std = np.sqrt(np.abs(variance))
+        outer = np.outer(std, std)
+        corr = np.divide(cov, outer, out=np.full(cov.shape, np.nan), where=outer > 0)
+
+        if self._prev_risk is not None:
+            ret_mask = np.isfinite(returns) & observed
+            if ret_mask.any():
+                self.profit_variance = _update_profit_variance(
+                    self.profit_variance, self._prev_risk / self._prev_vola, returns, ret_mask, _PROFIT_VARIANCE_DECAY
+                )
+
+        risk = np.full(len(self.assets), np.nan)
+        if observed.any():
+            risk[observed] = (
+                _risk_position(corr, mu_row, observed, self.cfg.shrink, self._workspace) / self.profit_variance
+            )
+            cash[observed] = risk[observed] / vola[observed]
+        self._prev_risk, self._prev_vola = risk, vola
+        return cash
+
+    def _moments(self) -> dict[str, EwmMoments]:
+        """The engine's EWM moment blocks, keyed by their checkpoint prefix."""
+        return {"log_returns": self._log_returns, "pct_returns": self._pct_returns, "pairs": self._pairs}
+
+    def save(self, path: str | os.PathLike[str]) -> None:
+        """Write the engine's full state to an ``.npz`` checkpoint.
+
+        The file is written next to ``path`` and moved into place, so an
+        interrupted save never leaves a truncated checkpoint behind.
+
+        Args:
+            path: Destination file.
+        """
+        n = len(self.assets)
+        arrays: dict[str, np.ndarray] = {
+            "version": np.array(_CHECKPOINT_VERSION),
+            "config": np.array(self.cfg.model_dump_json()),
+            "assets": np.array(self.assets, dtype=str),
+            "prev_price": self._prev_price,
+            "prev_log": self._prev_log,
+            "started": np.array(self._started),
+            "profit_variance": np.array(self.profit_variance),
+            "has_prev_risk": np.array(self._prev_risk is not None),
+            "prev_risk": self._prev_risk if self._prev_risk is not None else np.full(n, np.nan),
+            "prev_vola": self._prev_vola,
+        }
+        for prefix, moments in self._moments().items():
+            arrays |= {f"{prefix}.{name}": value for name, value in moments.state().items()}
+
+        target = Path(path)
+        partial = target.with_name(f"{target.name}.{os.getpid()}.partial")
+        with partial.open("wb") as f:
+            np.savez(f, allow_pickle=False, **arrays)
+        os.replace(partial, target)
+
+    @classmethod
+    def load(cls, path: str | os.PathLike[str]) -> OnlineEngine:
+        """Restore an engine from a checkpoint written by :meth:`save`.
+
+        Args:
+            path: Checkpoint file.
+
+        Returns:
+            OnlineEngine: An engine whose next :meth:`update` continues exactly
+                where the saved one left off.
+
+        Raises:
+            ValueError: If the file was written by an incompatible version.
+        """
+        with np.load(path) as data:
+            arrays = {key: data[key] for key in data.files}
+
+        version = int(arrays.get("version", -1))
+        if version != _CHECKPOINT_VERSION:
+            msg = f"checkpoint version {version} is not supported (expected {_CHECKPOINT_VERSION})"
+            raise ValueError(msg)
+
+        engine = cls(Config.model_validate_json(str(arrays["config"])), [str(a) for a in arrays["assets"]])
+        engine._prev_price = arrays["prev_price"]
+        engine._prev_log = arrays["prev_log"]
+        engine._started = bool(arrays["started"])
+        engine.profit_variance = float(arrays["profit_variance"])
+        engine._prev_risk = arrays["prev_risk"] if bool(arrays["has_prev_risk"]) else None
+        engine._prev_vola = arrays["prev_vola"]
+        for prefix, moments in engine._moments().items():
+            moments.restore(
+                {key.removeprefix(f"{prefix}."): value for key, value in arrays.items() if key.startswith(f"{prefix}.")}
+            )
+        return engine
+
+    def extend(self, prices: pl.DataFrame, mu: pl.DataFrame) -> pl.DataFrame:
+        """Feed every row of ``prices``/``mu`` through :meth:`update`.
+
+        Args:
+            prices: New bars, holding at least the :attr:`assets` columns.
+            mu: Expected returns aligned row-by-row with ``prices``.
+
+        Returns:
+            pl.DataFrame: ``prices`` with each asset column replaced by its cash position.
+        """
+        rows = [
+            self.update(p, m)
+            for p, m in zip(prices.select(self.assets).rows(), mu.select(self.assets).rows(), strict=True)
+        ]
+        cash = np.array(rows).reshape(len(rows), len(self.assets))
+        return prices.with_columns(pl.Series(asset, cash[:, i]) for i, asset in enumerate(self.assets))
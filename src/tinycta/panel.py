@@ -0,0 +1,130 @@
+"""Integer-indexed panel of per-date, per-asset values.
+
+A :class:`Panel` is what the engine needs from a wide polars frame: the ``date``
+column as one array, the asset names as a tuple and the values as one contiguous
+column-major ``(T, N)`` float64 (or float32) buffer. It is built once, so later stages index
+rows and assets by integer instead of re-selecting, re-scanning dtypes and
+re-converting the frame. NumPy code takes a panel wherever it takes an array
+(``np.asarray(panel)`` is its buffer, without a copy), and :meth:`Panel.to_frame`
+goes back to polars for the expression-based helpers.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import functools
+from collections.abc import Hashable, Sequence
+from typing import Any
+
+import numpy as np
+import polars as pl
+
+
+def numeric_assets(frame: pl.DataFrame) -> list[str]:
+    """Numeric column names of ``frame``, excluding the ``date`` column.
+
+    Example:
+        >>> import polars as pl
+        >>> from tinycta.panel import numeric_assets
+        >>> numeric_assets(pl.DataFrame({"date": [1], "A": [1.0], "note": ["x"], "B": [2]}))
+        ['A', 'B']
+    """
+    return [c for c, dtype in frame.schema.items() if c != "date" and dtype.is_numeric()]
+
+
+@dataclasses.dataclass(frozen=True, eq=False)
+class Panel:
+    """Dates, asset names and a ``(T, N)`` float buffer of values.
+
+    Attributes:
+        dates: The ``date`` column as a NumPy array of length ``T``.
+        assets: Asset names, one per column of :attr:`values`.
+        values: Column-major float array (float64 unless built with another
+            ``dtype``) of shape ``(T, N)``; missing values are ``NaN``.
+
+    Example:
+        >>> import polars as pl
+        >>> from tinycta.panel import Panel
+        >>> frame = pl.DataFrame({"date": [1, 2, 3], "A": [100.0, 101.0, None], "B": [50.0, 49.5, 50.5]})
+        >>> panel = Panel.from_frame(frame)
+        >>> panel.assets, panel.shape
+        (('A', 'B'), (3, 2))
+        >>> panel.values[:, 0]
+        array([100., 101.,  nan])
+        >>> panel.row_of[2]
+        1
+        >>> panel.to_frame().columns
+        ['date', 'A', 'B']
+    """
+
+    dates: np.ndarray
+    assets: tuple[str, ...]
+    values: np.ndarray
+
+    def __post_init__(self) -> None:
+        """Check that the buffer has one row per date and one column per asset."""
+        if self.values.shape != (len(self.dates), len(self.assets)):
+            msg = (
+                f"values must have shape (len(dates), len(assets)) = {(len(self.dates), len(self.assets))}, "
+                f"got {self.values.shape}"
+            )
+            raise ValueError(msg)
+
+    @classmethod
+    def from_frame(
+        cls, frame: pl.DataFrame, assets: Sequence[str] | None = None, dtype: type[np.floating[Any]] = np.float64
+    ) -> Panel:
+        """Build a panel from the ``date`` column and the asset columns of ``frame``.
+
+        The columns are converted once into the column-major buffer, with nulls
+        becoming ``NaN``. Whether that conversion copies is up to polars, so the
+        buffer may share memory with ``frame``.
+
+        Args:
+            frame: Wide frame with a ``date`` column.
+            assets: Columns to take, in order; defaults to :func:`numeric_assets`.
+            dtype: Type of the buffer. ``np.float32`` casts the columns in polars,
+                so no float64 copy of the values is made on the way.
+
+        Returns:
+            Panel: The frame's dates, asset names and values.
+
+        Raises:
+            ValueError: If ``frame`` has no ``date`` column.
+        """
+        if "date" not in frame.columns:
+            msg = "frame must contain a 'date' column"
+            raise ValueError(msg)
+        names = tuple(numeric_assets(frame) if assets is None else assets)
+        columns = frame.select(names)
+        if np.dtype(dtype) == np.float32:
+            columns = columns.cast(pl.Float32)
+        values = np.asarray(columns.to_numpy(order="fortran"), dtype=dtype, order="F")
+        return cls(dates=frame["date"].to_numpy(), assets=names, values=values.reshape(frame.height, len(names)))
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        """``(T, N)``: the number of dates and of assets."""
+        return len(self.dates), len(self.assets)
+
+    @functools.cached_property
+    def row_of(self) -> dict[Hashable, int]:
+        """Integer row of each date, keyed by the date as a Python value."""
+        return {date: row for row, date in enumerate(pl.Series(self.dates).to_list())}
+
+    def to_frame(self, values: np.ndarray | None = None) -> pl.DataFrame:
+        """A polars frame of the dates and ``values`` (default :attr:`values`), one column per asset.
+
+        Each asset's column of a column-major buffer is contiguous, so polars
+        adopts it without copying.
+        """
+        columns = np.asfortranarray(self.values if values is None else values, dtype=np.float64)
+        return pl.DataFrame(
+            [pl.Series("date", self.dates), *(pl.Series(a, columns[:, j]) for j, a in enumerate(self.assets))]
+        )
+
+    def __array__(self, dtype: Any = None, copy: bool | None = None) -> np.ndarray:
+        """The :attr:`values` buffer, so NumPy functions accept a panel in place of an array."""
+        if dtype is None and not copy:
+            return self.values
+        return np.array(self.values, dtype=dtype, copy=True)
@@ -18,6 +18,7 @@ used to generate trading signals from price data.
 from __future__ import annotations
 
 import math
+from collections.abc import Sequence
 
 import numpy as np
 import polars as pl
@@ -100,3 +101,53 @@ def shrink2id(matrix: np.ndarray, lamb: float = 1.0) -> np.ndarray:
                [0.4, 1. ]])
     """
     return matrix * lamb + (1 - lamb) * np.eye(N=matrix.shape[0])
+
+
+def correlation_blocks(matrix: np.ndarray, assets: Sequence[str], threshold: float) -> dict[str, int]:
+    """Cluster assets into blocks linked by correlations of at least ``threshold`` in magnitude.
+
+    Two assets share a block when a chain of pairwise correlations, each at least
+    ``threshold`` in absolute value, connects them (single linkage). ``NaN`` cells
+    never link. The result can be passed as ``Engine(..., solver=Blocks(...))`` (see
+    :class:`~tinycta.solver.Blocks`) so that each block is solved on its own.
+
+    Args:
+        matrix: Correlation matrix of shape ``(n, n)``, e.g. a trailing average of
+            :attr:`~tinycta.engine.Engine.cor_cube`.
+        assets: Asset names in the order of ``matrix``'s rows, e.g. a
+            :attr:`~tinycta.panel.Panel.assets` tuple.
+        threshold: Smallest absolute correlation that links two assets.
+
+    Returns:
+        Mapping of each asset to its block label, numbered ``0, 1, ...`` in order of
+        each block's first asset.
+
+    Example:
+        >>> import numpy as np
+        >>> from tinycta.signal import correlation_blocks
+        >>> corr = np.array(
+        ...     [
+        ...         [1.0, 0.6, 0.0, 0.05],
+        ...         [0.6, 1.0, 0.1, 0.0],
+        ...         [0.0, 0.1, 1.0, -0.7],
+        ...         [0.05, 0.0, -0.7, 1.0],
+        ...     ]
+        ... )
+        >>> correlation_blocks(corr, ["ES", "NQ", "TY", "GC"], threshold=0.3)
+        {'ES': 0, 'NQ': 0, 'TY': 1, 'GC': 1}
+    """
+    n = len(assets)
+    linked = np.abs(np.nan_to_num(matrix)) >= threshold
+    labels = np.full(n, -1)
+    block = 0
+    for seed in range(n):
+        if labels[seed] >= 0:
+            continue
+        frontier = [seed]
+        labels[seed] = block
+        while frontier:
+            members = np.flatnonzero(linked[frontier].any(axis=0) & (labels < 0))
+            labels[members] = block
+            frontier = members.tolist()
+        block += 1
+    return {asset: int(label) for asset, label in zip(assets, labels, strict=True)}
@@ -0,0 +1,151 @@
+"""Walk strategies for :class:`~tinycta.engine.Engine`.
+
+The engine's dense forward walk can be run in several ways, and each is one
+frozen value passed as ``Engine(..., solver=...)``: :class:`Direct` (the default),
+:class:`Blocks`, :class:`Jit` or :class:`Batched`. Options that only one walk
+supports — a rebalance schedule, single precision, threads — are fields of that
+walk's class, so a combination the engine cannot run cannot be built. With
+``cfg.factors`` set the engine walks the factor model instead and takes the
+default ``Direct()`` only.
+
+Example:
+    >>> from tinycta.solver import Batched, Direct
+    >>> Direct(precision="float32", workers=4).workers
+    4
+    >>> Batched()
+    Batched()
+"""
+
+from __future__ import annotations
+
+import dataclasses
+from collections.abc import Collection, Hashable, Mapping
+from typing import Any, Literal
+
+import numpy as np
+import polars as pl
+
+from . import _jit
+
+
+@dataclasses.dataclass(frozen=True)
+class Direct:
+    """One Cholesky factorisation per date, the engine's default walk.
+
+    Setting ``rebalance`` (every ``k``-th bar, a boolean expression such as a
+    weekday rule, or a list of dates; see
+    :attr:`~tinycta.engine.Engine.rebalance_dates`) solves the positions on those
+    dates only and carries each cash position forward until the next one, while
+    the realised P&L of every bar still updates the profit variance. Only the
+    selected dates are factorised.
+
+    With ``precision="float32"`` the correlation cube (and so
+    :attr:`~tinycta.engine.Engine.cor`), the price and mu panels, the returns and
+    volatilities handed to the walk, and the solver's workspace are single
+    precision, which halves their memory and memory traffic; no float64 copy of
+    them is kept. The profit variance is still accumulated in float64, and the
+    cash positions keep float64 columns. The condition threshold scales with the
+    precision (see :func:`~tinycta._kernel._cond_threshold`): a date whose system
+    is too badly conditioned for single precision is solved in float64 instead.
+    Positions then differ from the default ``"float64"`` run by single-precision
+    rounding.
+
+    Setting ``workers`` above one solves the dates on that many threads, in
+    contiguous chunks, before the sequential profit-variance scan (see
+    :func:`~tinycta._kernel._solve_risk_positions`). The positions are identical
+    to the serial walk's. NumPy's LAPACK calls release the GIL, so this pays off
+    where BLAS threading alone finds little parallelism in one date's system; with
+    many workers, limiting BLAS to one thread per worker (e.g.
+    ``OMP_NUM_THREADS=1``) avoids oversubscribing the cores.
+
+    Raises:
+        ValueError: If ``precision`` is unknown, ``workers`` is not a positive
+            integer, or an integer ``rebalance`` is not positive.
+
+    Example:
+        >>> from tinycta.solver import Direct
+        >>> Direct().is_default, Direct(rebalance=5).is_default
+        (True, False)
+        >>> Direct(precision="float32").dtype
+        <class 'numpy.float32'>
+    """
+
+    rebalance: int | pl.Expr | Collection[Any] | None = None
+    precision: Literal["float64", "float32"] = "float64"
+    workers: int = 1
+
+    def __post_init__(self) -> None:
+        """Check the options that need no prices; date schedules are checked by the engine."""
+        if self.precision not in ("float64", "float32"):
+            msg = f"precision must be 'float64' or 'float32', got {self.precision!r}"
+            raise ValueError(msg)
+        if isinstance(self.workers, bool) or not isinstance(self.workers, int) or self.workers < 1:
+            msg = f"workers must be a positive integer, got {self.workers!r}"
+            raise ValueError(msg)
+        if isinstance(self.rebalance, int) and (isinstance(self.rebalance, bool) or self.rebalance < 1):
+            msg = f"rebalance must be a positive number of bars, got {self.rebalance!r}"
+            raise ValueError(msg)
+
+    @property
+    def dtype(self) -> type[np.floating[Any]]:
+        """NumPy type of the correlation cube and the walk's arrays under :attr:`precision`."""
+        return np.float32 if self.precision == "float32" else np.float64
+
+    @property
+    def is_default(self) -> bool:
+        """Whether every option is left at its default, i.e. a plain daily float64 serial walk."""
+        return self.rebalance is None and self.precision == "float64" and self.workers == 1
+
+
+@dataclasses.dataclass(frozen=True)
+class Blocks:
+    """Per-block solves of a block-diagonal correlation.
+
+    ``labels`` maps every asset to a block label (for example from
+    :func:`~tinycta.signal.correlation_blocks`); correlations across blocks are
+    treated as zero, so each date solves one small system per block, and the
+    blocks share one normaliser and the same profit-variance scaling.
+
+    Example:
+        >>> from tinycta.solver import Blocks
+        >>> Blocks({"A": 0, "B": 0, "C": 1}).labels["C"]
+        1
+    """
+
+    labels: Mapping[str, Hashable]
+
+
+@dataclasses.dataclass(frozen=True)
+class Jit:
+    """The direct walk as one loop compiled by ``numba`` (see :mod:`tinycta._jit`).
+
+    It pays off for small universes where interpreter overhead dominates, and
+    agrees with :class:`Direct` to rounding.
+
+    Raises:
+        ModuleNotFoundError: If ``numba`` is not installed; it comes with the
+            optional ``jit`` extra.
+    """
+
+    def __post_init__(self) -> None:
+        """Refuse the compiled walk up front, not at first use, when numba is missing."""
+        if not _jit.available():
+            msg = 'the Jit solver requires numba; install it with `pip install "tinycta[jit]"`'
+            raise ModuleNotFoundError(msg)
+
+
+@dataclasses.dataclass(frozen=True)
+class Batched:
+    """Stacked solves across each run of fully observed dates.
+
+    Each run of dates on which every asset trades is factorised in one call, and
+    its condition checks and triangular solves run across the whole run at once
+    (see :func:`~tinycta._kernel._solve_risk_positions_batched`); only dates with
+    a partial tradable set are solved one by one. Like :class:`Jit` it pays off
+    for small universes where interpreter overhead dominates, and agrees with
+    :class:`Direct` to rounding.
+    """
+
+
+Solver = Direct | Blocks | Jit | Batched
+"""Any walk strategy :class:`~tinycta.engine.Engine` accepts as ``solver``."""
@@ -0,0 +1,125 @@
+"""Tests for tinycta._jit: the optional compiled forward walk.
+
+The walk is written in plain Python that ``numba`` compiles, so most tests run it
+uncompiled (``_compiled_walk`` patched to return :func:`_walk` itself) and hold it
+to the NumPy reference; the compiled path is exercised only where ``numba`` is
+installed.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+import tinycta._jit as jit_module
+import tinycta._kernel as kernel_module
+from tinycta._jit import _walk, available, forward_walk
+from tinycta._kernel import forward_walk as reference_walk
+
+
+def _random_correlation(n: int, seed: int = 0) -> np.ndarray:
+    """A well-conditioned random correlation matrix of size n."""
+    rng = np.random.default_rng(seed)
+    x = rng.standard_normal((4 * n, n))
+    cov = x.T @ x
+    std = np.sqrt(np.diag(cov))
+    return cov / np.outer(std, std)
+
+
+def _market(t: int = 30, n: int = 5, seed: int = 0) -> dict[str, np.ndarray]:
+    """A small market with a listing, a delisting, an all-missing row and NaN returns."""
+    rng = np.random.default_rng(seed)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0.0, 0.02, size=(t, n)), axis=0))
+    prices[:6, 3] = np.nan
+    prices[20:, 1] = np.nan
+    prices[12] = np.nan
+    returns = np.zeros_like(prices)
+    returns[1:] = prices[1:] / prices[:-1] - 1.0
+    mu = rng.normal(size=(t, n))
+    mu[8, 2] = np.nan
+    mu[15] = 0.0
+    return {
+        "cor": np.stack([_random_correlation(n, seed=s) for s in range(t - 2)]),
+        "rows": np.arange(2, t),
+        "prices_num": prices,
+        "returns_num": returns,
+        "mu": mu,
+        "vola_np": rng.uniform(0.01, 0.03, size=(t, n)),
+    }
+
+
+def _run(walk, market: dict[str, np.ndarray], shrink: float) -> tuple[np.ndarray, np.ndarray]:
+    """Fill fresh position buffers with ``walk`` and return them."""
+    risk_pos = np.full_like(market["mu"], np.nan)
+    cash_pos = np.full_like(market["mu"], np.nan)
+    walk(risk_pos_np=risk_pos, cash_pos_np=cash_pos, shrink=shrink, **market)
+    return risk_pos, cash_pos
+
+
+@pytest.fixture
+def interpreted(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Run the walk as plain Python instead of compiling it."""
+    monkeypatch.setattr(jit_module, "_compiled_walk", lambda: _walk)
+
+
+class TestForwardWalk:
+    """The one-loop walk reproduces tinycta._kernel.forward_walk."""
+
+    @pytest.mark.parametrize("shrink", [0.0, 0.5, 1.0])
+    def test_matches_the_reference_walk(self, interpreted: None, shrink: float):
+        """Risk and cash positions agree with the NumPy walk to rounding."""
+        market = _market()
+        for actual, expected in zip(
+            _run(forward_walk, market, shrink), _run(reference_walk, market, shrink), strict=True
+        ):
+            np.testing.assert_allclose(actual, expected, rtol=1e-10, atol=1e-14, equal_nan=True)
+
+    def test_declined_systems_resume_through_the_reference(self, interpreted: None, mocker):
+        """A date the compiled Cholesky declines is solved by _risk_position and the walk goes on."""
+        market = _market()
+        market["cor"][4, 0, 1] = market["cor"][4, 1, 0] = np.nan
+        market["cor"][9, 2, 2] = np.nan
+        reference = mocker.spy(jit_module, "_risk_position")
+
+        actual = _run(forward_walk, market, shrink=1.0)
+
+        assert reference.call_count == 2
+        mocker.stopall()
+        for got, expected in zip(actual, _run(reference_walk, market, shrink=1.0), strict=True):
+            np.testing.assert_allclose(got, expected, rtol=1e-10, atol=1e-14, equal_nan=True)
+
+    @pytest.mark.parametrize("off_diagonal", [1.0 - 1e-14, 1.0 - 1e-12])
+    def test_ill_conditioned_system_is_declined(self, off_diagonal: float):
+        """The condition estimate sends back the dates the reference declines.
+
+        The second matrix has a benign Cholesky diagonal, so only a real estimate of
+        its condition number catches it.
+        """
+        cor = np.array([[[1.0, off_diagonal], [off_diagonal, 1.0]]])
+        ones = np.ones((1, 2))
+        state = np.array([1.0, -1.0])
+        buffers = np.full((2, 1, 2), np.nan)
+
+        raw, solved = np.full((1, 2), np.nan), np.zeros(1, dtype=bool)
+
+        stop = _walk(cor, np.array([0]), ones, ones, ones, ones, buffers[0], buffers[1], 1.0, raw, solved, 0, state)
+
+        assert stop == 0
+        assert np.isnan(buffers).all()
+        assert kernel_module._cholesky_solve_and_norm(cor[0], np.ones(2)) is None
+
+    def test_compiled_walk_matches_the_reference(self):
+        """With numba installed the compiled loop agrees with the NumPy walk."""
+        pytest.importorskip("numba")
+        market = _market()
+        for actual, expected in zip(_run(forward_walk, market, 0.5), _run(reference_walk, market, 0.5), strict=True):
+            np.testing.assert_allclose(actual, expected, rtol=1e-10, atol=1e-14, equal_nan=True)
+
+
+class TestAvailable:
+    """available() reports whether numba can be imported."""
+
+    def test_tracks_the_import_system(self, monkeypatch: pytest.MonkeyPatch):
+        """A missing numba distribution reads as unavailable."""
+        monkeypatch.setattr(jit_module.importlib.util, "find_spec", lambda name: None)
+        assert available() is False
@@ -9,9 +9,46 @@ through the Polars orchestration layer.
 
 from __future__ import annotations
 
+import itertools
+
 import numpy as np
+import pytest
+from cvx.linalg import IllConditionedMatrixWarning
+from scipy.linalg.lapack import dpocon
+
+import tinycta._kernel as kernel_module
+from tinycta._kernel import (
+    _cholesky_solve_and_norm,
+    _denominator_is_degenerate,
+    _factor_risk_position,
+    _factorise_risk_systems,
+    _inverse_norm_estimate,
+    _mask_runs,
+    _risk_position,
+    _risk_position_stack,
+    _scale_risk_positions,
+    _shrink_masked,
+    _solve_block_risk_positions,
+    _solve_factor_risk_positions,
+    _solve_factorised_risk_positions,
+    _solve_risk_positions,
+    _solve_risk_positions_batched,
+    _solve_risk_positions_for_shrinks,
+    _solve_risk_positions_for_signals,
+    _solve_triangular,
+    _update_profit_variance,
+)
+from tinycta.linalg import inv_a_norm, solve
+from tinycta.signal import shrink2id
+
 
-from tinycta._kernel import _denominator_is_degenerate, _risk_position, _update_profit_variance
+def _random_correlation(n: int, seed: int = 0) -> np.ndarray:
+    """A well-conditioned random correlation matrix of size n."""
+    rng = np.random.default_rng(seed)
+    x = rng.standard_normal((4 * n, n))
+    cov = x.T @ x
+    std = np.sqrt(np.diag(cov))
+    return cov / np.outer(std, std)
 
 
 class TestDenominatorIsDegenerate:
@@ -29,9 +66,139 @@ class TestDenominatorIsDegenerate:
         assert not _denominator_is_degenerate(1.0)
 
 
+class TestSolveTriangular:
+    """LAPACK triangular solves with the Cholesky factor."""
+
+    def test_forward_and_back_substitution(self):
+        """Both directions solve a wide factor."""
+        lower = np.linalg.cholesky(_random_correlation(150))
+        rhs = np.random.default_rng(1).standard_normal(150)
+
+        np.testing.assert_allclose(lower @ _solve_triangular(lower, rhs), rhs, atol=1e-10)
+        np.testing.assert_allclose(lower.T @ _solve_triangular(lower, rhs, transpose=True), rhs, atol=1e-10)
+
+    def test_matrix_right_hand_side(self):
+        """Several right-hand sides are solved column by column in one call."""
+        lower = np.linalg.cholesky(_random_correlation(100))
+        rhs = np.random.default_rng(2).standard_normal((100, 3))
+        np.testing.assert_allclose(lower @ _solve_triangular(lower, rhs), rhs, atol=1e-10)
+
+
+class TestCholeskySolveAndNorm:
+    """The factor-once path behind _risk_position."""
+
+    def test_matches_cvx_solve_and_inv_a_norm(self):
+        """One factorisation reproduces both cvx.linalg results."""
+        matrix = _random_correlation(120)
+        rhs = np.random.default_rng(3).standard_normal(120)
+
+        result = _cholesky_solve_and_norm(matrix, rhs)
+
+        assert result is not None
+        solution, norm = result
+        np.testing.assert_allclose(solution, solve(matrix, rhs), rtol=1e-9)
+        assert norm == pytest.approx(inv_a_norm(rhs, matrix), rel=1e-12)
+
+    def test_declines_non_finite_indefinite_and_ill_conditioned_matrices(self):
+        """Systems the fast path cannot reproduce are handed back to cvx.linalg."""
+        rhs = np.array([1.0, 0.0])
+        assert _cholesky_solve_and_norm(np.array([[1.0, np.nan], [np.nan, 1.0]]), rhs) is None
+        assert _cholesky_solve_and_norm(np.array([[1.0, 2.0], [2.0, 1.0]]), rhs) is None
+        assert _cholesky_solve_and_norm(np.array([[1.0, 1.0], [1.0, 1.0 + 1e-14]]), rhs) is None
+
+    def test_condition_estimate_sees_past_a_benign_diagonal(self):
+        """A matrix whose factor diagonal understates its condition number is still declined.
+
+        Here ``(max L_ii / min L_ii)²`` is about 5e11, under the threshold, while the
+        condition number is about 2e12 — over it — so a diagonal-only test would
+        accept a system ``cvx.linalg`` warns about.
+        """
+        matrix = np.array([[1.0, 1.0 - 1e-12], [1.0 - 1e-12, 1.0]])
+        diag = np.diagonal(np.linalg.cholesky(matrix))
+        threshold = kernel_module._COND_THRESHOLD
+
+        assert (diag.max() / diag.min()) ** 2 < threshold < np.linalg.cond(matrix)
+        assert _cholesky_solve_and_norm(matrix, np.array([1.0, 0.0])) is None
+
+
+class TestShrinkMasked:
+    """In-place shrink-and-mask into a reusable workspace."""
+
+    @pytest.mark.parametrize("shrink", [0.0, 0.3, 1.0])
+    def test_bit_identical_to_shrink2id_then_mask(self, shrink: float):
+        """The workspace block equals shrink2id(corr)[ix_(mask, mask)] exactly, NaNs included."""
+        rng = np.random.default_rng(3)
+        corr = _random_correlation(9)
+        corr[4, :] = corr[:, 4] = np.nan
+        workspace = np.empty((2, 9, 9))
+        for _ in range(5):
+            mask = rng.random(9) < 0.6
+            mask[0] = True
+            np.testing.assert_array_equal(
+                _shrink_masked(corr, np.flatnonzero(mask), shrink, workspace),
+                shrink2id(corr, lamb=shrink)[np.ix_(mask, mask)],
+            )
+
+    def test_returns_a_view_into_the_workspace(self):
+        """No new buffer is allocated for the block."""
+        workspace = np.empty((2, 3, 3))
+        block = _shrink_masked(np.eye(3), np.array([0, 1]), 0.5, workspace)
+        assert np.shares_memory(block, workspace)
+
+
 class TestRiskPosition:
     """The per-timestamp shrunk-correlation solve."""
 
+    def test_factor_once_path_matches_the_two_factorisation_reference(self):
+        """A wide positive-definite system gives the cvx inv_a_norm/solve result."""
+        corr = _random_correlation(90, seed=4)
+        mu_row = np.random.default_rng(5).standard_normal(90)
+        mask = np.ones(90, dtype=bool)
+        mask[::7] = False
+
+        matrix = (0.7 * corr + 0.3 * np.eye(90))[np.ix_(mask, mask)]
+        expected = solve(matrix, mu_row[mask]) / inv_a_norm(mu_row[mask], matrix)
+
+        np.testing.assert_allclose(_risk_position(corr, mu_row, mask, shrink=0.7), expected, rtol=1e-9)
+
+    def test_ill_conditioned_system_still_warns(self):
+        """A system over the condition threshold reaches cvx.linalg, which warns about it."""
+        corr = np.array([[1.0, 1.0 - 1e-12], [1.0 - 1e-12, 1.0]])
+
+        with pytest.warns(IllConditionedMatrixWarning):
+            _risk_position(corr, np.array([1.0, 0.0]), np.ones(2, dtype=bool), shrink=1.0)
+
+    def test_single_precision_system_too_ill_conditioned_is_solved_in_double(self):
+        """A float32 system over the float32 threshold (but far under 1e12) is solved in float64."""
+        corr = np.array([[1.0, 0.9999], [0.9999, 1.0]], dtype=np.float32)
+        mu = np.array([1.0, 0.0], dtype=np.float32)
+        both = np.ones(2, dtype=bool)
+
+        assert kernel_module._cond_threshold(np.float32) < np.linalg.cond(corr) < kernel_module._COND_THRESHOLD
+        np.testing.assert_allclose(
+            _risk_position(corr, mu, both, 1.0), _risk_position(corr.astype(np.float64), mu, both, 1.0), rtol=1e-9
+        )
+
+    def test_integer_positions_equal_boolean_mask(self):
+        """The mask may be given as the integer positions of the tradable assets."""
+        corr = _random_correlation(6, seed=2)
+        mu = np.random.default_rng(2).standard_normal(6)
+        mask = np.array([True, False, True, True, False, True])
+        np.testing.assert_array_equal(
+            _risk_position(corr, mu, np.flatnonzero(mask), 0.4), _risk_position(corr, mu, mask, 0.4)
+        )
+
+    def test_workspace_does_not_change_the_result(self):
+        """Passing a reused workspace gives bit-identical positions."""
+        corr = _random_correlation(12, seed=4)
+        mu = np.random.default_rng(4).standard_normal(12)
+        mask = np.ones(12, dtype=bool)
+        mask[[2, 7]] = False
+        workspace = np.full((2, 12, 12), np.nan)
+        np.testing.assert_array_equal(
+            _risk_position(corr, mu, mask, 0.6, workspace), _risk_position(corr, mu, mask, 0.6)
+        )
+
     def test_well_posed_system_solves_directionally(self):
         """Positive mu on an identity correlation yields a positive, finite position.
 
@@ -101,3 +268,539 @@ class TestUpdateProfitVariance:
         updated = _update_profit_variance(2.0, cash_pos_prev, returns_row, ret_mask, lamb=0.5)
 
         assert updated == 1.0
+
+    def test_accumulates_single_precision_inputs_in_float64(self):
+        """float32 positions and returns give the float64 update of the same (rounded) values."""
+        cash = np.array([1.1, -2.3, 0.7], dtype=np.float32)
+        returns = np.array([0.013, 0.021, -0.008], dtype=np.float32)
+        both = np.ones(3, dtype=bool)
+
+        updated = _update_profit_variance(1e-4, cash, returns, both, lamb=0.99)
+
+        assert updated == _update_profit_variance(1e-4, cash.astype(float), returns.astype(float), both, lamb=0.99)
+
+
+class TestMaskRuns:
+    """Grouping of consecutive timestamps with the same tradable set."""
+
+    def test_runs_cover_every_row_with_its_mask(self):
+        """Runs are contiguous, exhaustive and carry each row's positions."""
+        rng = np.random.default_rng(5)
+        valid = np.repeat(rng.random((6, 4)) < 0.7, rng.integers(1, 5, size=6), axis=0)
+
+        runs = _mask_runs(valid)
+
+        assert runs[0][0] == 0
+        assert runs[-1][1] == len(valid)
+        for (_, stop, _), (start, _, _) in itertools.pairwise(runs):
+            assert stop == start
+        for start, stop, index in runs:
+            for t in range(start, stop):
+                np.testing.assert_array_equal(np.flatnonzero(valid[t]), index)
+
+    def test_adjacent_runs_differ(self):
+        """A new run starts only where the mask changes."""
+        valid = np.array([[True, True], [True, True], [False, False], [True, True]])
+        assert [(start, stop) for start, stop, _ in _mask_runs(valid)] == [(0, 2), (2, 3), (3, 4)]
+
+    def test_empty(self):
+        """No rows, no runs."""
+        assert _mask_runs(np.zeros((0, 3), dtype=bool)) == []
+
+
+class TestSolveRiskPositions:
+    """Phase one of the walk: every timestamp's unscaled solve as one batch."""
+
+    def test_rows_match_the_per_timestamp_solve(self):
+        """Each batch row equals _risk_position for that timestamp, NaN off-mask."""
+        rng = np.random.default_rng(0)
+        prices = np.array([[1.0, 1.0, 1.0], [1.0, np.nan, 1.0], [1.0, 1.0, 1.0]])
+        mu = rng.standard_normal((3, 3))
+        corr = np.array([[1.0, 0.3, 0.1], [0.3, 1.0, 0.2], [0.1, 0.2, 1.0]])
+        cor = np.stack([corr, corr])
+
+        raw = _solve_risk_positions(cor, np.array([0, 1]), prices, mu, shrink=0.5)
+
+        full = np.array([True, True, True])
+        partial = np.array([True, False, True])
+        np.testing.assert_array_equal(raw[0], _risk_position(corr, mu[0], full, 0.5))
+        np.testing.assert_array_equal(raw[1, partial], _risk_position(corr, mu[1], partial, 0.5))
+        assert np.isnan(raw[1, 1])
+
+    def test_listing_and_delisting_match_per_row_masks(self):
+        """Runs of shared masks give bit-identical results to per-row boolean masks."""
+        rng = np.random.default_rng(6)
+        n, t = 5, 12
+        prices = np.ones((t, n))
+        prices[:4, 3] = np.nan  # lists at row 4
+        prices[8:, 1] = np.nan  # delists at row 8
+        prices[6] = np.nan
+        mu = rng.standard_normal((t, n))
+        cor = np.stack([_random_correlation(n, seed=k) for k in range(t)])
+
+        raw = _solve_risk_positions(cor, np.arange(t), prices, mu, shrink=0.7)
+
+        for i in range(t):
+            mask = np.isfinite(prices[i])
+            if mask.any():
+                np.testing.assert_array_equal(raw[i, mask], _risk_position(cor[i], mu[i], mask, 0.7))
+            assert np.isnan(raw[i, ~mask]).all()
+
+    def test_single_precision_cube_is_solved_in_single_precision(self):
+        """A float32 cube gives float32 solves within single-precision rounding of the float64 ones."""
+        rng = np.random.default_rng(7)
+        n, t = 6, 5
+        prices = np.ones((t, n), dtype=np.float32)
+        mu = rng.standard_normal((t, n)).astype(np.float32)
+        cor = np.stack([_random_correlation(n, seed=k) for k in range(t)])
+
+        single = _solve_risk_positions(cor.astype(np.float32), np.arange(t), prices, mu, shrink=0.5)
+        double = _solve_risk_positions(cor, np.arange(t), prices.astype(float), mu.astype(float), shrink=0.5)
+
+        assert single.dtype == np.float32
+        np.testing.assert_allclose(single, double, rtol=1e-4, atol=1e-5)
+
+    def test_all_missing_row_stays_nan(self):
+        """A timestamp with no tradable asset is not solved."""
+        prices = np.full((1, 2), np.nan)
+        raw = _solve_risk_positions(np.eye(2)[None], np.array([0]), prices, np.ones((1, 2)), shrink=1.0)
+        assert np.isnan(raw).all()
+
+    @pytest.mark.parametrize("workers", [2, 3, 64])
+    def test_threaded_chunks_match_the_serial_solve(self, workers: int):
+        """Solving chunks of timestamps on a thread pool gives the serial result bit for bit."""
+        rng = np.random.default_rng(9)
+        n, t = 5, 23
+        prices = np.ones((t, n))
+        prices[:7, 2] = np.nan
+        prices[15:, 4] = np.nan
+        mu = rng.standard_normal((t, n))
+        cor = np.stack([_random_correlation(n, seed=k) for k in range(t)])
+
+        threaded = _solve_risk_positions(cor, np.arange(t), prices, mu, shrink=0.6, workers=workers)
+
+        np.testing.assert_array_equal(threaded, _solve_risk_positions(cor, np.arange(t), prices, mu, shrink=0.6))
+
+
+def _drifting_cube(n: int, t: int) -> np.ndarray:
+    """Correlations moving slowly between two random matrices, like an EWM estimate."""
+    a, b = _random_correlation(n, seed=11), _random_correlation(n, seed=12)
+    return np.stack([(1 - w) * a + w * b for w in np.linspace(0.0, 1.0, t)])
+
+
+class TestSolveFactorisedRiskPositions:
+    """Phase one from stored Cholesky factors."""
+
+    def test_bit_identical_to_the_direct_solve(self):
+        """Listings, delistings, NaN and zero mu all reproduce _solve_risk_positions exactly."""
+        rng = np.random.default_rng(8)
+        n, t = 5, 10
+        prices = np.ones((t, n))
+        prices[:3, 4] = np.nan
+        prices[7:, 0] = np.nan
+        prices[5] = np.nan
+        cor = np.stack([_random_correlation(n, seed=k) for k in range(t)])
+        factors = np.empty((t, n, n))
+        _factorise_risk_systems(cor, np.arange(t), prices, 0.4, factors)
+
+        for mu in (rng.standard_normal((t, n)), np.zeros((t, n)), np.where(rng.random((t, n)) < 0.2, np.nan, 1.0)):
+            np.testing.assert_array_equal(
+                _solve_factorised_risk_positions(factors, cor, np.arange(t), prices, mu, 0.4),
+                _solve_risk_positions(cor, np.arange(t), prices, mu, 0.4),
+            )
+
+    def test_unfactorisable_date_takes_the_reference_path(self, mocker):
+        """A date stored without a factor is solved by _risk_position."""
+        cor = np.stack([_random_correlation(3), _random_correlation(3, seed=1)])
+        cor[1, 0, 2] = cor[1, 2, 0] = np.nan
+        factors = np.empty((2, 3, 3))
+        _factorise_risk_systems(cor, np.arange(2), np.ones((2, 3)), 0.5, factors)
+        spy = mocker.spy(kernel_module, "_risk_position")
+
+        raw = _solve_factorised_risk_positions(factors, cor, np.arange(2), np.ones((2, 3)), np.ones((2, 3)), 0.5)
+
+        assert np.isnan(factors[1, 0, 0])
+        assert spy.call_count == 1
+        np.testing.assert_array_equal(raw[1], _risk_position(cor[1], np.ones(3), np.ones(3, dtype=bool), 0.5))
+
+
+class TestSolveRiskPositionsBatched:
+    """Phase one solving runs of fully observed dates as stacked array operations."""
+
+    def test_matches_the_direct_solve(self, mocker):
+        """Full runs are batched, partial runs solved per date, both agreeing with the direct solve."""
+        n, t = 8, 30
+        cor = _drifting_cube(n, t)
+        prices = np.ones((t, n))
+        prices[:10, 4] = np.nan  # lists at row 10
+        prices[20, 2] = np.nan  # a one-day gap splits the full run
+        mu = np.random.default_rng(8).standard_normal((t, n))
+        spy = mocker.spy(kernel_module, "_risk_position")
+
+        batched = _solve_risk_positions_batched(cor, np.arange(t), prices, mu, shrink=0.6)
+        per_date = spy.call_count
+
+        direct = _solve_risk_positions(cor, np.arange(t), prices, mu, shrink=0.6)
+        np.testing.assert_allclose(batched, direct, rtol=1e-10, atol=1e-12)
+        assert per_date == 11  # the ten dates before the listing and the gap
+
+    def test_degenerate_dates_give_zeros(self):
+        """An all-zero mu inside a batch is zeroed, as _risk_position zeroes it."""
+        t, n = 4, 3
+        mu = np.ones((t, n))
+        mu[2] = 0.0
+
+        batched = _solve_risk_positions_batched(_drifting_cube(n, t), np.arange(t), np.ones((t, n)), mu, shrink=0.5)
+
+        np.testing.assert_array_equal(batched[2], np.zeros(n))
+        assert np.all(batched[[0, 1, 3]] != 0.0)
+
+    def test_declined_dates_take_the_reference_path(self, mocker):
+        """NaN cells and an indefinite matrix fall back to _risk_position with its results."""
+        cor = _drifting_cube(3, 5)
+        cor[1, 0, 2] = cor[1, 2, 0] = np.nan
+        cor[3] = np.array([[1.0, 3.0, 0.0], [3.0, 1.0, 0.0], [0.0, 0.0, 1.0]])
+        mu = np.random.default_rng(4).standard_normal((5, 3))
+        prices = np.ones((5, 3))
+        spy = mocker.spy(kernel_module, "_risk_position")
+
+        batched = _solve_risk_positions_batched(cor, np.arange(5), prices, mu, shrink=0.5)
+
+        assert spy.call_count == 2  # only the two declined dates
+        direct = _solve_risk_positions(cor, np.arange(5), prices, mu, shrink=0.5)
+        np.testing.assert_array_equal(batched[[1, 3]], direct[[1, 3]])
+        np.testing.assert_allclose(batched, direct, rtol=1e-10, atol=1e-12)
+
+    def test_ill_conditioned_date_is_declined_alone(self, mocker):
+        """A factor over the condition threshold sends only its own date to _risk_position."""
+        cor = _drifting_cube(2, 4)
+        cor[2] = np.array([[1.0, 1.0 - 1e-12], [1.0 - 1e-12, 1.0]])
+        mu = np.random.default_rng(6).standard_normal((4, 2))
+        spy = mocker.spy(kernel_module, "_risk_position")
+
+        with pytest.warns(IllConditionedMatrixWarning):
+            _solve_risk_positions_batched(cor, np.arange(4), np.ones((4, 2)), mu, shrink=1.0)
+
+        assert spy.call_count == 1
+
+    def test_long_runs_are_solved_in_slices(self, monkeypatch):
+        """A run longer than the cell budget is batched slice by slice with the same result."""
+        n, t = 4, 11
+        cor = _drifting_cube(n, t)
+        mu = np.random.default_rng(5).standard_normal((t, n))
+        whole = _solve_risk_positions_batched(cor, np.arange(t), np.ones((t, n)), mu, shrink=0.5)
+        monkeypatch.setattr(kernel_module, "_BATCH_CELLS", 3 * n * n)
+
+        sliced = _solve_risk_positions_batched(cor, np.arange(t), np.ones((t, n)), mu, shrink=0.5)
+
+        np.testing.assert_array_equal(sliced, whole)
+
+
+class TestRiskPositionStack:
+    """The stacked counterpart of _risk_position."""
+
+    def test_agrees_with_the_per_date_solve(self):
+        """Each row of the stack is _risk_position's answer for that date, to rounding."""
+        n, t = 12, 40
+        cor = _drifting_cube(n, t)
+        mu = np.random.default_rng(9).standard_normal((t, n))
+
+        positions, declined = _risk_position_stack(cor, mu, 0.7)
+
+        assert not declined.any()
+        for i in range(t):
+            expected = _risk_position(cor[i], mu[i], np.ones(n, dtype=bool), 0.7)
+            np.testing.assert_allclose(positions[i], expected, rtol=1e-10, atol=1e-12)
+
+    def test_condition_estimate_matches_lapack(self):
+        """The stacked estimate is pocon's estimate of the inverse's 1-norm, a lower bound on it."""
+        cor = _drifting_cube(6, 10)
+        lower = np.linalg.cholesky(cor)
+        norm = np.abs(cor).sum(axis=1).max(axis=1)
+
+        estimate = _inverse_norm_estimate(lower, np.ascontiguousarray(lower.transpose(0, 2, 1)))
+
+        reference = [
+            1.0 / (dpocon(factor, a_norm, uplo="L")[0] * a_norm) for factor, a_norm in zip(lower, norm, strict=True)
+        ]
+        np.testing.assert_allclose(estimate, reference, rtol=1e-12)
+        assert np.all(estimate <= np.abs(np.linalg.inv(cor)).sum(axis=1).max(axis=1) * (1 + 1e-12))
+
+
+class TestSolveBlockRiskPositions:
+    """Phase one with the correlation split into independently solved blocks."""
+
+    def test_matches_dense_solve_with_cross_block_cells_zeroed(self):
+        """Per-block solves under a shared normaliser equal the block-diagonal dense solve."""
+        rng = np.random.default_rng(8)
+        n, t = 9, 4
+        labels = np.array([0, 1, 2, 0, 1, 2, 0, 1, 2])
+        cor = np.stack([_random_correlation(n, seed=k) for k in range(t)])
+        block_diagonal = np.where(labels[:, None] == labels[None, :], cor, 0.0)
+        prices = np.ones((t, n))
+        prices[1, [0, 4]] = np.nan
+        prices[2] = np.nan
+        mu = rng.standard_normal((t, n))
+
+        raw = _solve_block_risk_positions(cor, np.arange(t), prices, mu, 0.6, labels)
+
+        expected = _solve_risk_positions(block_diagonal, np.arange(t), prices, mu, shrink=0.6)
+        np.testing.assert_allclose(raw, expected, rtol=1e-10, atol=1e-12)
+
+    def test_single_block_equals_the_dense_walk(self):
+        """One block covering every asset is the ordinary solve."""
+        cor = np.stack([_random_correlation(5, seed=k) for k in range(3)])
+        mu = np.random.default_rng(9).standard_normal((3, 5))
+        prices = np.ones((3, 5))
+        raw = _solve_block_risk_positions(cor, np.arange(3), prices, mu, 0.3, np.zeros(5, dtype=int))
+        np.testing.assert_allclose(raw, _solve_risk_positions(cor, np.arange(3), prices, mu, shrink=0.3), rtol=1e-12)
+
+    @pytest.mark.filterwarnings("ignore:invalid value encountered:RuntimeWarning")
+    @pytest.mark.parametrize("mu", [[0.1, 0.0, 1.0, 0.0], [1.0, 0.5, 1.0, 0.0]])
+    def test_indefinite_block_follows_the_dense_solve(self, mu: list[float]):
+        """An indefinite block enters the normaliser with its sign; a negative sum zeroes the whole date."""
+        corr = np.eye(4)
+        corr[2, 3] = corr[3, 2] = 1.5  # the second block has no Cholesky factor
+        prices, mu_rows = np.ones((1, 4)), np.array([mu])
+
+        raw = _solve_block_risk_positions(corr[None], np.arange(1), prices, mu_rows, 1.0, np.array([0, 0, 1, 1]))
+
+        expected = _solve_risk_positions(corr[None], np.arange(1), prices, mu_rows, shrink=1.0)
+        np.testing.assert_allclose(raw, expected, rtol=1e-12)
+        assert np.all(raw[0] == 0.0) == (mu[0] == 0.1)
+
+    def test_warmup_block_is_nan_and_zero_mu_is_zero(self):
+        """A block still in warmup stays NaN without spoiling the others; zero mu yields zeros."""
+        corr = np.eye(4)
+        corr[2:, :] = corr[:, 2:] = np.nan
+        labels = np.array([0, 0, 1, 1])
+        prices = np.ones((2, 4))
+        mu = np.array([[1.0, 0.0, 1.0, 1.0], [0.0, 0.0, 0.0, 0.0]])
+
+        raw = _solve_block_risk_positions(np.stack([corr, corr]), np.arange(2), prices, mu, 1.0, labels)
+
+        np.testing.assert_array_equal(raw[0, :2], [1.0, 0.0])
+        assert np.isnan(raw[0, 2:]).all()
+        np.testing.assert_array_equal(raw[1], np.zeros(4))
+
+
+class TestSolveRiskPositionsForShrinks:
+    """Phase one for several shrinks from one eigendecomposition per timestamp."""
+
+    def test_matches_the_single_shrink_batch(self):
+        """Each slice agrees with _solve_risk_positions for its shrink, masks included."""
+        rng = np.random.default_rng(1)
+        n = 6
+        prices = np.ones((4, n))
+        prices[1, 2] = np.nan
+        prices[3] = np.nan
+        mu = rng.standard_normal((4, n))
+        cor = np.stack([_random_correlation(n, seed=k) for k in range(4)])
+        rows = np.arange(4)
+        shrinks = np.array([0.0, 0.25, 0.5, 0.9, 1.0])
+
+        raw = _solve_risk_positions_for_shrinks(cor, rows, prices, mu, shrinks)
+
+        assert raw.shape == (len(shrinks), 4, n)
+        for k, shrink in enumerate(shrinks):
+            np.testing.assert_allclose(
+                raw[k], _solve_risk_positions(cor, rows, prices, mu, shrink=shrink), rtol=1e-9, atol=1e-12
+            )
+
+    def test_non_finite_system_falls_back(self, mocker):
+        """A NaN-bearing matrix is handed to _risk_position and matches it."""
+        spy = mocker.spy(kernel_module, "_risk_position")
+        partial = _random_correlation(3)
+        partial[2, :] = partial[:, 2] = np.nan
+        prices = np.ones((1, 3))
+        mu = np.array([[1.0, 0.5, -0.2]])
+        shrinks = np.array([1.0, 0.5])
+
+        raw = _solve_risk_positions_for_shrinks(partial[None], np.array([0]), prices, mu, shrinks)
+
+        assert spy.call_count == len(shrinks)
+        for k, shrink in enumerate(shrinks):
+            expected = _risk_position(partial, mu[0], np.ones(3, dtype=bool), float(shrink))
+            np.testing.assert_array_equal(raw[k, 0], expected)
+
+    def test_zero_mu_and_missing_rows(self):
+        """An all-zero mu yields zeros and an all-missing row stays NaN for every shrink."""
+        prices = np.array([[1.0, 1.0], [np.nan, np.nan]])
+        raw = _solve_risk_positions_for_shrinks(
+            np.stack([np.eye(2), np.eye(2)]), np.array([0, 1]), prices, np.zeros((2, 2)), np.array([0.2, 0.8])
+        )
+        np.testing.assert_array_equal(raw[:, 0], np.zeros((2, 2)))
+        assert np.isnan(raw[:, 1]).all()
+
+
+class TestSolveRiskPositionsForSignals:
+    """Phase one for several signals from one factorisation per timestamp."""
+
+    def test_matches_the_single_signal_batch(self):
+        """Each slice agrees with _solve_risk_positions for its signal, masks and NaNs included."""
+        rng = np.random.default_rng(2)
+        n, t = 6, 5
+        prices = np.ones((t, n))
+        prices[1, 2] = np.nan
+        prices[3] = np.nan
+        mus = rng.standard_normal((4, t, n))
+        mus[1, 2, 4] = np.nan
+        mus[2] = 0.0
+        cor = np.stack([_random_correlation(n, seed=k) for k in range(t)])
+        rows = np.arange(t)
+
+        raw = _solve_risk_positions_for_signals(cor, rows, prices, mus, shrink=0.6)
+
+        assert raw.shape == (4, t, n)
+        for k, mu in enumerate(mus):
+            np.testing.assert_allclose(
+                raw[k], _solve_risk_positions(cor, rows, prices, mu, shrink=0.6), rtol=1e-10, atol=1e-13
+            )
+        np.testing.assert_array_equal(raw[2][np.isfinite(prices)], 0.0)
+
+    def test_factorises_each_timestamp_once(self, mocker):
+        """The Cholesky factor is shared by every signal of a timestamp."""
+        spy = mocker.spy(kernel_module, "_cholesky_factor")
+        mus = np.random.default_rng(3).standard_normal((5, 3, 4))
+        cor = np.stack([_random_correlation(4, seed=k) for k in range(3)])
+
+        _solve_risk_positions_for_signals(cor, np.arange(3), np.ones((3, 4)), mus, shrink=0.5)
+
+        assert spy.call_count == 3
+
+    def test_non_finite_system_falls_back(self, mocker):
+        """A NaN-bearing matrix is handed to _risk_position once per signal and matches it."""
+        spy = mocker.spy(kernel_module, "_risk_position")
+        partial = _random_correlation(3)
+        partial[2, :] = partial[:, 2] = np.nan
+        mus = np.array([[[1.0, 0.5, -0.2]], [[0.3, -0.1, 0.4]]])
+
+        raw = _solve_risk_positions_for_signals(partial[None], np.array([0]), np.ones((1, 3)), mus, shrink=0.5)
+
+        assert spy.call_count == 2
+        for k, mu in enumerate(mus):
+            np.testing.assert_array_equal(raw[k, 0], _risk_position(partial, mu[0], np.ones(3, dtype=bool), 0.5))
+
+
+def _random_factor_model(n: int, k: int, seed: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    """Loadings with row norms below one and the idiosyncratic term completing a unit diagonal."""
+    rng = np.random.default_rng(seed)
+    loadings = rng.standard_normal((n, k))
+    loadings *= rng.uniform(0.2, 0.95, size=(n, 1)) / np.linalg.norm(loadings, axis=1, keepdims=True)
+    return loadings, 1.0 - np.sum(loadings**2, axis=1)
+
+
+class TestFactorRiskPosition:
+    """Woodbury solve against a factor-plus-diagonal correlation."""
+
+    @pytest.mark.parametrize("shrink", [0.0, 0.5, 1.0])
+    def test_matches_the_dense_solve(self, shrink: float):
+        """The Woodbury position equals _risk_position on the dense matrix."""
+        loadings, idiosyncratic = _random_factor_model(30, 3)
+        mu = np.random.default_rng(1).standard_normal(30)
+        index = np.flatnonzero(np.arange(30) % 7 != 0)
+        dense = loadings @ loadings.T + np.diag(idiosyncratic)
+
+        np.testing.assert_allclose(
+            _factor_risk_position(loadings, idiosyncratic, mu, index, shrink),
+            _risk_position(dense, mu, index, shrink),
+            rtol=1e-10,
+            atol=1e-12,
+        )
+
+    def test_assets_without_correlation_are_nan(self):
+        """NaN-loaded assets are left NaN and the rest solve without them."""
+        loadings, idiosyncratic = _random_factor_model(5, 2)
+        loadings[2], idiosyncratic[2] = np.nan, np.nan
+        mu = np.arange(1.0, 6.0)
+        result = _factor_risk_position(loadings, idiosyncratic, mu, np.arange(5), 0.5)
+
+        assert np.isnan(result[2])
+        keep = np.array([0, 1, 3, 4])
+        np.testing.assert_allclose(
+            result[keep], _factor_risk_position(loadings, idiosyncratic, mu, keep, 0.5), rtol=1e-12
+        )
+
+    def test_all_zero_mu_returns_zeros(self):
+        """A zero expected return is degenerate and yields zeros."""
+        loadings, idiosyncratic = _random_factor_model(4, 1)
+        result = _factor_risk_position(loadings, idiosyncratic, np.zeros(4), np.arange(4), 0.5)
+        np.testing.assert_array_equal(result, np.zeros(4))
+
+
+class TestSolveFactorRiskPositions:
+    """Phase one of the walk under the factor model."""
+
+    def test_rows_match_the_per_timestamp_solve(self):
+        """Each row equals _factor_risk_position for its tradable assets, NaN elsewhere."""
+        models = [_random_factor_model(6, 2, seed=s) for s in range(3)]
+        loadings = np.stack([m[0] for m in models])
+        idiosyncratic = np.stack([m[1] for m in models])
+        prices = np.ones((3, 6))
+        prices[1, 4] = np.nan
+        mu = np.random.default_rng(3).standard_normal((3, 6))
+
+        raw = _solve_factor_risk_positions(loadings, idiosyncratic, np.arange(3), prices, mu, 0.5)
+
+        for i in range(3):
+            index = np.flatnonzero(np.isfinite(prices[i]))
+            np.testing.assert_array_equal(
+                raw[i, index], _factor_risk_position(loadings[i], idiosyncratic[i], mu[i], index, 0.5)
+            )
+        assert np.isnan(raw[1, 4])
+
+
+class TestScaleRiskPositions:
+    """Phase two of the walk: the sequential profit-variance scan."""
+
+    def test_first_row_is_unscaled_and_later_rows_follow_realised_pnl(self):
+        """The scan starts at unit variance and updates it from the previous cash position."""
+        prices = np.array([[100.0, 50.0], [110.0, 50.0]])
+        returns = np.array([[0.0, 0.0], [0.1, 0.0]])
+        vola = np.full((2, 2), 0.5)
+        raw = np.array([[1.0, 0.0], [1.0, 0.0]])
+        risk = np.full((2, 2), np.nan)
+        cash = np.full((2, 2), np.nan)
+
+        _scale_risk_positions(raw, np.array([0, 1]), prices, returns, vola, risk, cash)
+
+        np.testing.assert_array_equal(risk[0], [1.0, 0.0])
+        np.testing.assert_array_equal(cash[0], [2.0, 0.0])
+        # profit = 2.0 * 0.1 = 0.2 ; variance = 0.99 * 1.0 + 0.01 * 0.04
+        expected_pv = _update_profit_variance(1.0, cash[0], returns[1], np.array([True, True]), lamb=0.99)
+        np.testing.assert_array_equal(risk[1], raw[1] / expected_pv)
+
+    def test_rebalancing_every_date_is_the_default_scan(self):
+        """A schedule selecting every date reproduces the unscheduled scan bit for bit."""
+        rng = np.random.default_rng(9)
+        prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, size=(12, 3)), axis=0))
+        prices[4, 1] = np.nan
+        returns = np.zeros_like(prices)
+        returns[1:] = prices[1:] / prices[:-1] - 1.0
+        raw, vola, rows = rng.standard_normal((12, 3)), np.full((12, 3), 0.2), np.arange(12)
+        buffers = [np.full((12, 3), np.nan) for _ in range(4)]
+
+        _scale_risk_positions(raw, rows, prices, returns, vola, buffers[0], buffers[1])
+        _scale_risk_positions(raw, rows, prices, returns, vola, buffers[2], buffers[3], np.ones(12, dtype=bool))
+
+        np.testing.assert_array_equal(buffers[1], buffers[3])
+
+    def test_carried_dates_hold_cash_and_still_update_the_variance(self):
+        """Between rebalances the cash position is held, and its P&L feeds the next rebalance."""
+        prices = np.array([[100.0, 50.0], [110.0, 50.0], [99.0, 55.0], [99.0, 55.0]])
+        returns = np.zeros_like(prices)
+        returns[1:] = prices[1:] / prices[:-1] - 1.0
+        vola = np.full((4, 2), 0.5)
+        raw = np.array([[1.0, -1.0], [9.0, 9.0], [9.0, 9.0], [1.0, 0.5]])
+        risk, cash = np.full((4, 2), np.nan), np.full((4, 2), np.nan)
+        solved = np.array([True, False, False, True])
+
+        _scale_risk_positions(raw, np.arange(4), prices, returns, vola, risk, cash, solved)
+
+        np.testing.assert_array_equal(cash[1], cash[0])
+        np.testing.assert_array_equal(cash[2], cash[0])
+        both = np.array([True, True])
+        variance = 1.0
+        for row in (1, 2, 3):
+            variance = _update_profit_variance(variance, cash[0], returns[row], both, lamb=0.99)
+        np.testing.assert_allclose(cash[3], raw[3] / variance / vola[3], rtol=1e-15)
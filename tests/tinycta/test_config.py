@@ -78,3 +78,13 @@ class TestConfig:
         """Config rejects unknown extra fields."""
         with pytest.raises(ValidationError):
             Config(vola=50, corr=200, clip=4.2, shrink=0.5, aum=1e6)  # ty: ignore[unknown-argument]
+
+    def test_factors_defaults_to_dense(self):
+        """Factors is optional and unset by default."""
+        assert Config(vola=50, corr=50, clip=4.2, shrink=0.5).factors is None
+
+    def test_factors_must_be_positive(self):
+        """A factor count must be at least one."""
+        assert Config(vola=50, corr=50, clip=4.2, shrink=0.5, factors=1).factors == 1
+        with pytest.raises(ValidationError):
+            Config(vola=50, corr=50, clip=4.2, shrink=0.5, factors=0)
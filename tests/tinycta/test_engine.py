@@ -8,8 +8,13 @@ import numpy as np
 import polars as pl
 import pytest
 
+import tinycta.engine as engine_module
 from tinycta.config import Config
-from tinycta.engine import Engine
+from tinycta.engine import Engine, FactorisedEngine, sweep, sweep_signals, warmup_bars
+from tinycta.panel import Panel
+from tinycta.signal import correlation_blocks
+from tinycta.solver import Batched, Blocks, Direct, Jit
+from tinycta.util import vol_adj
 
 
 def _synthetic_prices(n_days: int = 500, assets: list[str] | None = None) -> pl.DataFrame:
@@ -98,6 +103,22 @@ class TestEngine:
         numeric_cols = [c for c in result.columns if c != "date"]
         assert all(result[c].is_finite().any() for c in numeric_cols)
 
+    def test_output_keeps_non_asset_columns_in_place(self, synthetic_prices: pl.DataFrame, cfg: Config):
+        """Only the numeric asset columns are replaced; order and other columns survive."""
+        prices = synthetic_prices.with_columns(pl.lit("desk").alias("book")).select("date", "book", "A", "B", "C")
+        result = Engine(prices=prices, mu=prices, cfg=cfg).cash_position
+        assert result.columns == ["date", "book", "A", "B", "C"]
+        assert result["book"].equals(prices["book"])
+        assert result.schema["A"] == pl.Float64
+
+    def test_output_columns_match_the_walk(
+        self, synthetic_prices: pl.DataFrame, assets: list[str], cfg: Config, mocker
+    ):
+        """Each asset column holds exactly its column of the position matrix."""
+        positions = mocker.spy(engine_module, "_cash_positions")
+        result = Engine(prices=synthetic_prices, mu=synthetic_prices, cfg=cfg).cash_position
+        np.testing.assert_array_equal(result.select(assets).to_numpy(), positions.spy_return)
+
     def test_all_nan_row_is_skipped(self, synthetic_prices: pl.DataFrame, assets: list[str], cfg: Config):
         """A row where all prices are NaN is skipped without raising."""
         nan_row = {
@@ -135,3 +156,594 @@ class TestEngine:
         mu = prices.with_columns(pl.lit(0.0).alias(a) for a in assets)
         result = Engine(prices=prices, mu=mu, cfg=cfg).cash_position
         assert result is not None
+
+
+class TestEnginePanels:
+    """Engine reads its frames through panels built once, and can be built from panels."""
+
+    def test_from_panels_matches_frames(self, synthetic_prices: pl.DataFrame, cfg: Config):
+        """An engine over panels returns the same positions as one over the frames."""
+        mu = synthetic_prices.with_columns(pl.col("A", "B", "C") * 0.0 + 0.01)
+        from_frames = Engine(prices=synthetic_prices, mu=mu, cfg=cfg).cash_position
+        from_panels = Engine.from_panels(Panel.from_frame(synthetic_prices), Panel.from_frame(mu), cfg)
+        assert from_panels.cash_position.equals(from_frames)
+
+    def test_from_panels_rejects_different_assets(self, synthetic_prices: pl.DataFrame, cfg: Config):
+        """Both panels must carry the same assets in the same order."""
+        prices = Panel.from_frame(synthetic_prices)
+        with pytest.raises(ValueError, match="share their assets"):
+            Engine.from_panels(prices, Panel.from_frame(synthetic_prices, ["C", "B", "A"]), cfg)
+
+    def test_prices_are_converted_once(self, synthetic_prices: pl.DataFrame, cfg: Config, mocker):
+        """Engine.assets and cash_position reuse one price panel instead of re-selecting the frame."""
+        spy = mocker.spy(Panel, "from_frame")
+        engine = Engine(prices=synthetic_prices, mu=synthetic_prices.clone(), cfg=cfg)
+        for _ in range(3):
+            _ = engine.assets
+        _ = engine.cash_position
+        frames = [call.args[0] for call in spy.call_args_list]
+        assert sum(frame is synthetic_prices for frame in frames) == 1
+
+
+class TestEnginePrecision:
+    """Engine with Direct(precision="float32"): single-precision storage and solves."""
+
+    @pytest.fixture
+    def wide(self) -> tuple[pl.DataFrame, pl.DataFrame]:
+        """Twelve assets with random expected returns."""
+        assets = [f"X{i}" for i in range(12)]
+        prices = _synthetic_prices(n_days=400, assets=assets)
+        rng = np.random.default_rng(17)
+        return prices, prices.with_columns(pl.Series(a, rng.normal(size=prices.height)) for a in assets)
+
+    @pytest.mark.parametrize("shrink", [0.2, 0.9])
+    def test_error_against_float64_is_measured(self, wide: tuple[pl.DataFrame, pl.DataFrame], shrink: float):
+        """Positions agree with the float64 run to 1e-5 of the largest position, NaNs in the same places."""
+        prices, mu = wide
+        cfg = Config(vola=16, corr=32, clip=4.2, shrink=shrink)
+        double = Engine(prices=prices, mu=mu, cfg=cfg).cash_position.drop("date").to_numpy()
+        single = (
+            Engine(prices=prices, mu=mu, cfg=cfg, solver=Direct(precision="float32"))
+            .cash_position.drop("date")
+            .to_numpy()
+        )
+
+        np.testing.assert_array_equal(np.isnan(single), np.isnan(double))
+        assert np.nanmax(np.abs(single - double)) <= 1e-5 * np.nanmax(np.abs(double))
+
+    def test_correlations_are_stored_in_single_precision(self, wide: tuple[pl.DataFrame, pl.DataFrame], cfg: Config):
+        """The cube, and every matrix of Engine.cor, take half the memory; the output stays float64."""
+        prices, mu = wide
+        double = Engine(prices=prices, mu=mu, cfg=cfg)
+        single = Engine(prices=prices, mu=mu, cfg=cfg, solver=Direct(precision="float32"))
+
+        assert single.cor_cube.matrices.dtype == np.float32
+        assert single.cor_cube.matrices.nbytes * 2 == double.cor_cube.matrices.nbytes
+        assert next(iter(single.cor.values())).dtype == np.float32
+        assert all(dtype == pl.Float64 for dtype in single.cash_position.drop("date").dtypes)
+
+    def test_panels_are_built_in_single_precision(self, wide: tuple[pl.DataFrame, pl.DataFrame], cfg: Config):
+        """The cached price and mu panels are float32 themselves, not float32 copies of float64 panels."""
+        prices, mu = wide
+        single = Engine(prices=prices, mu=mu, cfg=cfg, solver=Direct(precision="float32"))
+        _ = single.cash_position
+
+        assert single.price_panel.values.dtype == single.mu_panel.values.dtype == np.float32
+
+
+class TestEngineCache:
+    """Memoisation of the derived frames on an Engine instance."""
+
+    def test_cor_and_cash_position_share_one_covariance(
+        self, synthetic_prices: pl.DataFrame, assets: list[str], cfg: Config, mocker
+    ):
+        """Accessing cor and then cash_position builds the EWM covariance once."""
+        spy = mocker.spy(engine_module, "_ewm_correlation")
+        mu = synthetic_prices.with_columns(pl.lit(0.01).alias(a) for a in assets)
+        engine = Engine(prices=synthetic_prices, mu=mu, cfg=cfg)
+
+        cor = engine.cor
+        positions = engine.cash_position
+
+        assert spy.call_count == 1
+        assert engine.cor is cor
+        assert engine.cash_position is positions
+
+    def test_ret_adj_and_vola_are_collected_together(
+        self, synthetic_prices: pl.DataFrame, assets: list[str], cfg: Config, mocker
+    ):
+        """Both frames come from one collect_all and equal the eager per-column expressions."""
+        spy = mocker.spy(engine_module.pl, "collect_all")
+        engine = Engine(prices=synthetic_prices, mu=synthetic_prices, cfg=cfg)
+
+        ret_adj, vola = engine.ret_adj, engine.vola
+
+        assert spy.call_count == 1
+        assert ret_adj.equals(synthetic_prices.with_columns(vol_adj(pl.col(a), vola=50, clip=4.2) for a in assets))
+        expected = synthetic_prices.with_columns(
+            pl.col(a).pct_change().ewm_std(com=49, adjust=True, min_samples=50) for a in assets
+        )
+        assert vola.equals(expected)
+
+    def test_clear_cache_forces_recomputation(self, synthetic_prices: pl.DataFrame, assets: list[str], cfg: Config):
+        """clear_cache drops every memoised frame; the recomputed values are equal."""
+        mu = synthetic_prices.with_columns(pl.lit(0.01).alias(a) for a in assets)
+        engine = Engine(prices=synthetic_prices, mu=mu, cfg=cfg)
+        before = (engine.ret_adj, engine.vola, engine.cash_position)
+
+        engine.clear_cache()
+
+        assert not {"_adjusted", "ret_adj", "vola", "cor", "cash_position"} & set(vars(engine))
+        after = (engine.ret_adj, engine.vola, engine.cash_position)
+        assert all(a is not b for a, b in zip(before, after, strict=True))
+        assert all(a.equals(b) for a, b in zip(before, after, strict=True))
+
+
+class TestEngineCorStore:
+    """The memory-mapped correlation store behind Engine.cor_cube."""
+
+    def test_cash_position_matches_in_memory_engine(
+        self, synthetic_prices: pl.DataFrame, assets: list[str], cfg: Config, tmp_path
+    ):
+        """A store-backed engine walks the memory-mapped cube to the same positions."""
+        mu = synthetic_prices.with_columns(pl.lit(0.01).alias(a) for a in assets)
+        in_memory = Engine(prices=synthetic_prices, mu=mu, cfg=cfg)
+        stored = Engine(prices=synthetic_prices, mu=mu, cfg=cfg, cor_store=tmp_path)
+
+        assert isinstance(stored.cor_cube.matrices, np.memmap)
+        assert stored.cash_position.equals(in_memory.cash_position)
+        assert len(list(tmp_path.glob("*.npy"))) == 2
+
+
+class TestSweep:
+    """sweep evaluates a grid of configs while sharing their intermediates."""
+
+    @pytest.fixture
+    def grid(self) -> list[Config]:
+        """Two (vola, clip) pairs x two corrs x two shrinks, plus a duplicate."""
+        configs = [
+            Config(vola=vola, corr=corr, clip=clip, shrink=shrink)
+            for vola, clip in [(20, 4.2), (20, 3.0)]
+            for corr in (30, 60)
+            for shrink in (0.3, 0.8)
+        ]
+        return [*configs, configs[0]]
+
+    def test_matches_individual_engines(self, synthetic_prices: pl.DataFrame, assets: list[str], grid: list[Config]):
+        """Each swept frame equals the cash_position of a standalone Engine."""
+        mu = synthetic_prices.with_columns(pl.lit(0.01).alias(a) for a in assets)
+        positions = sweep(synthetic_prices, mu, grid)
+
+        assert list(positions) == list(dict.fromkeys(grid))
+        for cfg, frame in positions.items():
+            assert frame.equals(Engine(prices=synthetic_prices, mu=mu, cfg=cfg).cash_position)
+
+    def test_each_intermediate_is_computed_once(
+        self, synthetic_prices: pl.DataFrame, assets: list[str], grid: list[Config], mocker
+    ):
+        """One ret_adj per (vola, clip), one vola per vola, one cube per (vola, clip, corr)."""
+        ret_adj = mocker.spy(engine_module, "_ret_adj")
+        vola = mocker.spy(engine_module, "_vola")
+        cube = mocker.spy(engine_module, "_ewm_correlation")
+        mu = synthetic_prices.with_columns(pl.lit(0.01).alias(a) for a in assets)
+
+        sweep(synthetic_prices, mu, grid)
+
+        assert ret_adj.call_count == 2
+        assert vola.call_count == 1
+        assert cube.call_count == 4
+
+    def test_eigh_mode_matches_to_rounding(
+        self, synthetic_prices: pl.DataFrame, assets: list[str], grid: list[Config], mocker
+    ):
+        """eigh=True solves each cube's shrinks together and agrees with Engine to rounding."""
+        spy = mocker.spy(engine_module, "_solve_risk_positions_for_shrinks")
+        rng = np.random.default_rng(7)
+        mu = synthetic_prices.with_columns(pl.Series(a, rng.normal(size=synthetic_prices.height)) for a in assets)
+
+        positions = sweep(synthetic_prices, mu, grid, eigh=True)
+
+        assert spy.call_count == 4
+        for cfg, frame in positions.items():
+            expected = Engine(prices=synthetic_prices, mu=mu, cfg=cfg).cash_position
+            np.testing.assert_allclose(
+                frame.select(assets).to_numpy(), expected.select(assets).to_numpy(), rtol=1e-9, atol=1e-12
+            )
+
+    def test_empty_grid(self, synthetic_prices: pl.DataFrame):
+        """No configs, no work."""
+        assert sweep(synthetic_prices, synthetic_prices, []) == {}
+
+    def test_validates_frames(self, cfg: Config):
+        """Misaligned frames are rejected exactly as Engine rejects them."""
+        prices = pl.DataFrame({"date": [1, 2, 3], "A": [1.0, 2.0, 3.0]})
+        with pytest.raises(ValueError, match="same shape"):
+            sweep(prices, prices.head(2), [cfg])
+
+
+class TestSweepSignals:
+    """sweep_signals: many mu frames against one set of prices and one config."""
+
+    @pytest.fixture
+    def mus(self, synthetic_prices: pl.DataFrame, assets: list[str]) -> dict[str, pl.DataFrame]:
+        """Three signals, one of them flat."""
+        rng = np.random.default_rng(11)
+        height = synthetic_prices.height
+        return {
+            "fast": synthetic_prices.with_columns(pl.Series(a, rng.normal(size=height)) for a in assets),
+            "slow": synthetic_prices.with_columns(pl.Series(a, rng.normal(0.1, 0.01, size=height)) for a in assets),
+            "flat": synthetic_prices.with_columns(pl.lit(0.0).alias(a) for a in assets),
+        }
+
+    @pytest.mark.parametrize("factors", [None, 2])
+    def test_matches_one_engine_per_signal(
+        self, synthetic_prices: pl.DataFrame, assets: list[str], mus: dict[str, pl.DataFrame], factors: int | None
+    ):
+        """Every signal's positions equal its own Engine's to rounding."""
+        cfg = Config(vola=50, corr=50, clip=4.2, shrink=0.5, factors=factors)
+        positions = sweep_signals(synthetic_prices, mus, cfg)
+
+        assert list(positions) == list(mus)
+        for name, frame in positions.items():
+            expected = Engine(prices=synthetic_prices, mu=mus[name], cfg=cfg).cash_position
+            assert frame.columns == expected.columns
+            np.testing.assert_allclose(
+                frame.select(assets).to_numpy(), expected.select(assets).to_numpy(), rtol=1e-10, equal_nan=True
+            )
+
+    def test_covariance_is_computed_once(
+        self, synthetic_prices: pl.DataFrame, mus: dict[str, pl.DataFrame], cfg: Config, mocker
+    ):
+        """The correlation cube is shared by every signal."""
+        spy = mocker.spy(engine_module, "_ewm_correlation")
+        sweep_signals(synthetic_prices, mus, cfg)
+        assert spy.call_count == 1
+
+    def test_empty_and_misaligned_signals(self, synthetic_prices: pl.DataFrame, cfg: Config):
+        """No signals give no frames; a misaligned frame fails Engine's validation."""
+        assert sweep_signals(synthetic_prices, {}, cfg) == {}
+        with pytest.raises(ValueError, match="same shape"):
+            sweep_signals(synthetic_prices, {"short": synthetic_prices.head(10)}, cfg)
+
+
+class TestFactorisedEngine:
+    """FactorisedEngine: stored per-date factors re-solved for new signals."""
+
+    @pytest.fixture
+    def gappy_prices(self, synthetic_prices: pl.DataFrame) -> pl.DataFrame:
+        """Synthetic prices with a late listing and a gap, so the tradable set changes."""
+        return synthetic_prices.with_columns(
+            pl.when(pl.int_range(pl.len()) < 120).then(None).otherwise(pl.col("C")).alias("C"),
+            pl.when(pl.int_range(pl.len()).is_between(300, 310)).then(None).otherwise(pl.col("A")).alias("A"),
+        )
+
+    def test_positions_are_bit_identical_to_engine(self, gappy_prices: pl.DataFrame, assets: list[str], cfg: Config):
+        """Every re-solve reproduces Engine.cash_position exactly."""
+        engine = FactorisedEngine(prices=gappy_prices, cfg=cfg)
+        rng = np.random.default_rng(5)
+        for _ in range(3):
+            mu = gappy_prices.with_columns(pl.Series(a, rng.normal(size=gappy_prices.height)) for a in assets)
+            assert engine.positions_for(mu).equals(Engine(prices=gappy_prices, mu=mu, cfg=cfg).cash_position)
+
+    def test_factorises_once_across_signals(
+        self, synthetic_prices: pl.DataFrame, assets: list[str], cfg: Config, mocker
+    ):
+        """The factors are computed on first use and reused by every later signal."""
+        spy = mocker.spy(engine_module, "_factorise_risk_systems")
+        engine = FactorisedEngine(prices=synthetic_prices, cfg=cfg)
+        for value in (0.01, -0.02):
+            engine.positions_for(synthetic_prices.with_columns(pl.lit(value).alias(a) for a in assets))
+        assert spy.call_count == 1
+
+    def test_store_maps_existing_factors(
+        self, synthetic_prices: pl.DataFrame, assets: list[str], cfg: Config, tmp_path, mocker
+    ):
+        """A second engine over the same inputs maps the stored factors instead of recomputing them."""
+        mu = synthetic_prices.with_columns(pl.lit(0.01).alias(a) for a in assets)
+        first = FactorisedEngine(prices=synthetic_prices, cfg=cfg, cor_store=tmp_path).positions_for(mu)
+        spy = mocker.spy(engine_module, "_factorise_risk_systems")
+
+        again = FactorisedEngine(prices=synthetic_prices, cfg=cfg, cor_store=tmp_path)
+
+        assert again.positions_for(mu).equals(first)
+        assert isinstance(again.factors, np.memmap)
+        assert spy.call_count == 0
+        assert len(list(tmp_path.glob("*.factors.npy"))) == 1
+
+    def test_rejects_factor_mode_and_misaligned_mu(self, synthetic_prices: pl.DataFrame, cfg: Config):
+        """Factor-model configs have no dense factors, and mu must align with prices."""
+        with pytest.raises(ValueError, match=r"cfg\.factors"):
+            FactorisedEngine(prices=synthetic_prices, cfg=Config(vola=50, corr=50, clip=4.2, shrink=0.5, factors=2))
+        with pytest.raises(ValueError, match="same shape"):
+            FactorisedEngine(prices=synthetic_prices, cfg=cfg).positions_for(synthetic_prices.head(10))
+
+
+class TestEngineRebalance:
+    """Engine with a rebalance schedule: solves on selected dates, carried in between."""
+
+    @pytest.fixture
+    def mu(self, synthetic_prices: pl.DataFrame, assets: list[str]) -> pl.DataFrame:
+        """Random expected returns, so every solve moves the position."""
+        rng = np.random.default_rng(13)
+        return synthetic_prices.with_columns(pl.Series(a, rng.normal(size=synthetic_prices.height)) for a in assets)
+
+    def test_every_bar_is_the_default_walk(self, synthetic_prices: pl.DataFrame, mu: pl.DataFrame, cfg: Config):
+        """Direct(rebalance=1) reproduces the unscheduled engine bit for bit."""
+        daily = Engine(prices=synthetic_prices, mu=mu, cfg=cfg, solver=Direct(rebalance=1)).cash_position
+        assert daily.equals(Engine(prices=synthetic_prices, mu=mu, cfg=cfg).cash_position)
+
+    def test_every_kth_bar_solves_only_those_dates(
+        self, synthetic_prices: pl.DataFrame, mu: pl.DataFrame, assets: list[str], cfg: Config, mocker
+    ):
+        """Positions change only every fifth walked bar, and only those bars are solved."""
+        spy = mocker.spy(engine_module, "_solve_risk_positions")
+        engine = Engine(prices=synthetic_prices, mu=mu, cfg=cfg, solver=Direct(rebalance=5))
+        positions = engine.cash_position.select(assets).to_numpy()
+
+        walked = engine.cor_cube.rows
+        assert len(spy.call_args.args[1]) == len(range(0, len(walked), 5))
+        assert spy.call_args.args[0] is engine.cor_cube.matrices  # matrices are read in place, not gathered
+        changes = np.flatnonzero(np.any(positions[walked[1:]] != positions[walked[:-1]], axis=1)) + 1
+        assert set(changes) <= set(range(0, len(walked), 5))
+        default = Engine(prices=synthetic_prices, mu=mu, cfg=cfg).cash_position.select(assets).to_numpy()
+        np.testing.assert_array_equal(positions[walked[0]], default[walked[0]])
+
+    def test_integer_schedule_is_built_lazily(
+        self, synthetic_prices: pl.DataFrame, mu: pl.DataFrame, cfg: Config, mocker
+    ):
+        """Constructing an engine with Direct(rebalance=k) does not build the correlation cube."""
+        spy = mocker.spy(engine_module, "_ewm_correlation")
+        engine = Engine(prices=synthetic_prices, mu=mu, cfg=cfg, solver=Direct(rebalance=5))
+        assert spy.call_count == 0
+
+        np.testing.assert_array_equal(np.flatnonzero(engine.rebalance_dates), engine.cor_cube.rows[::5])
+
+    def test_rebalanced_solves_read_a_stored_cube_in_place(
+        self, synthetic_prices: pl.DataFrame, mu: pl.DataFrame, cfg: Config, tmp_path
+    ):
+        """With a memory-mapped store, scheduled solves match the in-memory cube's."""
+        stored = Engine(prices=synthetic_prices, mu=mu, cfg=cfg, solver=Direct(rebalance=5), cor_store=tmp_path)
+        in_memory = Engine(prices=synthetic_prices, mu=mu, cfg=cfg, solver=Direct(rebalance=5))
+        assert isinstance(stored.cor_cube.matrices, np.memmap)
+        assert stored.cash_position.equals(in_memory.cash_position)
+
+    def test_weekday_rule_and_date_list_agree(
+        self, synthetic_prices: pl.DataFrame, mu: pl.DataFrame, assets: list[str], cfg: Config
+    ):
+        """A weekday expression and the list of dates it selects give the same positions."""
+        fridays = pl.col("date").dt.weekday() == 5
+        by_rule = Engine(prices=synthetic_prices, mu=mu, cfg=cfg, solver=Direct(rebalance=fridays))
+        listed = synthetic_prices.filter(fridays)["date"].to_list()
+        by_list = Engine(prices=synthetic_prices, mu=mu, cfg=cfg, solver=Direct(rebalance=listed))
+
+        assert by_rule.cash_position.equals(by_list.cash_position)
+        positions = by_rule.cash_position
+        moved = positions.filter(pl.any_horizontal(pl.col(a).fill_nan(None).diff() != 0 for a in assets))
+        assert (moved["date"].dt.weekday() == 5).all()
+
+    @pytest.mark.parametrize(
+        ("rebalance", "match"),
+        [
+            (0, "positive number of bars"),
+            (True, "positive number of bars"),
+            (pl.col("A"), "must be boolean"),
+            ([datetime.date(1999, 1, 1)], "not in prices"),
+        ],
+    )
+    def test_invalid_schedules_are_rejected(self, synthetic_prices: pl.DataFrame, cfg: Config, rebalance, match: str):
+        """Non-positive steps, non-boolean expressions and unknown dates raise ValueError."""
+        with pytest.raises(ValueError, match=match):
+            Engine(prices=synthetic_prices, mu=synthetic_prices, cfg=cfg, solver=Direct(rebalance=rebalance))
+
+
+class TestEngineWorkers:
+    """Engine with Direct(workers=k): the dense walk's solves on a thread pool."""
+
+    @pytest.mark.parametrize("rebalance", [None, 3])
+    def test_matches_the_serial_walk(self, synthetic_prices: pl.DataFrame, assets: list[str], cfg: Config, rebalance):
+        """Threaded solves give the serial engine's positions bit for bit, with or without a schedule."""
+        rng = np.random.default_rng(19)
+        mu = synthetic_prices.with_columns(pl.Series(a, rng.normal(size=synthetic_prices.height)) for a in assets)
+        serial = Engine(prices=synthetic_prices, mu=mu, cfg=cfg, solver=Direct(rebalance=rebalance))
+        threaded = Engine(prices=synthetic_prices, mu=mu, cfg=cfg, solver=Direct(rebalance=rebalance, workers=4))
+
+        assert threaded.cash_position.equals(serial.cash_position)
+
+
+class TestWarmupBars:
+    """warmup_bars sizes the history each EWM stage needs."""
+
+    def test_grows_as_the_tolerance_tightens(self, cfg: Config):
+        """A smaller tolerance never needs less history."""
+        bars = [warmup_bars(cfg, tolerance) for tolerance in (1e-1, 1e-2, 1e-4, 1e-8)]
+        assert bars == sorted(bars)
+        assert bars[0] > cfg.vola + cfg.corr
+
+    @pytest.mark.parametrize("tolerance", [0.0, 1.0, -1e-3])
+    def test_rejects_tolerances_outside_the_unit_interval(self, cfg: Config, tolerance: float):
+        """Only tolerances strictly between 0 and 1 are meaningful."""
+        with pytest.raises(ValueError, match="tolerance"):
+            warmup_bars(cfg, tolerance)
+
+
+class TestEngineWindow:
+    """Engine.cash_position_window: positions over a date range from a trimmed history."""
+
+    @pytest.fixture
+    def prices(self) -> pl.DataFrame:
+        """A history several warm-ups long."""
+        return _synthetic_prices(n_days=1500)
+
+    @pytest.fixture
+    def mu(self, prices: pl.DataFrame, assets: list[str]) -> pl.DataFrame:
+        """Random expected returns."""
+        rng = np.random.default_rng(21)
+        return prices.with_columns(pl.Series(a, rng.normal(size=prices.height)) for a in assets)
+
+    @pytest.fixture
+    def window_cfg(self) -> Config:
+        """Short lookbacks, so the warm-up is well inside the history."""
+        return Config(vola=8, corr=16, clip=4.2, shrink=0.5)
+
+    @pytest.mark.parametrize("tolerance", [1e-2, 1e-4])
+    def test_within_tolerance_of_the_full_run(
+        self, prices: pl.DataFrame, mu: pl.DataFrame, assets: list[str], window_cfg: Config, tolerance: float
+    ):
+        """The window's positions differ from the full run by at most tolerance times their scale."""
+        engine = Engine(prices=prices, mu=mu, cfg=window_cfg)
+        start, end = prices["date"][1400], prices["date"][1450]
+        window = engine.cash_position_window(start, end, tolerance=tolerance)
+
+        full = engine.cash_position.filter(pl.col("date").is_between(start, end))
+        assert window["date"].equals(full["date"])
+        got, expected = window.select(assets).to_numpy(), full.select(assets).to_numpy()
+        assert np.max(np.abs(got - expected)) <= tolerance * np.max(np.abs(expected))
+
+    def test_only_the_warm_up_is_walked(self, prices: pl.DataFrame, mu: pl.DataFrame, window_cfg: Config, mocker):
+        """The trimmed engine sees the window plus warmup_bars rows, not the full history."""
+        spy = mocker.spy(engine_module, "_market_arrays")
+        start = prices["date"][1400]
+        window = Engine(prices=prices, mu=mu, cfg=window_cfg).cash_position_window(start, tolerance=1e-2)
+
+        assert window.height == 100
+        assert spy.call_args.args[0].shape[0] == 100 + warmup_bars(window_cfg, 1e-2)
+
+    def test_empty_window(self, prices: pl.DataFrame, mu: pl.DataFrame, window_cfg: Config):
+        """A range without any date returns an empty frame with the same columns."""
+        window = Engine(prices=prices, mu=mu, cfg=window_cfg).cash_position_window(datetime.date(2030, 1, 1))
+        assert window.height == 0
+        assert window.columns == prices.columns
+
+    def test_date_list_schedule_is_trimmed(
+        self, prices: pl.DataFrame, mu: pl.DataFrame, assets: list[str], window_cfg: Config
+    ):
+        """Scheduled dates before the trimmed history are dropped; the rest still apply."""
+        mondays = prices.filter(pl.col("date").dt.weekday() == 1)["date"].to_list()
+        engine = Engine(prices=prices, mu=mu, cfg=window_cfg, solver=Direct(rebalance=mondays))
+        window = engine.cash_position_window(prices["date"][1400], tolerance=1e-4)
+
+        moved = window.filter(pl.any_horizontal(pl.col(a).diff() != 0 for a in assets)).slice(1)
+        assert (moved["date"].dt.weekday() == 1).all()
+
+    def test_bar_count_schedule_is_rejected(self, prices: pl.DataFrame, mu: pl.DataFrame, window_cfg: Config):
+        """Every k-th bar depends on where the history starts, so it cannot be trimmed."""
+        engine = Engine(prices=prices, mu=mu, cfg=window_cfg, solver=Direct(rebalance=5))
+        with pytest.raises(ValueError, match="counts bars"):
+            engine.cash_position_window(prices["date"][1400])
+
+
+class TestEngineFactorMode:
+    """Engine with cfg.factors: Woodbury solves against a factor-model correlation."""
+
+    def test_full_rank_matches_dense_engine(self, synthetic_prices: pl.DataFrame, assets: list[str]):
+        """With as many factors as assets and no gaps, positions match the dense engine."""
+        mu = synthetic_prices.with_columns(pl.lit(0.01).alias(a) for a in assets)
+        dense = Engine(prices=synthetic_prices, mu=mu, cfg=Config(vola=50, corr=50, clip=4.2, shrink=0.5))
+        factor = Engine(
+            prices=synthetic_prices, mu=mu, cfg=Config(vola=50, corr=50, clip=4.2, shrink=0.5, factors=len(assets))
+        )
+        np.testing.assert_allclose(
+            factor.cash_position.select(assets).to_numpy(), dense.cash_position.select(assets).to_numpy(), rtol=1e-6
+        )
+
+    def test_does_not_build_the_dense_cube(self, synthetic_prices: pl.DataFrame, assets: list[str], mocker):
+        """cash_position in factor mode never evaluates the dense correlations."""
+        spy = mocker.spy(engine_module, "_ewm_correlation")
+        mu = synthetic_prices.with_columns(pl.lit(0.01).alias(a) for a in assets)
+        engine = Engine(prices=synthetic_prices, mu=mu, cfg=Config(vola=50, corr=50, clip=4.2, shrink=0.5, factors=1))
+
+        positions = engine.cash_position
+
+        assert spy.call_count == 0
+        assert np.isfinite(positions.select(assets).to_numpy()[-1]).all()
+
+    def test_factor_cube_requires_factors(self, synthetic_prices: pl.DataFrame, cfg: Config):
+        """factor_cube is only defined in factor mode."""
+        with pytest.raises(ValueError, match="factors"):
+            _ = Engine(prices=synthetic_prices, mu=synthetic_prices, cfg=cfg).factor_cube
+
+    @pytest.mark.parametrize(
+        "solver",
+        [
+            Direct(rebalance=5),
+            Direct(precision="float32"),
+            Direct(workers=2),
+            Blocks({"A": 0, "B": 0, "C": 1}),
+            Batched(),
+        ],
+    )
+    def test_other_walks_are_rejected(self, synthetic_prices: pl.DataFrame, solver):
+        """The factor model has its own walk, so only the default Direct() solver is accepted."""
+        cfg = Config(vola=50, corr=50, clip=4.2, shrink=0.5, factors=1)
+        with pytest.raises(ValueError, match=r"default Direct\(\) solver"):
+            Engine(prices=synthetic_prices, mu=synthetic_prices, cfg=cfg, solver=solver)
+
+    def test_sweep_mixes_dense_and_factor_configs(self, synthetic_prices: pl.DataFrame, assets: list[str]):
+        """Dense and factor configs are swept apart and each matches Engine."""
+        mu = synthetic_prices.with_columns(pl.lit(0.01).alias(a) for a in assets)
+        configs = [Config(vola=20, corr=40, clip=4.2, shrink=0.5, factors=f) for f in (None, 1, 2)]
+
+        positions = sweep(synthetic_prices, mu, configs)
+
+        for cfg in configs:
+            assert positions[cfg].equals(Engine(prices=synthetic_prices, mu=mu, cfg=cfg).cash_position)
+
+
+class TestEngineBlocks:
+    """Engine with blocks: per-block solves of a block-diagonal correlation."""
+
+    def test_one_block_matches_the_dense_engine(self, synthetic_prices: pl.DataFrame, assets: list[str], cfg: Config):
+        """Putting every asset in one block reproduces the ordinary engine."""
+        mu = synthetic_prices.with_columns(pl.lit(0.01).alias(a) for a in assets)
+        dense = Engine(prices=synthetic_prices, mu=mu, cfg=cfg).cash_position
+        blocked = Engine(
+            prices=synthetic_prices, mu=mu, cfg=cfg, solver=Blocks(dict.fromkeys(assets, "all"))
+        ).cash_position
+        np.testing.assert_allclose(
+            blocked.select(assets).to_numpy(), dense.select(assets).to_numpy(), rtol=1e-10, equal_nan=True
+        )
+
+    def test_blocks_from_correlation_clustering(self, synthetic_prices: pl.DataFrame, assets: list[str], cfg: Config):
+        """Blocks clustered from the trailing correlation drive a finite walk."""
+        mu = synthetic_prices.with_columns(pl.lit(0.01).alias(a) for a in assets)
+        engine = Engine(prices=synthetic_prices, mu=mu, cfg=cfg)
+        blocks = correlation_blocks(engine.cor_cube.matrices[-50:].mean(axis=0), assets, threshold=0.5)
+
+        positions = Engine(prices=synthetic_prices, mu=mu, cfg=cfg, solver=Blocks(blocks)).cash_position
+
+        assert len(set(blocks.values())) == len(assets)  # independent synthetic assets
+        assert np.isfinite(positions.select(assets).to_numpy()[-1]).all()
+
+    def test_blocks_must_cover_every_asset(self, synthetic_prices: pl.DataFrame, cfg: Config):
+        """An asset without a block is rejected."""
+        with pytest.raises(ValueError, match=r"missing \['C'\]"):
+            Engine(prices=synthetic_prices, mu=synthetic_prices, cfg=cfg, solver=Blocks({"A": 0, "B": 0}))
+
+
+class TestEngineSolver:
+    """Engine solver backends for the dense correlation walk."""
+
+    def test_batched_solver_matches_direct(self, synthetic_prices: pl.DataFrame, assets: list[str], cfg: Config):
+        """Batched solves over fully observed runs reproduce the direct walk to rounding."""
+        rng = np.random.default_rng(23)
+        mu = synthetic_prices.with_columns(pl.Series(a, rng.normal(size=synthetic_prices.height)) for a in assets)
+        direct = Engine(prices=synthetic_prices, mu=mu, cfg=cfg).cash_position
+        batched = Engine(prices=synthetic_prices, mu=mu, cfg=cfg, solver=Batched()).cash_position
+        np.testing.assert_allclose(
+            batched.select(assets).to_numpy(), direct.select(assets).to_numpy(), rtol=1e-10, equal_nan=True
+        )
+
+    def test_unknown_solver_is_rejected(self, synthetic_prices: pl.DataFrame, cfg: Config):
+        """Only the solver types of tinycta.solver are accepted."""
+        with pytest.raises(TypeError, match="solver must be"):
+            Engine(prices=synthetic_prices, mu=synthetic_prices, cfg=cfg, solver="lu")  # type: ignore[arg-type]
+
+    def test_jit_solver_matches_direct(self, synthetic_prices: pl.DataFrame, assets: list[str], cfg: Config):
+        """The compiled walk reproduces the direct walk to rounding."""
+        pytest.importorskip("numba")
+        mu = synthetic_prices.with_columns(pl.lit(0.01).alias(a) for a in assets)
+        direct = Engine(prices=synthetic_prices, mu=mu, cfg=cfg).cash_position
+        compiled = Engine(prices=synthetic_prices, mu=mu, cfg=cfg, solver=Jit()).cash_position
+        np.testing.assert_allclose(
+            compiled.select(assets).to_numpy(), direct.select(assets).to_numpy(), rtol=1e-10, equal_nan=True
+        )
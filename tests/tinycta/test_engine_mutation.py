@@ -20,7 +20,7 @@ import pytest
 from tinycta._kernel import _risk_position, _update_profit_variance
 from tinycta.config import Config
 from tinycta.engine import Engine
-from tinycta.ewm_cov import ewm_covariance
+from tinycta.ewm_cov import CorrelationCube, ewm_covariance
 from tinycta.linalg import inv_a_norm, solve
 from tinycta.signal import shrink2id
 
@@ -325,7 +325,7 @@ def test_cash_position_matches_reference_with_missing_row(cfg: Config):
 
 
 def test_cash_position_skips_degenerate_cor_key(cfg: Config, mocker):
-    """A cor key whose price row is fully missing is skipped without error.
+    """A cube row whose prices are fully missing is skipped without error.
 
     Date-aligned iteration only visits rows that ``ewm_covariance`` deems
     computable, so an all-NaN price row is never a real cor key. This forces such
@@ -350,12 +350,13 @@ def test_cash_position_skips_degenerate_cor_key(cfg: Config, mocker):
     mu = pl.DataFrame(mdata).with_columns(pl.col("date").cast(pl.Date))
     eng = Engine(prices=prices, mu=mu, cfg=cfg)
 
-    # Force a finite date (seeds prev_row) followed by the all-NaN date as cor keys.
-    forced = {dates[7]: np.eye(len(assets)), dates[8]: np.eye(len(assets))}
-    mocker.patch.object(Engine, "cor", new_callable=mocker.PropertyMock, return_value=forced)
+    # Force a finite row (seeds prev_row) followed by the all-NaN row into the cube.
+    forced = CorrelationCube(rows=np.array([7, 8]), matrices=np.stack([np.eye(len(assets))] * 2))
+    mocker.patch.object(Engine, "cor_cube", new_callable=mocker.PropertyMock, return_value=forced)
 
     result = eng.cash_position
     assert all(np.isfinite(result[a][7]) for a in assets)  # normal row processed
+    assert all(not np.isfinite(result[a][6]) for a in assets)  # rows outside the cube are never walked
     assert all(not np.isfinite(result[a][8]) for a in assets)  # degenerate row skipped
 
 
@@ -6,7 +6,15 @@ import numpy as np
 import polars as pl
 import pytest
 
-from tinycta.ewm_cov import NegativeWarmupError, ewm_covariance
+import tinycta.ewm_cov as ewm_cov_module
+from tinycta.ewm_cov import (
+    CorrelationCube,
+    FactorCube,
+    NegativeWarmupError,
+    ewm_correlation,
+    ewm_covariance,
+    ewm_factor_correlation,
+)
 
 
 @pytest.fixture
@@ -166,3 +174,169 @@ def test_matches_pandas_ewm_cov() -> None:
             assert mat[1, 1] == pytest.approx(expected_bb, rel=1e-6)
         if np.isfinite(expected_ab):
             assert mat[0, 1] == pytest.approx(expected_ab, rel=1e-6)
+
+
+class TestCorrelationCube:
+    """ewm_correlation: the dense (T, N, N) correlation store."""
+
+    def test_matches_normalised_ewm_covariance(self) -> None:
+        """Each cube slice equals the per-date covariance normalised to a correlation."""
+        rng = np.random.default_rng(1)
+        n = 40
+        b = rng.standard_normal(n).tolist()
+        b[:12] = [None] * 12  # a late-starting asset leaves NaN cells in early slices
+        df = pl.DataFrame({"date": list(range(n)), "A": rng.standard_normal(n).tolist(), "B": b})
+
+        cube = ewm_correlation(df, ["A", "B"], window=7, warmup=3)
+        cov = ewm_covariance(df, ["A", "B"], "date", window=7, warmup=3)
+
+        assert isinstance(cube, CorrelationCube)
+        assert cube.rows.tolist() == list(cov)
+        for mat, ref in zip(cube.matrices, cov.values(), strict=True):
+            std = np.sqrt(np.abs(np.diag(ref)))
+            outer = np.outer(std, std)
+            expected = np.divide(ref, outer, out=np.full(ref.shape, np.nan), where=outer > 0)
+            np.testing.assert_array_equal(mat, expected)
+
+    def test_is_one_contiguous_buffer(self, returns: pl.DataFrame) -> None:
+        """All matrices live in a single C-contiguous array."""
+        cube = ewm_correlation(returns, ["A", "B"], window=10)
+        assert cube.matrices.flags["C_CONTIGUOUS"]
+        assert cube.matrices.shape == (len(cube.rows), 2, 2)
+
+    def test_zero_variance_asset_is_nan(self) -> None:
+        """A constant asset has zero variance, so every cell touching it is NaN."""
+        df = pl.DataFrame({"A": [0.1, -0.2, 0.3, 0.1, -0.4], "B": [1.0] * 5})
+        cube = ewm_correlation(df, ["A", "B"], window=3)
+        assert np.isnan(cube.matrices[1:, 1, :]).all()
+        np.testing.assert_allclose(cube.matrices[1:, 0, 0], 1.0)
+
+    def test_invalid_warmup_raises(self, returns: pl.DataFrame) -> None:
+        """Warmup is validated like ewm_covariance's."""
+        with pytest.raises(TypeError):
+            ewm_correlation(returns, ["A"], window=3, warmup=True)
+        with pytest.raises(NegativeWarmupError):
+            ewm_correlation(returns, ["A"], window=3, warmup=-1)
+
+    def test_store_maps_the_cube_from_disk_and_reuses_it(self, returns: pl.DataFrame, tmp_path, mocker) -> None:
+        """A store directory yields the in-memory numbers, and a second call skips the computation."""
+        in_memory = ewm_correlation(returns, ["A", "B"], window=10, warmup=3)
+
+        stored = ewm_correlation(returns, ["A", "B"], window=10, warmup=3, store=tmp_path)
+        assert isinstance(stored.matrices, np.memmap)
+        np.testing.assert_array_equal(stored.rows, in_memory.rows)
+        np.testing.assert_array_equal(stored.matrices, in_memory.matrices)
+        assert len(list(tmp_path.glob("*.partial*"))) == 0
+
+        spy = mocker.spy(pl.DataFrame, "select")
+        again = ewm_correlation(returns, ["A", "B"], window=10, warmup=3, store=tmp_path)
+        assert spy.call_count == 1  # only the fingerprint read, no covariance evaluation
+        np.testing.assert_array_equal(again.matrices, in_memory.matrices)
+
+    def test_store_is_filled_in_contiguous_chunks_of_dates(self, returns: pl.DataFrame, tmp_path, monkeypatch) -> None:
+        """A small cell budget writes the cube a few dates at a time, front to back, with the same numbers."""
+        in_memory = ewm_correlation(returns, ["A", "B"], window=10, warmup=3)
+        writes: list[slice] = []
+        open_memmap = np.lib.format.open_memmap
+
+        class Recording(np.memmap):
+            def __setitem__(self, key, value) -> None:
+                writes.append(key)
+                super().__setitem__(key, value)
+
+        monkeypatch.setattr(np.lib.format, "open_memmap", lambda *a, **k: open_memmap(*a, **k).view(Recording))
+        monkeypatch.setattr(ewm_cov_module, "_BLOCK_CELLS", 7 * 2 * 2)
+
+        stored = ewm_correlation(returns, ["A", "B"], window=10, warmup=3, store=tmp_path)
+
+        assert [(key.start, key.stop) for key in writes] == [
+            (start, min(start + 7, len(in_memory.rows))) for start in range(0, len(in_memory.rows), 7)
+        ]
+        np.testing.assert_array_equal(stored.matrices, in_memory.matrices)
+
+    def test_store_entries_are_keyed_by_input(self, returns: pl.DataFrame, tmp_path) -> None:
+        """Different data or a different window never share a store file."""
+        ewm_correlation(returns, ["A", "B"], window=10, store=tmp_path)
+        ewm_correlation(returns, ["A", "B"], window=11, store=tmp_path)
+        ewm_correlation(returns.with_columns(pl.col("A") * 2), ["A", "B"], window=10, store=tmp_path)
+        assert len(list(tmp_path.glob("*.rows.npy"))) == 3
+
+    def test_float32_cube_rounds_the_float64_one(self, returns: pl.DataFrame, tmp_path) -> None:
+        """dtype=np.float32 stores the float64 correlations rounded once, in a separate store entry."""
+        double = ewm_correlation(returns, ["A", "B"], window=10, warmup=3, store=tmp_path)
+        single = ewm_correlation(returns, ["A", "B"], window=10, warmup=3, store=tmp_path, dtype=np.float32)
+
+        assert single.matrices.dtype == np.float32
+        assert single.matrices.nbytes * 2 == double.matrices.nbytes
+        np.testing.assert_array_equal(single.matrices, np.asarray(double.matrices).astype(np.float32))
+        assert len(list(tmp_path.glob("*.rows.npy"))) == 2
+
+
+class TestFactorCube:
+    """ewm_factor_correlation: the low-rank factor-plus-diagonal correlation model."""
+
+    @staticmethod
+    def _wide(n_rows: int = 60, n_assets: int = 8, seed: int = 0) -> pl.DataFrame:
+        rng = np.random.default_rng(seed)
+        common = rng.standard_normal((n_rows, 2)) @ rng.standard_normal((2, n_assets))
+        values = common + 0.5 * rng.standard_normal((n_rows, n_assets))
+        return pl.DataFrame(values, schema=[f"X{i}" for i in range(n_assets)])
+
+    def test_full_rank_matches_dense_on_gap_free_data(self) -> None:
+        """With k = N and no gaps the modelled matrices equal the dense cube to rounding."""
+        data = self._wide()
+        assets = data.columns
+        dense = ewm_correlation(data, assets, window=21, warmup=10)
+        cube = ewm_factor_correlation(data, assets, window=21, factors=len(assets), warmup=10)
+
+        assert isinstance(cube, FactorCube)
+        np.testing.assert_array_equal(cube.rows, dense.rows)
+        modelled = np.einsum("tik,tjk->tij", cube.loadings, cube.loadings)
+        np.testing.assert_allclose(modelled, dense.matrices, atol=1e-10)
+
+    def test_unit_diagonal_and_nonnegative_idiosyncratic(self) -> None:
+        """Truncation leaves a positive idiosyncratic share that completes the unit diagonal."""
+        data = self._wide()
+        cube = ewm_factor_correlation(data, data.columns, window=21, factors=2, warmup=10)
+
+        assert cube.loadings.shape == (len(cube.rows), 8, 2)
+        assert (cube.idiosyncratic > 0).all()
+        explained = np.sum(cube.loadings**2, axis=2)
+        np.testing.assert_allclose(explained + cube.idiosyncratic, 1.0, atol=1e-12)
+
+    def test_few_factors_capture_a_factor_structure(self) -> None:
+        """Two factors recover a two-factor correlation closely."""
+        data = self._wide(n_rows=400)
+        dense = ewm_correlation(data, data.columns, window=101, warmup=50).matrices[-1]
+        cube = ewm_factor_correlation(data, data.columns, window=101, factors=2, warmup=50)
+        modelled = cube.loadings[-1] @ cube.loadings[-1].T + np.diag(cube.idiosyncratic[-1])
+        assert np.abs(modelled - dense).max() < 0.1
+
+    def test_missing_and_warmup_assets_have_no_loadings(self) -> None:
+        """An asset is NaN on dates it is missing and before its warmup."""
+        data = self._wide().with_columns(
+            pl.when(pl.int_range(pl.len()) < 20).then(None).otherwise(pl.col("X3")).alias("X3"),
+            pl.when(pl.int_range(pl.len()) == 40).then(None).otherwise(pl.col("X5")).alias("X5"),
+        )
+        cube = ewm_factor_correlation(data, data.columns, window=21, factors=2, warmup=5)
+        by_row = dict(zip(cube.rows.tolist(), range(len(cube.rows)), strict=True))
+
+        assert np.isnan(cube.loadings[by_row[22], 3]).all()
+        assert np.isfinite(cube.loadings[by_row[24], 3]).all()
+        assert np.isnan(cube.idiosyncratic[by_row[40], 5])
+        assert np.isfinite(cube.idiosyncratic[by_row[41], 5])
+
+    def test_factors_capped_at_assets_and_empty_input(self) -> None:
+        """The factor count is capped at N, and a frame with no observations yields an empty cube."""
+        data = self._wide(n_assets=3)
+        assert ewm_factor_correlation(data, data.columns, window=5, factors=10).loadings.shape[2] == 3
+        empty = ewm_factor_correlation(pl.DataFrame({"A": [None, None]}, schema={"A": pl.Float64}), ["A"], 5, 1)
+        assert empty.rows.size == 0
+        assert empty.loadings.shape == (0, 1, 1)
+
+    def test_invalid_warmup_raises(self, returns: pl.DataFrame) -> None:
+        """Warmup is validated like ewm_correlation's."""
+        with pytest.raises(TypeError):
+            ewm_factor_correlation(returns, ["A"], window=3, factors=1, warmup=True)
+        with pytest.raises(NegativeWarmupError):
+            ewm_factor_correlation(returns, ["A"], window=3, factors=1, warmup=-1)
@@ -0,0 +1,208 @@
+"""Tests for tinycta.online: the streaming moments and the bar-by-bar engine."""
+
+from __future__ import annotations
+
+import datetime as dt
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+import pytest
+
+from tinycta.config import Config
+from tinycta.engine import Engine
+from tinycta.online import _CHECKPOINT_VERSION, EwmMoments, OnlineEngine
+
+
+def _series_with_nulls(n: int = 60, seed: int = 0) -> list[float | None]:
+    """Random series with a sprinkling of nulls, including a leading one."""
+    rng = np.random.default_rng(seed)
+    values: list[float | None] = rng.normal(size=n).tolist()
+    for i in [0, 7, 8, 30, n - 5]:
+        values[i] = None
+    return values
+
+
+def _prices_and_mu(n: int = 80, seed: int = 1) -> tuple[pl.DataFrame, pl.DataFrame, list[str]]:
+    """Four assets with staggered starts, single gaps and an all-null row."""
+    assets = ["A", "B", "C", "D"]
+    rng = np.random.default_rng(seed)
+    dates = [dt.date(2020, 1, 1) + dt.timedelta(days=i) for i in range(n)]
+    price_arr = 100 * np.exp(np.cumsum(rng.normal(0.0002, 0.02, size=(n, len(assets))), axis=0))
+    pdata: dict = {"date": dates}
+    mdata: dict = {"date": dates}
+    for j, asset in enumerate(assets):
+        vals: list[float | None] = price_arr[:, j].tolist()
+        for i in range(3 * j):
+            vals[i] = None  # staggered listing dates
+        vals[25 + j] = None
+        vals[50] = None
+        pdata[asset] = vals
+        mdata[asset] = rng.normal(0.001, 0.01, size=n).tolist()
+    prices = pl.DataFrame(pdata).with_columns(pl.col("date").cast(pl.Date))
+    mu = pl.DataFrame(mdata).with_columns(pl.col("date").cast(pl.Date))
+    return prices, mu, assets
+
+
+class TestEwmMoments:
+    """EwmMoments reproduces polars' ewm_mean/ewm_std exactly."""
+
+    @staticmethod
+    def _replay(values: list[float | None], moments: EwmMoments) -> tuple[np.ndarray, np.ndarray]:
+        means, stds = [], []
+        for x in values:
+            moments.update(np.array([np.nan if x is None else x]), np.array([x is not None]))
+            means.append(moments.mean_value()[0])
+            stds.append(moments.std_value()[0] if moments.variance else np.nan)
+        return np.array(means), np.array(stds)
+
+    @pytest.mark.parametrize("min_samples", [1, 5])
+    def test_mean_matches_polars(self, min_samples: int):
+        """The running mean equals ewm_mean bit for bit, nulls included."""
+        values = _series_with_nulls()
+        means, _ = self._replay(values, EwmMoments(alpha=0.1, shape=(1,), min_samples=min_samples))
+        expected = pl.Series(values).ewm_mean(com=9, min_samples=min_samples).fill_null(np.nan).to_numpy()
+        np.testing.assert_array_equal(means, expected)
+
+    @pytest.mark.parametrize("min_samples", [1, 5])
+    def test_std_matches_polars(self, min_samples: int):
+        """The bias-corrected standard deviation equals ewm_std bit for bit."""
+        values = _series_with_nulls(seed=3)
+        moments = EwmMoments(alpha=0.1, shape=(1,), min_samples=min_samples, variance=True)
+        _, stds = self._replay(values, moments)
+        expected = pl.Series(values).ewm_std(com=9, min_samples=min_samples).fill_null(np.nan).to_numpy()
+        np.testing.assert_array_equal(stds, expected)
+
+    def test_block_elements_are_independent(self):
+        """Each element of a block follows its own series."""
+        a, b = _series_with_nulls(seed=4), _series_with_nulls(seed=5)
+        b[12] = None
+        moments = EwmMoments(alpha=0.2, shape=(2,))
+        means = []
+        for x, y in zip(a, b, strict=True):
+            moments.update(
+                np.array([np.nan if x is None else x, np.nan if y is None else y]),
+                np.array([x is not None, y is not None]),
+            )
+            means.append(moments.mean_value())
+        for column, values in zip(np.array(means).T, [a, b], strict=True):
+            expected = pl.Series(values).ewm_mean(alpha=0.2).fill_null(np.nan).to_numpy()
+            np.testing.assert_array_equal(column, expected)
+
+    def test_restore_round_trips_state(self):
+        """Restoring a saved state continues the series exactly."""
+        values = _series_with_nulls(seed=6)
+        moments = EwmMoments(alpha=0.1, shape=(1,), variance=True)
+        clone = EwmMoments(alpha=0.1, shape=(1,), variance=True)
+        for x in values[:20]:
+            moments.update(np.array([np.nan if x is None else x]), np.array([x is not None]))
+        clone.restore(moments.state())
+        for x in values[20:]:
+            for m in (moments, clone):
+                m.update(np.array([np.nan if x is None else x]), np.array([x is not None]))
+            np.testing.assert_array_equal(clone.std_value(), moments.std_value())
+
+    def test_restore_rejects_wrong_shape(self):
+        """A state of another block shape is refused."""
+        state = EwmMoments(alpha=0.1, shape=(2,)).state()
+        with pytest.raises(ValueError, match="mean"):
+            EwmMoments(alpha=0.1, shape=(3,)).restore(state)
+
+
+class TestOnlineEngine:
+    """OnlineEngine replays the batch Engine one bar at a time."""
+
+    @pytest.mark.parametrize(
+        "cfg", [Config(vola=8, corr=16, clip=4.2, shrink=0.5), Config(vola=5, corr=5, clip=2.0, shrink=1.0)]
+    )
+    def test_matches_batch_engine(self, cfg: Config):
+        """Feeding every bar reproduces Engine.cash_position exactly."""
+        prices, mu, assets = _prices_and_mu()
+        batch = Engine(prices=prices, mu=mu, cfg=cfg).cash_position
+        online = OnlineEngine(cfg, assets).extend(prices, mu)
+        np.testing.assert_array_equal(online.select(assets).to_numpy(), batch.select(assets).to_numpy())
+        assert online["date"].equals(prices["date"])
+
+    def test_nan_gaps_match_null_gaps(self):
+        """Float NaN gaps are read as nulls by both engines, so online and batch still agree exactly."""
+        cfg = Config(vola=8, corr=16, clip=4.2, shrink=0.5)
+        prices, mu, assets = _prices_and_mu()
+        nan_prices = prices.with_columns(pl.col(assets).fill_null(np.nan))
+        batch = Engine(prices=nan_prices, mu=mu, cfg=cfg).cash_position
+        online = OnlineEngine(cfg, assets).extend(nan_prices, mu)
+        expected = Engine(prices=prices, mu=mu, cfg=cfg).cash_position.select(assets).to_numpy()
+        np.testing.assert_array_equal(batch.select(assets).to_numpy(), expected)
+        np.testing.assert_array_equal(online.select(assets).to_numpy(), expected)
+
+    def test_extend_in_chunks_equals_one_pass(self):
+        """Feeding history in two chunks equals feeding it in one."""
+        cfg = Config(vola=8, corr=16, clip=4.2, shrink=0.5)
+        prices, mu, assets = _prices_and_mu()
+        whole = OnlineEngine(cfg, assets).extend(prices, mu)
+        engine = OnlineEngine(cfg, assets)
+        head = engine.extend(prices.head(40), mu.head(40))
+        tail = engine.extend(prices.tail(40), mu.tail(40))
+        np.testing.assert_array_equal(
+            pl.concat([head, tail]).select(assets).to_numpy(), whole.select(assets).to_numpy()
+        )
+
+    def test_update_returns_one_row(self):
+        """A single update returns a float row, NaN for the warm-up bar."""
+        cfg = Config(vola=3, corr=3, clip=4.2, shrink=0.5)
+        engine = OnlineEngine(cfg, ["A", "B"])
+        row = engine.update([100.0, None], [0.1, 0.2])
+        assert row.shape == (2,)
+        assert np.isnan(row).all()
+        assert engine.profit_variance == 1.0
+
+    def test_profit_variance_moves(self):
+        """Once positions are live the profit variance leaves its initial value."""
+        cfg = Config(vola=8, corr=16, clip=4.2, shrink=0.5)
+        prices, mu, assets = _prices_and_mu()
+        engine = OnlineEngine(cfg, assets)
+        engine.extend(prices, mu)
+        assert engine.profit_variance != 1.0
+        assert engine.profit_variance > 0.0
+
+    @pytest.mark.parametrize("split", [0, 1, 10, 50, 51, 79])
+    def test_checkpoint_resume_matches_full_run(self, tmp_path: Path, split: int):
+        """Saving after ``split`` bars and resuming reproduces the uninterrupted run."""
+        cfg = Config(vola=8, corr=16, clip=4.2, shrink=0.5)
+        prices, mu, assets = _prices_and_mu()
+        whole = OnlineEngine(cfg, assets).extend(prices, mu)
+
+        first = OnlineEngine(cfg, assets)
+        head = first.extend(prices.head(split), mu.head(split))
+        first.save(tmp_path / "state.npz")
+        resumed = OnlineEngine.load(tmp_path / "state.npz")
+        tail = resumed.extend(prices.tail(len(prices) - split), mu.tail(len(prices) - split))
+
+        np.testing.assert_array_equal(
+            pl.concat([head, tail]).select(assets).to_numpy(), whole.select(assets).to_numpy()
+        )
+        assert resumed.cfg == cfg
+        assert resumed.assets == tuple(assets)
+
+    def test_save_leaves_no_partial_file(self, tmp_path: Path):
+        """Only the checkpoint itself remains in the directory after a save."""
+        engine = OnlineEngine(Config(vola=3, corr=3, clip=4.2, shrink=0.5), ["A"])
+        engine.update([100.0], [0.1])
+        engine.save(tmp_path / "state.npz")
+        engine.save(tmp_path / "state.npz")
+        assert [p.name for p in tmp_path.iterdir()] == ["state.npz"]
+
+    def test_load_rejects_other_versions(self, tmp_path: Path):
+        """A checkpoint from another format version raises ValueError."""
+        engine = OnlineEngine(Config(vola=3, corr=3, clip=4.2, shrink=0.5), ["A"])
+        engine.save(tmp_path / "state.npz")
+        with np.load(tmp_path / "state.npz") as data:
+            arrays = {key: data[key] for key in data.files}
+        arrays["version"] = np.array(_CHECKPOINT_VERSION + 1)
+        np.savez(tmp_path / "old.npz", **arrays)
+        with pytest.raises(ValueError, match="version"):
+            OnlineEngine.load(tmp_path / "old.npz")
+
+    def test_rejects_factor_mode(self):
+        """The streaming engine keeps dense state only."""
+        with pytest.raises(ValueError, match="factor"):
+            OnlineEngine(Config(vola=3, corr=3, clip=4.2, shrink=0.5, factors=2), ["A", "B"])
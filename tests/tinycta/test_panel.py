@@ -0,0 +1,94 @@
+"""Tests for tinycta.panel: the integer-indexed panel shared by the engine and the kernel."""
+
+from __future__ import annotations
+
+import datetime as dt
+
+import numpy as np
+import polars as pl
+import pytest
+
+from tinycta.panel import Panel, numeric_assets
+
+
+def _frame() -> pl.DataFrame:
+    """Two float assets, an integer asset with a null, and a string column."""
+    dates = [dt.date(2024, 1, 1) + dt.timedelta(days=i) for i in range(4)]
+    return pl.DataFrame(
+        {
+            "date": dates,
+            "A": [100.0, 101.0, 102.0, 103.0],
+            "name": ["w", "x", "y", "z"],
+            "B": [1, None, 3, 4],
+            "C": [5.0, 4.0, 3.0, 2.0],
+        }
+    )
+
+
+class TestNumericAssets:
+    """numeric_assets picks the numeric columns other than date."""
+
+    def test_skips_date_and_non_numeric_columns(self):
+        """Strings and the date column are excluded; column order is kept."""
+        assert numeric_assets(_frame()) == ["A", "B", "C"]
+
+
+class TestPanel:
+    """Panel holds dates, asset names and one column-major float64 buffer."""
+
+    def test_from_frame_matches_the_frame(self):
+        """Values equal the selected columns, nulls read as NaN, dates as an array."""
+        frame = _frame()
+        panel = Panel.from_frame(frame)
+        assert panel.assets == ("A", "B", "C")
+        assert panel.shape == (4, 3)
+        assert panel.values.dtype == np.float64
+        assert panel.values.flags.f_contiguous
+        np.testing.assert_array_equal(panel.values[:, 1], [1.0, np.nan, 3.0, 4.0])
+        assert pl.Series(panel.dates).equals(frame["date"], check_names=False)
+
+    def test_single_precision_buffer(self):
+        """dtype=np.float32 gives a column-major float32 buffer with nulls as NaN."""
+        panel = Panel.from_frame(_frame(), dtype=np.float32)
+        assert panel.values.dtype == np.float32
+        assert panel.values.flags.f_contiguous
+        np.testing.assert_array_equal(panel.values[:, 1], np.array([1.0, np.nan, 3.0, 4.0], dtype=np.float32))
+
+    def test_explicit_assets_set_the_column_order(self):
+        """Passing assets selects and orders the columns without a dtype scan."""
+        panel = Panel.from_frame(_frame(), ["C", "A"])
+        assert panel.assets == ("C", "A")
+        np.testing.assert_array_equal(panel.values[0], [5.0, 100.0])
+
+    def test_row_of_maps_python_dates_to_rows(self):
+        """row_of is keyed by the same values the date column holds."""
+        panel = Panel.from_frame(_frame())
+        assert panel.row_of[dt.date(2024, 1, 3)] == 2
+
+    def test_to_frame_round_trips(self):
+        """to_frame rebuilds the date column and every asset column."""
+        frame = _frame().select("date", "A", "C")
+        assert Panel.from_frame(frame).to_frame().equals(frame)
+
+    def test_to_frame_with_other_values(self):
+        """to_frame can label a different buffer of the same shape."""
+        panel = Panel.from_frame(_frame())
+        frame = panel.to_frame(np.zeros(panel.shape))
+        assert frame.columns == ["date", "A", "B", "C"]
+        assert frame.select("A", "B", "C").to_numpy().sum() == 0.0
+
+    def test_numpy_reads_the_buffer(self):
+        """np.asarray returns the panel's own buffer unless a copy or cast is asked for."""
+        panel = Panel.from_frame(_frame())
+        assert np.asarray(panel) is panel.values
+        assert np.asarray(panel, dtype=np.float32).dtype == np.float32
+
+    def test_rejects_mismatched_shapes(self):
+        """The buffer must have one row per date and one column per asset."""
+        with pytest.raises(ValueError, match="shape"):
+            Panel(dates=np.arange(3), assets=("A",), values=np.zeros((3, 2)))
+
+    def test_requires_a_date_column(self):
+        """A frame without dates cannot be indexed by date."""
+        with pytest.raises(ValueError, match="date"):
+            Panel.from_frame(pl.DataFrame({"A": [1.0]}))
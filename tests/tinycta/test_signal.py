@@ -9,7 +9,7 @@ import polars as pl
 import polars.testing as pt
 import pytest
 
-from tinycta.signal import moving_absolute_deviation, shrink2id
+from tinycta.signal import correlation_blocks, moving_absolute_deviation, shrink2id
 
 
 def _mad_reference(col: str, com: int) -> pl.Expr:
@@ -100,3 +100,20 @@ def test_shrink2id_identity_dimension_follows_row_count() -> None:
     result = shrink2id(matrix, lamb=0.5)
     assert result.shape == (1, 2)
     np.testing.assert_array_equal(result, matrix * 0.5 + 0.5 * np.eye(N=1))
+
+
+def test_correlation_blocks_links_chains_and_ignores_nan() -> None:
+    """Blocks follow chains of strong correlations; NaN cells never link."""
+    corr = np.eye(5)
+    corr[0, 1] = corr[1, 0] = 0.5
+    corr[1, 2] = corr[2, 1] = -0.5  # 0-1-2 chain, linked by magnitude
+    corr[3, 4] = corr[4, 3] = np.nan
+    blocks = correlation_blocks(corr, ["a", "b", "c", "d", "e"], threshold=0.4)
+    assert blocks == {"a": 0, "b": 0, "c": 0, "d": 1, "e": 2}
+
+
+def test_correlation_blocks_threshold_above_one_isolates_every_asset() -> None:
+    """No correlation reaches a threshold above one, so every asset is its own block."""
+    corr = np.full((3, 3), 0.9)
+    np.fill_diagonal(corr, 1.0)
+    assert correlation_blocks(corr, ["a", "b", "c"], threshold=1.5) == {"a": 0, "b": 1, "c": 2}
@@ -0,0 +1,54 @@
+"""Tests for tinycta.solver: the walk strategies an Engine accepts."""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+import tinycta.solver as solver_module
+from tinycta.solver import Direct, Jit
+
+
+class TestDirect:
+    """Direct checks its own options when it is built."""
+
+    def test_defaults(self):
+        """Direct() is the daily float64 serial walk."""
+        assert Direct().is_default
+        assert Direct().dtype is np.float64
+
+    @pytest.mark.parametrize("options", [{"rebalance": 5}, {"precision": "float32"}, {"workers": 2}])
+    def test_any_option_leaves_the_default(self, options: dict):
+        """Setting any option makes the walk non-default."""
+        assert not Direct(**options).is_default
+
+    def test_single_precision_dtype(self):
+        """precision="float32" selects np.float32 for the walk's arrays."""
+        assert Direct(precision="float32").dtype is np.float32
+
+    def test_unknown_precision_is_rejected(self):
+        """Only float64 and float32 are supported."""
+        with pytest.raises(ValueError, match="precision"):
+            Direct(precision="float16")  # type: ignore[arg-type]
+
+    @pytest.mark.parametrize("workers", [0, -2, 1.5, True])
+    def test_non_positive_worker_counts_are_rejected(self, workers):
+        """Workers must be a positive integer."""
+        with pytest.raises(ValueError, match="workers must be a positive integer"):
+            Direct(workers=workers)
+
+    @pytest.mark.parametrize("rebalance", [0, -1, True])
+    def test_non_positive_bar_counts_are_rejected(self, rebalance):
+        """An integer schedule must count at least one bar."""
+        with pytest.raises(ValueError, match="positive number of bars"):
+            Direct(rebalance=rebalance)
+
+
+class TestJit:
+    """Jit refuses to be built without numba."""
+
+    def test_requires_numba(self, monkeypatch):
+        """Without numba the compiled solver is refused up front, not at first use."""
+        monkeypatch.setattr(solver_module._jit, "available", lambda: False)
+        with pytest.raises(ModuleNotFoundError, match=r"tinycta\[jit\]"):
+            Jit()